@@ -1,26 +1,358 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import hmac
 import json
+import math
+import mimetypes
 import os
-from recommendation_engine import RecommendationEngine
+import threading
+import time
+from recommendation_engine import RecommendationEngine, DEFAULT_RECOMMENDATIONS, MAX_RECOMMENDATIONS, PARALLEL_MIN_POSTINGS
+from recommendation_cache import RecommendationCache
+from catalogue_reloader import CatalogueReloader, LOG_MAX_BYTES
+from catalogue_log import CatalogueLog
+from catalogue_delta import parse_delta_lines, load_schema
+from json_serializer import JsonSerializer
+from json_stream import stream_json, project
+from response_cache import ResponseCache, StaticAsset, choose_encoding
+from metrics import MetricsRegistry, ScoringMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from sampling_profiler import SamplingProfiler, DEFAULT_DURATION, DEFAULT_INTERVAL, DEFAULT_MAX_STACKS, DEFAULT_MAX_SAMPLES
+from rate_limiter import RateLimiter, MemoryTokenStore, SharedTokenStore
+from recommendation_store import RecommendationStore
+
+# JSON encoder of every response: 'orjson' when installed, else 'stdlib' (JSON_SERIALIZER overrides)
+serializer = JsonSerializer(os.environ.get('JSON_SERIALIZER', 'auto'), default=DefaultJSONProvider.default)
+
+
+class SerializerJSONProvider(DefaultJSONProvider):
+    """Makes jsonify encode with `serializer` (always compact, keys sorted)"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return serializer.dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        body = serializer.dumps(self._prepare_response_obj(args, kwargs))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+app.json = SerializerJSONProvider(app)
 CORS(app)  # Enable CORS for frontend integration
 
 # Get the absolute path to the project directory
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FRONTEND_DIR = os.path.join(PROJECT_ROOT, 'frontend')
 
-# Initialize recommendation engine
-rec_engine = RecommendationEngine()
+# Prometheus metrics at /metrics, off unless METRICS_ENABLED=true: when off, no
+# request or scoring call is timed. Scoring phases are timed for a sample of
+# METRICS_PHASE_SAMPLE_RATE requests (0 to 1)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+metrics_registry = MetricsRegistry() if METRICS_ENABLED else None
+
+# Stack sampling of recommendation requests, started and downloaded through /api/admin/profiler;
+# the server processes sharing PROFILER_DIR (the gunicorn workers) share its sessions
+profiler = SamplingProfiler(os.environ.get('PROFILER_DIR') or None)
+
+# Cache of recommendations per canonical profile (RECOMMEND_CACHE_SIZE=0 disables it)
+recommendation_cache = RecommendationCache(
+    max_size=int(os.environ.get('RECOMMEND_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('RECOMMEND_CACHE_TTL', 300))
+)
+
+# Precomputed recommendations (see recommendation_store), served while they match the
+# catalogue; RECOMMENDATION_STORE_AUTO_REFRESH=true brings the store up to date in the
+# background after every catalogue change
+RECOMMENDATION_STORE_PATH = os.environ.get('RECOMMENDATION_STORE_PATH', '')
+recommendation_store = RecommendationStore(
+    RECOMMENDATION_STORE_PATH,
+    auto_refresh=os.environ.get('RECOMMENDATION_STORE_AUTO_REFRESH', 'false').lower() == 'true'
+) if RECOMMENDATION_STORE_PATH else None
+
+# Admin deltas and reloads shared by every process of the server through a log file
+# (see catalogue_log); gunicorn.conf.py sets CATALOGUE_LOG_PATH. Every process applies
+# the whole log after loading the catalogue
+CATALOGUE_LOG_PATH = os.environ.get('CATALOGUE_LOG_PATH', '')
+catalogue_log = CatalogueLog(CATALOGUE_LOG_PATH) if CATALOGUE_LOG_PATH else None
+
+# Initialize recommendation engine ('scalar' or 'vectorized'). INTERNSHIPS_DATA_PATH
+# may point to a JSON array or a line-delimited .ndjson/.jsonl catalogue.
+# CATALOGUE_SNAPSHOT_PATH keeps the prepared catalogue in a snapshot file that
+# later starts load instead of rebuilding it, as long as the data is unchanged.
+# SCORING_WORKERS > 0 shards catalogues of at least PARALLEL_MIN_POSTINGS across
+# that many worker processes
+rec_engine = RecommendationEngine(
+    scoring_mode=os.environ.get('SCORING_MODE', 'scalar'),
+    cache=recommendation_cache,
+    data_path=os.environ.get('INTERNSHIPS_DATA_PATH'),
+    snapshot_path=os.environ.get('CATALOGUE_SNAPSHOT_PATH') or None,
+    workers=int(os.environ.get('SCORING_WORKERS', 0)),
+    parallel_min_postings=int(os.environ.get('PARALLEL_MIN_POSTINGS', PARALLEL_MIN_POSTINGS)),
+    metrics=ScoringMetrics(metrics_registry, float(os.environ.get('METRICS_PHASE_SAMPLE_RATE', 0.1)))
+    if metrics_registry is not None else None,
+    profiler=profiler,
+    recommendation_store=recommendation_store
+)
+
+# Encoded catalogue responses, kept until the catalogue changes (RESPONSE_CACHE_BYTES=0
+# disables it); bodies over RESPONSE_CACHE_MAX_BODY bytes are streamed instead
+response_cache = ResponseCache(
+    max_bytes=int(os.environ.get('RESPONSE_CACHE_BYTES', 64 * 1024 * 1024)),
+    max_body_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BODY', 8 * 1024 * 1024))
+)
+
+# Background catalogue reloads; CATALOGUE_WATCH_INTERVAL (seconds) enables
+# reloading automatically when the data file changes. Every process polls the
+# catalogue log every CATALOGUE_LOG_INTERVAL seconds, and a log grown past
+# CATALOGUE_LOG_MAX_BYTES is compacted into a reload of the current catalogue
+catalogue_reloader = CatalogueReloader(
+    rec_engine,
+    watch_interval=float(os.environ.get('CATALOGUE_WATCH_INTERVAL', 0)),
+    log=catalogue_log,
+    log_interval=float(os.environ.get('CATALOGUE_LOG_INTERVAL', 1.0)),
+    log_max_bytes=int(os.environ.get('CATALOGUE_LOG_MAX_BYTES', LOG_MAX_BYTES))
+)
+
+# Load shedding on /api/recommend, answered with an immediate 429 and Retry-After:
+# - RECOMMEND_RATE_LIMIT requests per second per client (0, the default, disables
+#   it), in bursts of up to RECOMMEND_RATE_BURST. Clients are told apart by their
+#   address, or by the RATE_LIMIT_CLIENT_HEADER header set by a trusted proxy.
+#   RATE_LIMIT_STORE=shared keeps the buckets in a manager process shared by the
+#   workers forked from this one, instead of per process ('memory')
+# - at most RECOMMEND_MAX_IN_FLIGHT requests scored at once per process (0: no limit)
+RECOMMEND_RATE_LIMIT = float(os.environ.get('RECOMMEND_RATE_LIMIT', 0))
+RATE_LIMIT_CLIENT_HEADER = os.environ.get('RATE_LIMIT_CLIENT_HEADER', '')
+rate_limiter = None
+if RECOMMEND_RATE_LIMIT > 0:
+    rate_limiter = RateLimiter(
+        SharedTokenStore() if os.environ.get('RATE_LIMIT_STORE', 'memory') == 'shared' else MemoryTokenStore(),
+        RECOMMEND_RATE_LIMIT,
+        float(os.environ.get('RECOMMEND_RATE_BURST', 0)) or None
+    )
+RECOMMEND_MAX_IN_FLIGHT = int(os.environ.get('RECOMMEND_MAX_IN_FLIGHT', 0))
+recommend_slots = threading.BoundedSemaphore(RECOMMEND_MAX_IN_FLIGHT) if RECOMMEND_MAX_IN_FLIGHT > 0 else None
+
+# Largest number of profiles accepted by /api/recommend/batch
+MAX_BATCH_PROFILES = int(os.environ.get('MAX_BATCH_PROFILES', 10000))
+
+REQUIRED_PROFILE_FIELDS = ['education', 'skills', 'interests', 'location']
+
+# Internship listings: fields that can be selected with ?fields=, and page sizes
+INTERNSHIP_FIELDS = tuple(load_schema()['properties'])
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Frontend files, read and compressed once; browsers may reuse them for STATIC_MAX_AGE seconds
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 86400))
+STATIC_ASSETS = {name: StaticAsset.find(name, FRONTEND_DIR, './frontend')
+                 for name in ('styles.css', 'script.js', 'manifest.json')}
+ROOT_HTML = StaticAsset.find('index.html', PROJECT_ROOT)
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def admin_error():
+    """Return an error response unless the request carries the admin token"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled'}), 403
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+def too_many_requests(message: str, retry_after: float):
+    """429 response asking the client to retry after some seconds"""
+    response = jsonify({'error': message, 'retry_after': round(retry_after, 3)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def rate_limit_error():
+    """Return a 429 response when the client is over its rate limit"""
+    if rate_limiter is None:
+        return None
+    client = (request.headers.get(RATE_LIMIT_CLIENT_HEADER) if RATE_LIMIT_CLIENT_HEADER else None) or request.remote_addr
+    wait = rate_limiter.check(client)
+    if wait:
+        return too_many_requests('Rate limit exceeded', wait)
+    return None
+
+def json_response(payload):
+    """
+    Like jsonify, but iterator members of the payload are encoded item by item,
+    so pre-encoded internships and recommendations are spliced in as they are
+    """
+    return Response(b''.join(stream_json(payload, serializer.dumps)), mimetype='application/json')
+
+def listing_arguments():
+    """The fields, cursor and limit parameters of an internship listing; raises ValueError"""
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in INTERNSHIP_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        if 'id' not in fields:
+            fields.insert(0, 'id')
+
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    elif cursor:
+        limit = DEFAULT_PAGE_SIZE
+    return fields, cursor, limit
+
+def internship_listing(fields, cursor, limit, filters=None, **search):
+    """The (projected) internships matching a search, or one page of them"""
+    def payload():
+        records, matches, next_cursor = rec_engine.find_records(cursor=cursor, limit=limit, **search)
+        listing = {
+            'success': True,
+            'internships': (serializer.internship(record) if fields is None else project(record.internship, fields)
+                            for record in records),
+            'total': len(records)
+        }
+        if filters is not None:
+            listing['filters'] = filters
+        if limit is not None:
+            listing['matches'] = matches
+            listing['next_cursor'] = next_cursor
+        return listing
+
+    return catalogue_response(payload)
+
+def catalogue_response(build_payload):
+    """
+    A JSON response that only depends on the catalogue and the request URL.
+
+    The catalogue tag is the (weak) ETag, so clients holding the current
+    version get a 304. Otherwise the body is served from the response cache,
+    compressed if the client accepts it, or encoded and cached first. Bodies
+    too large to cache are encoded one item at a time as they are sent.
+    build_payload returns the payload for stream_json and may raise ValueError.
+    """
+    # Read before the body is built, so a body is never older than its tag
+    tag = rec_engine.catalogue_tag
+    if request.if_none_match.contains_weak(tag):
+        return revalidation_headers(Response(status=304), tag, 'no-cache')
+
+    key = request.full_path
+    entry = response_cache.get(tag, key)
+    if entry is None:
+        entry, chunks = response_cache.fill(tag, key, stream_json(build_payload(), serializer.dumps))
+    elif entry is False:
+        entry, chunks = None, stream_json(build_payload(), serializer.dumps)
+    if entry is None:
+        response = Response(chunks, mimetype='application/json')
+    else:
+        encoding = choose_encoding(request.accept_encodings, len(entry.body))
+        response = Response(response_cache.encoded(tag, key, entry, encoding), mimetype='application/json')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+    return revalidation_headers(response, tag, 'no-cache')
+
+def asset_response(asset: StaticAsset, cache_control: str):
+    """A static file, compressed if the client accepts it, or a 304 if the client has it"""
+    if request.if_none_match.contains_weak(asset.etag):
+        return revalidation_headers(Response(status=304), asset.etag, cache_control)
+    encoding = choose_encoding(request.accept_encodings, len(asset.content.body))
+    response = Response(asset.content.encoded(encoding), mimetype=mimetypes.guess_type(asset.path)[0])
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    return revalidation_headers(response, asset.etag, cache_control)
+
+def revalidation_headers(response, etag: str, cache_control: str):
+    """Set the ETag and caching headers of a cacheable response"""
+    # Weak: the same ETag is used for every content coding of a body
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+def start_scoring_workers():
+    """Fork the parallel scoring pool (SCORING_WORKERS); call before this process starts any threads"""
+    if rec_engine.parallel_scorer is not None:
+        rec_engine.parallel_scorer.start()
+
+def stop_scoring_workers():
+    """Stop the parallel scoring pool of this process, if it started one"""
+    if rec_engine.parallel_scorer is not None:
+        rec_engine.parallel_scorer.close()
+
+@app.before_request
+def start_background_tasks():
+    # Started on first use in each process, as threads do not survive a fork
+    catalogue_reloader.start()
+
+def install_metrics(registry: MetricsRegistry):
+    """Time every request and export catalogue and cache figures to `registry`"""
+    requests_total = registry.counter(
+        'http_requests_total', 'Requests served, by route and status', ('method', 'route', 'status'))
+    request_seconds = registry.histogram(
+        'http_request_duration_seconds', 'Time to produce a response (streamed bodies: until the first chunk)',
+        ('method', 'route'))
+    in_flight = registry.gauge('http_requests_in_flight', 'Requests being served by this process')
+    in_flight.set(0)
+
+    def catalogue_postings():
+        state = rec_engine.state
+        return [((), len(state.records) - state.index.removed)]
+
+    def cache_lookups():
+        for name, stats in (('recommendations', recommendation_cache.stats()), ('responses', response_cache.stats())):
+            yield (name, 'hit'), stats['hits']
+            yield (name, 'miss'), stats['misses']
+        if recommendation_store is not None:
+            stats = recommendation_store.stats()
+            yield ('precomputed', 'hit'), stats['hits']
+            yield ('precomputed', 'miss'), stats['misses']
+
+    def cache_entries():
+        return [(('recommendations',), recommendation_cache.stats()['size']),
+                (('responses',), response_cache.stats()['size'])]
+
+    registry.callback('gauge', 'catalogue_postings', 'Internships in the catalogue in service', catalogue_postings)
+    registry.callback('gauge', 'catalogue_version', 'Version of the catalogue in service (per process)',
+                      lambda: [((), rec_engine.catalogue_version)])
+    registry.callback('counter', 'cache_lookups_total', 'Cache lookups by result', cache_lookups, ('cache', 'result'))
+    registry.callback('gauge', 'cache_entries', 'Entries held per cache', cache_entries, ('cache',))
+
+    def start_timer():
+        in_flight.inc()
+        g.metrics_started = time.perf_counter()
+
+    def record_request(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_seconds.observe(time.perf_counter() - started, (request.method, route))
+            requests_total.inc((request.method, route, str(response.status_code)))
+        return response
+
+    def stop_timer(exception):
+        # Runs even when a view raises
+        if g.pop('metrics_started', None) is not None:
+            in_flight.dec()
+
+    app.before_request(start_timer)
+    app.after_request(record_request)
+    app.teardown_request(stop_timer)
+
+if metrics_registry is not None:
+    install_metrics(metrics_registry)
 
 @app.route('/')
 def index():
     """Serve static HTML file from root"""
-    import os
-    root_html = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'index.html')
-    if os.path.exists(root_html):
-        return send_file(root_html)
+    if ROOT_HTML is not None:
+        # Revalidated on every visit, so a new deployment shows up at once
+        return asset_response(ROOT_HTML, 'no-cache')
     else:
         # Fallback to app route
         from flask import redirect
@@ -165,47 +497,135 @@ def get_html_app():
 
 @app.route('/api/recommend', methods=['POST'])
 def get_recommendations():
+    error = rate_limit_error()
+    if error is not None:
+        return error
+    # Shed load rather than queue requests until they time out
+    if recommend_slots is not None and not recommend_slots.acquire(blocking=False):
+        return too_many_requests('Server busy', 1)
+    try:
+        return recommend()
+    finally:
+        if recommend_slots is not None:
+            recommend_slots.release()
+
+def recommend():
     try:
         # Get candidate profile from request
         candidate_data = request.get_json()
         
         # Validate required fields
-        required_fields = ['education', 'skills', 'interests', 'location']
-        for field in required_fields:
+        for field in REQUIRED_PROFILE_FIELDS:
             if field not in candidate_data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
+        # Optional number of recommendations, from the body or the query string
+        k = candidate_data.get('k', request.args.get('k', DEFAULT_RECOMMENDATIONS))
+        try:
+            k = int(k)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k must be an integer'}), 400
+        if not 1 <= k <= MAX_RECOMMENDATIONS:
+            return jsonify({'error': f'k must be between 1 and {MAX_RECOMMENDATIONS}'}), 400
+        
         # Get recommendations
-        recommendations = rec_engine.recommend_internships(candidate_data)
+        recommendations = rec_engine.recommend_internships(candidate_data, k=k)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'recommendations': recommendations,
+            'recommendations': iter(recommendations),
             'total': len(recommendations)
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/recommend/batch', methods=['POST'])
+def get_batch_recommendations():
+    try:
+        # Either a JSON array of profiles or NDJSON, one profile per line
+        body = request.get_data(as_text=True)
+        if body.lstrip().startswith('['):
+            try:
+                profiles = json.loads(body)
+            except json.JSONDecodeError as e:
+                return jsonify({'error': f'Invalid JSON: {e}'}), 400
+        else:
+            profiles = []
+            for line_number, line in enumerate(body.splitlines(), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    profiles.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    return jsonify({'error': f'Invalid JSON on line {line_number}: {e}'}), 400
+        if not profiles:
+            return jsonify({'error': 'No candidate profiles provided'}), 400
+        if len(profiles) > MAX_BATCH_PROFILES:
+            return jsonify({'error': f'At most {MAX_BATCH_PROFILES} profiles per batch'}), 400
+
+        try:
+            k = int(request.args.get('k', DEFAULT_RECOMMENDATIONS))
+        except ValueError:
+            return jsonify({'error': 'k must be an integer'}), 400
+        if not 1 <= k <= MAX_RECOMMENDATIONS:
+            return jsonify({'error': f'k must be between 1 and {MAX_RECOMMENDATIONS}'}), 400
+
+        # Invalid profiles get an error line instead of failing the whole batch
+        errors = {}
+        for position, profile in enumerate(profiles):
+            if not isinstance(profile, dict):
+                errors[position] = 'Profile must be an object'
+                continue
+            missing = [field for field in REQUIRED_PROFILE_FIELDS if field not in profile]
+            if missing:
+                errors[position] = f'Missing required field: {missing[0]}'
+        valid = [position for position in range(len(profiles)) if position not in errors]
+
+        def line(payload):
+            # Encoded like json_response, so each line matches /api/recommend
+            return b''.join(stream_json(payload, serializer.dumps))
+
+        def generate():
+            # One JSON line per profile, in input order, written as soon as it is scored
+            emitted = 0
+            for valid_position, recommendations in rec_engine.recommend_batch((profiles[position] for position in valid), k=k):
+                position = valid[valid_position]
+                while emitted < position:
+                    yield line({'index': emitted, 'error': errors[emitted]})
+                    emitted += 1
+                yield line({
+                    'index': position,
+                    'id': profiles[position].get('id'),
+                    'recommendations': iter(recommendations),
+                    'total': len(recommendations)
+                })
+                emitted = position + 1
+            for position in range(emitted, len(profiles)):
+                yield line({'index': position, 'error': errors[position]})
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/internships', methods=['GET'])
 def get_all_internships():
     try:
-        internships = rec_engine.get_all_internships()
-        return jsonify({
-            'success': True,
-            'internships': internships,
-            'total': len(internships)
-        })
+        try:
+            fields, cursor, limit = listing_arguments()
+            return internship_listing(fields, cursor, limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/sectors', methods=['GET'])
 def get_sectors():
     try:
-        sectors = rec_engine.get_available_sectors()
-        return jsonify({
+        return catalogue_response(lambda: {
             'success': True,
-            'sectors': sectors
+            'sectors': rec_engine.get_available_sectors()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -219,39 +639,182 @@ def search_internships():
         is_remote = request.args.get('remote', '').lower() == 'true'
         
         # Search internships
-        results = rec_engine.search_internships(
-            sector=sector,
-            location=location,
-            is_remote=is_remote
-        )
-        
-        return jsonify({
-            'success': True,
-            'internships': results,
-            'total': len(results),
-            'filters': {
-                'sector': sector,
-                'location': location,
-                'remote': is_remote
-            }
-        })
+        try:
+            fields, cursor, limit = listing_arguments()
+            return internship_listing(
+                fields, cursor, limit,
+                filters={
+                    'sector': sector,
+                    'location': location,
+                    'remote': is_remote
+                },
+                sector=sector,
+                location=location,
+                is_remote=is_remote
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/internships/<internship_id>', methods=['GET'])
 def get_internship_details(internship_id):
     try:
-        internship = rec_engine.get_internship_by_id(internship_id)
-        if not internship:
+        if not rec_engine.get_internship_by_id(internship_id):
             return jsonify({'error': 'Internship not found'}), 404
         
+        return catalogue_response(lambda: {
+            'success': True,
+            'internship': rec_engine.get_internship_by_id(internship_id)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    try:
         return jsonify({
             'success': True,
-            'internship': internship
+            'cache': recommendation_cache.stats(),
+            'responses': response_cache.stats(),
+            'coalescing': rec_engine.single_flight.stats(),
+            'rate_limit': rate_limiter.stats() if rate_limiter is not None else None,
+            'precomputed': recommendation_store.stats() if recommendation_store is not None else None,
+            'catalogue_version': rec_engine.catalogue_version
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/catalogue/status', methods=['GET'])
+def get_catalogue_status():
+    try:
+        return jsonify({
+            'success': True,
+            'catalogue': catalogue_reloader.status()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_catalogue():
+    error = admin_error()
+    if error:
+        return error
+    try:
+        # The catalogue is rebuilt in the background and swapped in atomically, in
+        # every process sharing the catalogue log from one copy of the data file
+        started = catalogue_reloader.request_reload()
+        if request.args.get('wait', '').lower() == 'true':
+            catalogue_reloader.wait()
+        return jsonify({
+            'success': True,
+            'reload_started': started,
+            'catalogue': catalogue_reloader.status()
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/recommendation-store/refresh', methods=['POST'])
+def refresh_recommendation_store():
+    error = admin_error()
+    if error:
+        return error
+    if recommendation_store is None:
+        return jsonify({'error': 'No recommendation store is configured'}), 404
+    try:
+        # Recomputes the entries this process's catalogue changed, in the background
+        started = recommendation_store.request_refresh(rec_engine)
+        return jsonify({
+            'success': True,
+            'refresh_started': started,
+            'store': recommendation_store.stats()
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/ingest', methods=['POST'])
+def ingest_catalogue_delta():
+    error = admin_error()
+    if error:
+        return error
+    try:
+        # Either a JSON array of operations or NDJSON, one operation per line
+        body = request.get_data(as_text=True)
+        if body.lstrip().startswith('['):
+            try:
+                operations = json.loads(body)
+            except json.JSONDecodeError as e:
+                return jsonify({'error': f'Invalid JSON: {e}'}), 400
+            if not isinstance(operations, list):
+                return jsonify({'error': 'Expected a JSON array of operations'}), 400
+        else:
+            numbered, parse_errors = parse_delta_lines(body.splitlines())
+            if parse_errors:
+                return jsonify({'error': 'Invalid delta', 'errors': parse_errors}), 400
+            operations = [operation for _, operation in numbered]
+        if not operations:
+            return jsonify({'error': 'No delta operations provided'}), 400
+
+        # Applied through the catalogue log by every process, this one included
+        return jsonify({
+            'success': True,
+            **catalogue_reloader.apply_delta(operations)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics of this process, in the text format"""
+    if metrics_registry is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    try:
+        return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+def control_profiler():
+    error = admin_error()
+    if error:
+        return error
+    try:
+        if request.method == 'POST':
+            # Followed by every server process sharing PROFILER_DIR; stops by itself after `duration` seconds
+            try:
+                profiler.start(
+                    duration=float(request.args.get('duration', DEFAULT_DURATION)),
+                    sample_rate=float(request.args.get('sample_rate', 1.0)),
+                    interval=float(request.args.get('interval_ms', DEFAULT_INTERVAL * 1000)) / 1000,
+                    max_stacks=int(request.args.get('max_stacks', DEFAULT_MAX_STACKS)),
+                    max_samples=int(request.args.get('max_samples', DEFAULT_MAX_SAMPLES))
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        elif request.method == 'DELETE':
+            profiler.stop()
+        return jsonify({
+            'success': True,
+            'profiler': profiler.status()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/profiler/stacks', methods=['GET'])
+def download_profile():
+    error = admin_error()
+    if error:
+        return error
+    try:
+        # Collapsed stacks, e.g. for flamegraph.pl or speedscope
+        response = Response(profiler.collapsed(), mimetype='text/plain')
+        started_at = profiler.started_at.strftime('%Y%m%d-%H%M%S') if profiler.started_at else 'empty'
+        response.headers['Content-Disposition'] = f'attachment; filename=recommend-{started_at}.collapsed'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Explicit HTML route for testing
 @app.route('/app')
 def serve_app():
@@ -308,42 +871,28 @@ def debug_files():
 @app.route('/styles.css')
 def serve_css():
     """Serve CSS file"""
-    try:
-        if os.path.exists(os.path.join(FRONTEND_DIR, 'styles.css')):
-            return send_from_directory(FRONTEND_DIR, 'styles.css')
-        elif os.path.exists('./frontend/styles.css'):
-            return send_from_directory('./frontend', 'styles.css')
-        else:
-            return jsonify({'error': 'CSS file not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 404
+    asset = STATIC_ASSETS['styles.css']
+    if asset is None:
+        return jsonify({'error': 'CSS file not found'}), 404
+    return asset_response(asset, f'public, max-age={STATIC_MAX_AGE}')
 
 @app.route('/script.js')
 def serve_js():
     """Serve JavaScript file"""
-    try:
-        if os.path.exists(os.path.join(FRONTEND_DIR, 'script.js')):
-            return send_from_directory(FRONTEND_DIR, 'script.js')
-        elif os.path.exists('./frontend/script.js'):
-            return send_from_directory('./frontend', 'script.js')
-        else:
-            return jsonify({'error': 'JS file not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 404
+    asset = STATIC_ASSETS['script.js']
+    if asset is None:
+        return jsonify({'error': 'JS file not found'}), 404
+    return asset_response(asset, f'public, max-age={STATIC_MAX_AGE}')
 
 @app.route('/manifest.json')
 def serve_manifest():
     """Serve PWA manifest"""
-    try:
-        if os.path.exists(os.path.join(FRONTEND_DIR, 'manifest.json')):
-            return send_from_directory(FRONTEND_DIR, 'manifest.json')
-        elif os.path.exists('./frontend/manifest.json'):
-            return send_from_directory('./frontend', 'manifest.json')
-        else:
-            return jsonify({'error': 'Manifest not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 404
+    asset = STATIC_ASSETS['manifest.json']
+    if asset is None:
+        return jsonify({'error': 'Manifest not found'}), 404
+    return asset_response(asset, f'public, max-age={STATIC_MAX_AGE}')
 
 if __name__ == '__main__':
+    start_scoring_workers()
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,195 @@
+"""
+ASGI entry point for the recommendation API.
+
+Serves the Flask app in `app.py` (same routes, same response bodies) from an
+event loop, so idle keep-alive connections and slow clients cost no thread:
+
+- the request body is read on the event loop before any thread is used;
+- the Flask view (validation, scoring, JSON encoding) runs in a thread pool
+  executor, and streamed responses are produced there one chunk at a time;
+- at most ASGI_MAX_PENDING requests are dispatched to the executor at once,
+  later ones wait on the event loop (backpressure), and bodies larger than
+  MAX_REQUEST_BYTES are rejected with 413 before they are buffered.
+
+Run it with gunicorn and the uvicorn worker (see gunicorn.conf.py, ASGI=true)
+or on its own:
+
+    python backend/asgi_app.py
+"""
+import asyncio
+import contextvars
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+from app import app as flask_app
+
+# Threads running Flask views (default: CPU count + 4, at most 32)
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 0)) or None
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 16 * 1024 * 1024))
+
+_done = object()
+# Results of _read_body besides the body
+_too_large = object()
+_disconnected = object()
+
+
+def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """The WSGI environ of an ASGI HTTP request whose body has been read"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """Runs a WSGI app behind an event loop, with its views on a thread pool"""
+
+    def __init__(self, wsgi_app, threads: int = None, max_pending: int = None,
+                 max_request_bytes: int = MAX_REQUEST_BYTES):
+        self.wsgi_app = wsgi_app
+        threads = threads or min(32, (os.cpu_count() or 1) + 4)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-view')
+        self.max_pending = max_pending or threads * 4
+        self.max_request_bytes = max_request_bytes
+        self._pending = None  # Created on first use, inside the server's event loop
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        """The request body, _disconnected if the client left, or _too_large past max_request_bytes"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return _disconnected
+            size += len(message.get('body', b''))
+            if size > self.max_request_bytes:
+                return _too_large
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is _disconnected:
+            return
+        if body is _too_large:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': b'{"error":"Request body too large"}\n'})
+            return
+
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        # Every step of one response runs in the same context, so Flask's
+        # request context survives moving between executor threads
+        context = contextvars.copy_context()
+        async with self._pending:
+            status, headers, iterable, chunk = await loop.run_in_executor(
+                self.executor, context.run, self._start, build_environ(scope, body))
+            try:
+                await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                while chunk is not _done:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    chunk = await loop.run_in_executor(self.executor, context.run, next, iterable, _done)
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(iterable, 'close'):
+                    await loop.run_in_executor(self.executor, context.run, iterable.close)
+
+    def _start(self, environ: Dict[str, Any]):
+        """Call the WSGI app; returns its status, headers, body iterator and first chunk"""
+        response = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        iterable = self.wsgi_app(environ, start_response)
+        iterator = iter(iterable)
+        # start_response has been called once the first chunk is produced
+        chunk = next(iterator, _done)
+        if hasattr(iterable, 'close') and not hasattr(iterator, 'close'):
+            iterator = _ClosingIterator(iterator, iterable.close)
+        return response['status'], response['headers'], iterator, chunk
+
+
+class _ClosingIterator:
+    """An iterator that closes the WSGI iterable it was taken from"""
+
+    def __init__(self, iterator, close):
+        self._iterator = iterator
+        self.close = close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+
+app = AsgiApp(flask_app, threads=ASGI_THREADS,
+              max_pending=int(os.environ.get('ASGI_MAX_PENDING', 0)) or None)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    from app import start_scoring_workers
+
+    start_scoring_workers()
+
+    uvicorn.run(
+        app,
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5000)),
+        timeout_keep_alive=int(os.environ.get('KEEP_ALIVE', 5)),
+        limit_concurrency=int(os.environ.get('WORKER_CONNECTIONS', 1000)),
+        backlog=2048
+    )
@@ -0,0 +1,191 @@
+"""
+Incremental changes to an internship catalogue.
+
+A delta is line-delimited JSON, one operation per line, keyed by internship id:
+
+    {"op": "add", "internship": {"id": "INT009", "title": "...", ...}}
+    {"op": "update", "internship": {"id": "INT002", "title": "...", ...}}
+    {"op": "delete", "id": "INT003"}
+
+Added and updated internships are complete records validated against
+data/internship_schema.json. Deltas are applied to a running engine through
+POST /api/admin/ingest, and can be folded into a catalogue file so that the
+next reload keeps them:
+
+    python backend/catalogue_delta.py apply data/sample_internships.json changes.ndjson
+"""
+import argparse
+import json
+import os
+from typing import List, Dict, Any, Iterable, Tuple
+
+from catalogue_store import is_ndjson_path
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'data', 'internship_schema.json')
+
+DELTA_OPERATIONS = ('add', 'update', 'delete')
+
+# JSON schema types to the Python types that satisfy them
+JSON_TYPES = {
+    'string': str,
+    'boolean': bool,
+    'array': list,
+    'object': dict
+}
+
+_schema = None
+
+
+def load_schema() -> Dict[str, Any]:
+    """The internship JSON schema, read once"""
+    global _schema
+    if _schema is None:
+        with open(SCHEMA_PATH, 'r', encoding='utf-8') as file:
+            _schema = json.load(file)
+    return _schema
+
+
+def validate_internship(internship: Any) -> List[str]:
+    """
+    Check an internship against the required fields, types and enums of the schema.
+
+    Returns a list of problems; an empty list means the internship is valid.
+    """
+    if not isinstance(internship, dict):
+        return ['internship must be an object']
+    return validate_object(internship, load_schema())
+
+
+def validate_object(value: Dict[str, Any], schema: Dict[str, Any]) -> List[str]:
+    """Check an object against the required fields, types and enums of a JSON schema"""
+    problems = [f"missing required field: {field}" for field in schema.get('required', []) if field not in value]
+    for field, rules in schema.get('properties', {}).items():
+        if field not in value:
+            continue
+        field_value = value[field]
+        expected = JSON_TYPES.get(rules.get('type'))
+        if expected is not None and not isinstance(field_value, expected):
+            problems.append(f"{field} must be of type {rules['type']}")
+            continue
+        if 'enum' in rules and field_value not in rules['enum']:
+            problems.append(f"{field} must be one of: {', '.join(rules['enum'])}")
+        if rules.get('type') == 'array':
+            if len(field_value) < rules.get('minItems', 0):
+                problems.append(f"{field} must have at least {rules['minItems']} item(s)")
+            item_rules = rules.get('items', {})
+            item_type = JSON_TYPES.get(item_rules.get('type'))
+            if item_type is not None and not all(isinstance(item, item_type) for item in field_value):
+                problems.append(f"{field} items must be of type {item_rules['type']}")
+            elif 'enum' in item_rules and not all(item in item_rules['enum'] for item in field_value):
+                problems.append(f"{field} items must be one of: {', '.join(item_rules['enum'])}")
+    return problems
+
+
+def parse_operation(operation: Any) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Validate one delta operation and return (op, id, internship).
+
+    Raises ValueError describing the problem for invalid operations.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError('operation must be an object')
+    op = operation.get('op')
+    if op not in DELTA_OPERATIONS:
+        raise ValueError(f"op must be one of: {', '.join(DELTA_OPERATIONS)}")
+
+    if op == 'delete':
+        internship_id = operation.get('id')
+        if not isinstance(internship_id, str) or not internship_id:
+            raise ValueError('delete requires an id')
+        return op, internship_id, None
+
+    internship = operation.get('internship')
+    problems = validate_internship(internship)
+    if problems:
+        raise ValueError('; '.join(problems))
+    return op, internship['id'], internship
+
+
+def parse_delta_lines(lines: Iterable[str]) -> Tuple[List[Tuple[int, Any]], List[Dict[str, Any]]]:
+    """
+    Parse NDJSON delta lines.
+
+    Returns (operations, errors): operations as (line number, parsed object)
+    pairs, and an error entry for every line that is not valid JSON.
+    """
+    operations, errors = [], []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            operations.append((line_number, json.loads(line)))
+        except json.JSONDecodeError as e:
+            errors.append({'line': line_number, 'error': f"invalid JSON: {e}"})
+    return operations, errors
+
+
+def apply_delta_to_catalogue(internships: List[Dict[str, Any]], operations: Iterable[Tuple[int, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Apply parsed delta operations to a list of internships; returns (internships, errors)"""
+    positions = {internship.get('id'): position for position, internship in enumerate(internships)}
+    result = list(internships)
+    deleted = set()
+    errors = []
+    for line_number, operation in operations:
+        try:
+            op, internship_id, internship = parse_operation(operation)
+            exists = internship_id in positions and positions[internship_id] not in deleted
+            if op == 'add':
+                if exists:
+                    raise ValueError(f"internship {internship_id} already exists")
+                positions[internship_id] = len(result)
+                result.append(internship)
+            elif not exists:
+                raise ValueError(f"internship {internship_id} not found")
+            else:
+                # An update replaces the posting and moves it to the end of the
+                # catalogue, exactly as a running engine applies it
+                deleted.add(positions.pop(internship_id))
+                if op == 'update':
+                    positions[internship_id] = len(result)
+                    result.append(internship)
+        except ValueError as e:
+            errors.append({'line': line_number, 'error': str(e)})
+    return [internship for position, internship in enumerate(result) if position not in deleted], errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Internship catalogue deltas')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    apply = subcommands.add_parser('apply', help='fold a delta file into a catalogue file')
+    apply.add_argument('catalogue', help='JSON or NDJSON catalogue to update in place')
+    apply.add_argument('delta', help='NDJSON delta file')
+    args = parser.parse_args(argv)
+
+    with open(args.catalogue, 'r', encoding='utf-8') as file:
+        if is_ndjson_path(args.catalogue):
+            internships = [json.loads(line) for line in file if line.strip()]
+        else:
+            internships = json.load(file)
+    with open(args.delta, 'r', encoding='utf-8') as file:
+        operations, errors = parse_delta_lines(file)
+    internships, apply_errors = apply_delta_to_catalogue(internships, operations)
+    errors.extend(apply_errors)
+
+    # Write a new file and rename it over the old one, so a running server
+    # (or its memory map) never sees a half-written catalogue
+    temporary_path = args.catalogue + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        if is_ndjson_path(args.catalogue):
+            file.writelines(json.dumps(internship, ensure_ascii=False) + '\n' for internship in internships)
+        else:
+            json.dump(internships, file, ensure_ascii=False, indent=2)
+    os.replace(temporary_path, args.catalogue)
+
+    for error in errors:
+        print(f"line {error['line']}: {error['error']}")
+    print(f"Wrote {len(internships)} internships to {args.catalogue} ({len(errors)} error(s))")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+from bisect import bisect_right
+from collections import Counter
+from itertools import chain
+from typing import List, Dict, Optional, Tuple
+
+from internship_record import InternshipRecord
+
+
+class CatalogueIndex:
+    """
+    Lookup structures over a loaded internship catalogue.
+
+    Built once per catalogue load, then kept up to date by add() and remove():
+    - id -> record hash map
+    - normalized sector -> posting positions
+    - normalized city -> posting positions
+    - requirement term -> posting positions, and the postings without
+      requirements (an inverted index for skill matching)
+    - a remote bitmap (one byte per posting) and remote / on-site posting lists
+    - (sector, city, remote) -> posting positions, used to intersect filters
+
+    Posting lists hold catalogue positions in ascending order, so search results
+    come back in catalogue order, exactly as a linear scan would return them.
+    Removed postings stay in the posting lists and are skipped through the
+    `active` bitmap until the catalogue is compacted.
+    """
+
+    def __init__(self, records: List[InternshipRecord]):
+        self.records = records
+        self.by_id: Dict[str, InternshipRecord] = {}
+        self.sector_ids: Dict[str, int] = {}
+        self.city_ids: Dict[str, int] = {}
+        self.sector_postings: Dict[int, List[int]] = {}
+        self.city_postings: Dict[int, List[int]] = {}
+        self.skill_postings: Dict[str, List[int]] = {}
+        self.open_postings: List[int] = []
+        self.remote = bytearray()
+        self.active = bytearray()
+        self.remote_postings: Dict[int, List[int]] = {0: [], 1: []}
+        self.groups: Dict[Tuple[int, int, int], List[int]] = {}
+        self.sector_counts: Counter = Counter()
+        self.removed = 0
+
+        for record in records:
+            self._add(record)
+        self.sectors = sorted(self.sector_counts)
+
+    def _add(self, record: InternshipRecord):
+        position = record.position
+        # Keep the first posting for duplicated ids, like a linear scan would
+        if record.id not in self.by_id:
+            self.by_id[record.id] = record
+
+        if record.sector_label:
+            self.sector_counts[record.sector_label] += 1
+
+        sector_id = self.sector_ids.setdefault(record.sector, len(self.sector_ids))
+        city_id = self.city_ids.setdefault(record.location, len(self.city_ids))
+        remote = 1 if record.is_remote else 0
+        self.remote.append(remote)
+        self.active.append(1)
+        self.remote_postings[remote].append(position)
+
+        self.sector_postings.setdefault(sector_id, []).append(position)
+        self.city_postings.setdefault(city_id, []).append(position)
+        if record.requirements:
+            for term in set(record.requirements):
+                self.skill_postings.setdefault(term, []).append(position)
+        else:
+            self.open_postings.append(position)
+        self.groups.setdefault((sector_id, city_id, remote), []).append(position)
+
+    def add(self, record: InternshipRecord):
+        """Index a record appended at the end of the catalogue"""
+        is_new_sector = record.sector_label and record.sector_label not in self.sector_counts
+        self._add(record)
+        if is_new_sector:
+            self.sectors = sorted(self.sector_counts)
+
+    def remove(self, record: InternshipRecord):
+        """Stop returning a record from lookups and searches"""
+        self.active[record.position] = 0
+        self.removed += 1
+        if self.by_id.get(record.id) is record:
+            del self.by_id[record.id]
+        if record.sector_label:
+            self.sector_counts[record.sector_label] -= 1
+            if self.sector_counts[record.sector_label] <= 0:
+                del self.sector_counts[record.sector_label]
+                self.sectors = sorted(self.sector_counts)
+
+    def get(self, internship_id: str) -> Optional[InternshipRecord]:
+        """Return the record with the given id, or None"""
+        return self.by_id.get(internship_id)
+
+    def search(self, sector: str = None, location: str = None, is_remote: bool = None) -> List[InternshipRecord]:
+        """Records matching every given filter, in catalogue order"""
+        positions = self._search_positions(sector, location, is_remote)
+        records, active = self.records, self.active
+        if positions is None:
+            if not self.removed:
+                return records[:len(active)]
+            positions = range(len(active))
+        elif not self.removed:
+            return [records[position] for position in positions]
+        return [records[position] for position in positions if active[position]]
+
+    def search_page(self, sector: str = None, location: str = None, is_remote: bool = None,
+                    after: int = -1, limit: int = None) -> Tuple[List[InternshipRecord], int, bool]:
+        """
+        Up to `limit` records matching every filter, after catalogue position `after`.
+
+        Returns the records in catalogue order, the total number of matching
+        records and whether more follow the returned ones.
+        """
+        positions = self._search_positions(sector, location, is_remote)
+        active = self.active
+        if positions is None:
+            positions = range(len(active))
+            total = len(positions) - self.removed
+        elif not self.removed:
+            total = len(positions)
+        else:
+            total = sum(1 for position in positions if active[position])
+
+        records, page = self.records, []
+        for index in range(bisect_right(positions, after), len(positions)):
+            position = positions[index]
+            if not active[position]:
+                continue
+            if limit is not None and len(page) == limit:
+                return page, total, True
+            page.append(records[position])
+        return page, total, False
+
+    def _search_positions(self, sector: str = None, location: str = None, is_remote: bool = None) -> Optional[List[int]]:
+        """Positions of the postings matching every filter, or None when nothing is filtered"""
+        sector_id = None
+        if sector:
+            sector_id = self.sector_ids.get(sector.lower())
+            if sector_id is None:
+                return []
+
+        city_ids = None
+        include_remote = False
+        if location:
+            location_lower = location.lower()
+            # Locations match by substring, so resolve the (few) distinct cities first
+            city_ids = {city_id for city, city_id in list(self.city_ids.items()) if location_lower in city}
+            include_remote = location_lower == 'remote'
+
+        wanted_remote = None if is_remote is None else (1 if is_remote else 0)
+
+        # Single-filter searches are served straight from a posting list
+        if city_ids is None and wanted_remote is None:
+            return self.sector_postings[sector_id] if sector_id is not None else None
+        if sector_id is None and wanted_remote is None and len(city_ids) == 1 and not include_remote:
+            return self.city_postings[next(iter(city_ids))]
+        if sector_id is None and city_ids is None:
+            return self.remote_postings[wanted_remote]
+
+        # Otherwise intersect filters over the (sector, city, remote) groups
+        matching = [
+            postings for (group_sector, group_city, group_remote), postings in list(self.groups.items())
+            if (sector_id is None or group_sector == sector_id)
+            and (city_ids is None or group_city in city_ids or (include_remote and group_remote))
+            and (wanted_remote is None or group_remote == wanted_remote)
+        ]
+        if len(matching) == 1:
+            return matching[0]
+        return sorted(chain.from_iterable(matching))
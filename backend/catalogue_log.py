@@ -0,0 +1,153 @@
+"""
+Catalogue changes shared by the processes of a server.
+
+Every gunicorn worker holds its own catalogue, but an admin delta or reload
+request reaches only one of them. With a catalogue log, that worker appends
+the change to a file shared by all processes instead of applying it directly,
+one JSON object per line:
+
+    {"delta": [{"op": "add", "internship": {...}}, ...], "id": "..."}
+    {"reload": "<log path>.catalogue-<id>.json", "source": [mtime_ns, size]}
+
+Every process applies the log's changes in order, on its follower thread (see
+CatalogueReloader). A reload names a copy of the catalogue taken once, by the
+process that requested it, so every process loads the same content however
+the data file changes meanwhile. Deltas apply deterministically, so all
+workers end up with the same catalogue, postings at the same positions.
+
+A reload replaces everything before it, so it is not appended but replaces
+the log (rotate): the log holds at most one reload, first, and the deltas
+since. A process that was still reading the previous log starts over with the
+new one. A log that grows past a size limit is compacted the same way, with a
+reload of a copy of the current catalogue.
+
+A log covers one run of the server; gunicorn.conf.py creates an empty one at
+start. Every process applies the log from its start: workers forked from a
+preloaded master continue from the master's place.
+"""
+import glob
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Tuple
+
+# Where a process is in the log: the log's first line, which tells a rotated log
+# from the one the process was reading, and the bytes of it applied
+Position = Tuple[bytes, int]
+
+
+def _first_line(data: bytes) -> bytes:
+    return data[:data.find(b'\n') + 1]
+
+
+class CatalogueLog:
+    """Log of catalogue changes in a file shared by server processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Position of the changes this process has applied
+        self.position: Position = (b'', 0)
+
+    @staticmethod
+    def _line(change: Dict[str, Any]) -> bytes:
+        return json.dumps(change, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+    def _open_locked(self) -> int:
+        """Descriptor of the log file, exclusively locked"""
+        import fcntl  # Unix only, like the pre-forking servers that need the log
+
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                current = None
+            # Unless the log was rotated while this process waited for the lock
+            opened = os.fstat(fd)
+            if current is not None and (current.st_ino, current.st_dev) == (opened.st_ino, opened.st_dev):
+                return fd
+            os.close(fd)
+
+    def append(self, change: Dict[str, Any]) -> Tuple[int, int]:
+        """Append a change; returns the (start, end) offsets of its line"""
+        line = self._line(change)
+        fd = self._open_locked()
+        try:
+            # Locked, so lines of concurrent appends never interleave
+            start = os.lseek(fd, 0, os.SEEK_END)
+            view = memoryview(line)
+            while view:
+                view = view[os.write(fd, view):]
+            return start, start + len(line)
+        finally:
+            os.close(fd)
+
+    def rotate(self, change: Dict[str, Any], position: Position = None) -> bool:
+        """
+        Replace the log with one holding just `change`, a reload, and remove
+        the catalogue copies of earlier reloads. With a `position`, only if
+        nothing was appended after it; returns whether the log was replaced.
+        """
+        line = self._line(change)
+        fd = self._open_locked()
+        try:
+            if position is not None:
+                generation, offset = position
+                if os.fstat(fd).st_size != offset or (offset and _first_line(os.pread(fd, len(generation), 0)) != generation):
+                    return False
+            temporary_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'wb') as file:
+                file.write(line)
+            os.replace(temporary_path, self.path)
+        finally:
+            os.close(fd)
+        # A process that has not loaded a replaced copy yet skips it for the new log's
+        for path in self.catalogue_paths():
+            if path != change['reload']:
+                _remove(path)
+        return True
+
+    def read(self, position: Position) -> List[Tuple[Position, Dict[str, Any]]]:
+        """(position after it, change) of every complete line after `position`"""
+        generation, offset = position
+        try:
+            with open(self.path, 'rb') as file:
+                first_line = file.readline()
+                if offset and first_line != generation:
+                    offset = 0  # Rotated: the new log starts with a reload replacing everything before it
+                if os.fstat(file.fileno()).st_size <= offset:
+                    return []
+                file.seek(offset)
+                data = file.read()
+        except FileNotFoundError:
+            return []
+
+        changes = []
+        start = offset
+        # A line without its newline is still being written
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            start += len(line)
+            changes.append(((first_line, start), json.loads(line)))
+        return changes
+
+    def catalogue_path(self, extension: str) -> str:
+        """A new path for the catalogue copy of a reload"""
+        return f'{self.path}.catalogue-{uuid.uuid4().hex}{extension}'
+
+    def catalogue_paths(self) -> List[str]:
+        return glob.glob(f'{glob.escape(self.path)}.catalogue-*')
+
+    def remove(self):
+        """Remove the log and its catalogue copies"""
+        for path in [self.path] + self.catalogue_paths():
+            _remove(path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
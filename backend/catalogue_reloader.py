@@ -0,0 +1,294 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from catalogue_log import CatalogueLog
+from catalogue_store import is_ndjson_path
+from recommendation_engine import RecommendationEngine
+
+# Size past which a catalogue log is compacted into a reload of the current catalogue
+LOG_MAX_BYTES = 64 * 1024 * 1024
+
+# Seconds an admin delta waits for this process to apply it
+APPLY_TIMEOUT = 60.0
+
+
+class CatalogueReloader:
+    """
+    Reloads an engine's catalogue in the background.
+
+    A reload builds a complete new catalogue state (records, indexes, encoded
+    arrays) on a background thread and installs it with one reference
+    assignment, so requests never wait for it or see a half-built catalogue.
+    Reloads are triggered explicitly (request_reload) or by a watcher thread
+    that polls the data file for changes every `watch_interval` seconds.
+
+    With a catalogue log (see catalogue_log), admin deltas and reloads go
+    through the log, and every process sharing it applies them on its follower
+    thread, polling the log every `log_interval` seconds. No request applies
+    the log: an admin delta waits for the follower thread to apply it.
+    """
+
+    def __init__(self, engine: RecommendationEngine, watch_interval: float = 0,
+                 log: CatalogueLog = None, log_interval: float = 1.0, log_max_bytes: int = LOG_MAX_BYTES,
+                 apply_timeout: float = APPLY_TIMEOUT):
+        self.engine = engine
+        self.watch_interval = watch_interval
+        self.log = log
+        self.log_interval = log_interval
+        self.log_max_bytes = log_max_bytes
+        self.apply_timeout = apply_timeout
+        self._lock = threading.Lock()
+        # Counts the follower's passes over the log, for callers waiting for the next one
+        self._passes = threading.Condition()
+        self._passes_started = 0
+        self._passes_done = 0
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        # Set when a delta of this process took the log past log_max_bytes
+        self._compact_pending = False
+        # Results of the deltas this process appended, by id, until collected
+        self._delta_results: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._reload_thread: Optional[threading.Thread] = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._follow_thread: Optional[threading.Thread] = None
+        self._file_signature = self._data_file_signature()
+        self.reloads = 0
+        self.last_reload_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _data_file_signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.engine.data_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self, path: str = None, signature: tuple = None):
+        """
+        Reload synchronously on the calling thread, from the data file or from
+        a copy of it at `path` made when the file had `signature`
+        """
+        if path is None:
+            signature = self._data_file_signature()
+        started = time.perf_counter()
+        try:
+            # Strict, so a missing or half-written file keeps the current catalogue
+            self.engine.reload(strict=True, path=path)
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        self.last_reload_seconds = time.perf_counter() - started
+        self.last_error = None
+        self.reloads += 1
+        if signature is not None:
+            self._file_signature = signature
+
+    def _reload_in_background(self):
+        try:
+            if self.log is None:
+                self.reload()
+            else:
+                self._publish_reload()
+        except Exception as e:
+            self.last_error = str(e)  # The previous catalogue stays in service
+        with self._lock:
+            self._reload_thread = None
+
+    def _publish_reload(self):
+        """Copy the data file and replace the catalogue log with a reload of the copy"""
+        signature = self._data_file_signature()
+        path = self.log.catalogue_path('.ndjson' if is_ndjson_path(self.engine.data_path) else '.json')
+        try:
+            shutil.copyfile(self.engine.data_path, path)
+            # Checked once here, so a file that does not load never reaches the other processes
+            self.engine.load_records(strict=True, path=path)
+            self.log.rotate({'reload': path, 'source': signature})
+        except Exception:
+            _remove(path)
+            raise
+        self._wake.set()
+
+    def request_reload(self) -> bool:
+        """
+        Start a background reload; returns False if one is already running.
+
+        With a catalogue log the reload copies the data file and replaces the
+        log with a reload of the copy, which every process (this one included)
+        then loads on its follower thread.
+        """
+        with self._lock:
+            if self._reload_thread is not None:
+                return False
+            self._reload_thread = threading.Thread(target=self._reload_in_background,
+                                                   name='catalogue-reload', daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def apply_delta(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply a catalogue delta (see RecommendationEngine.apply_delta).
+
+        With a catalogue log the delta is appended to it, so that every process
+        applies it, and this waits until this process's follower thread has.
+        """
+        if self.log is None:
+            return self.engine.apply_delta(operations)
+        self.start()
+        delta_id = uuid.uuid4().hex
+        with self._lock:
+            self._delta_results[delta_id] = None
+        _, end = self.log.append({'delta': operations, 'id': delta_id})
+        if end > self.log_max_bytes:
+            self._compact_pending = True
+        applied = self.wait_for_log(self.apply_timeout)
+        with self._lock:
+            result = self._delta_results.pop(delta_id)
+        if result is None:
+            raise RuntimeError(self.last_error or ('The delta was not applied' if applied else
+                                                   'The delta is logged but was not applied in time'))
+        return result
+
+    def wait_for_log(self, timeout: float = None) -> bool:
+        """Wait until the follower thread has applied the changes logged so far; False on timeout"""
+        if self.log is None:
+            return True
+        if not _alive(self._follow_thread):
+            return False
+        with self._passes:
+            # A pass already running may have read the log before the latest change
+            target = self._passes_started + 1
+        self._wake.set()
+        with self._passes:
+            return self._passes.wait_for(lambda: self._passes_done >= target, timeout)
+
+    def _apply_log(self):
+        """Apply the changes logged since this process last read the log"""
+        for position, change in self.log.read(self.log.position):
+            try:
+                if 'delta' in change:
+                    result = self.engine.apply_delta(change['delta'])
+                    with self._lock:
+                        if change.get('id') in self._delta_results:
+                            self._delta_results[change['id']] = result
+                elif change.get('reload'):
+                    signature = change.get('source')
+                    self.reload(change['reload'], tuple(signature) if signature else None)
+            except Exception as e:
+                # Every process applies the same change to the same catalogue; skip it like they do
+                self.last_error = str(e)
+            self.log.position = position
+        if self._compact_pending:
+            self._compact()
+
+    def _compact(self):
+        """Replace an oversized log with a reload of a copy of the catalogue it led to"""
+        if self.log.position[1] <= self.log_max_bytes:
+            self._compact_pending = False  # Another process compacted it
+            return
+        path = self.log.catalogue_path('.ndjson')
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                for record in self.engine.state.index.search():
+                    file.write(json.dumps(record.internship, ensure_ascii=False) + '\n')
+            # Only if nothing was logged after the changes this copy includes; else retried next pass
+            if not self.log.rotate({'reload': path}, self.log.position):
+                _remove(path)
+        except Exception:
+            _remove(path)
+            raise
+
+    def wait(self, timeout: float = None):
+        """Wait for a running background reload to finish, and for this process to load it"""
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+        self.wait_for_log(timeout)
+
+    def start(self):
+        """
+        Start watching the data file, if a watch interval is set, and following
+        the catalogue log, if there is one.
+
+        Threads do not survive fork, so pre-forking servers call this again in
+        each worker; it does nothing when this process is already watching.
+        """
+        watch = self.watch_interval > 0 and not _alive(self._watch_thread)
+        follow = self.log is not None and not _alive(self._follow_thread)
+        if not (watch or follow):
+            return
+        with self._lock:
+            # A reload thread inherited from a parent process never finishes here
+            if self._reload_thread is not None and not self._reload_thread.is_alive():
+                self._reload_thread = None
+            if watch and not _alive(self._watch_thread):
+                self._watch_thread = threading.Thread(target=self._watch, name='catalogue-watch', daemon=True)
+                self._watch_thread.start()
+            if follow and not _alive(self._follow_thread):
+                self._follow_thread = threading.Thread(target=self._follow, name='catalogue-log', daemon=True)
+                self._follow_thread.start()
+
+    def close(self):
+        """Stop the watcher and follower threads"""
+        self._closed.set()
+        self._wake.set()
+        for thread in (self._watch_thread, self._follow_thread):
+            if _alive(thread):
+                thread.join()
+
+    def _watch(self):
+        while not self._closed.wait(self.watch_interval):
+            signature = self._data_file_signature()
+            if signature == self._file_signature:
+                continue
+            # Every process watches the file; one reload of it in the log is enough
+            if self.log is None or not any(change.get('source') == list(signature or ())
+                                           for _, change in self.log.read(self.log.position)):
+                self.request_reload()
+
+    def _follow(self):
+        while not self._closed.is_set():
+            # Cleared first, so a change logged during the pass wakes the next one
+            self._wake.clear()
+            with self._passes:
+                self._passes_started += 1
+                started = self._passes_started
+            try:
+                self._apply_log()
+            except Exception as e:
+                self.last_error = str(e)  # E.g. an unreadable log; retried on the next poll
+            with self._passes:
+                self._passes_done = started
+                self._passes.notify_all()
+            self._wake.wait(self.log_interval)
+
+    def status(self) -> Dict[str, Any]:
+        """Version and reload timings of the catalogue in service"""
+        state = self.engine.state
+        return {
+            'version': state.version,
+            'loaded_at': state.loaded_at.isoformat(timespec='seconds'),
+            'internships': len(state.records) - state.index.removed,
+            'build_ms': round(state.build_seconds * 1000, 1),
+            'last_reload_ms': round(self.last_reload_seconds * 1000, 1) if self.last_reload_seconds is not None else None,
+            'reloads': self.reloads,
+            'reloading': self._reload_thread is not None,
+            'last_error': self.last_error,
+            'watching': _alive(self._watch_thread),
+            'log_offset': self.log.position[1] if self.log is not None else None
+        }
+
+
+def _alive(thread: Optional[threading.Thread]) -> bool:
+    return thread is not None and thread.is_alive()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,297 @@
+"""
+Binary snapshots of a prepared catalogue, for fast startup.
+
+Building a catalogue state parses the data file, normalizes every posting
+into an InternshipRecord and builds the indexes (and, in the vectorized mode,
+the encoded arrays). A snapshot stores the result, so later starts only have
+to unpickle it. A snapshot file holds:
+
+- a header line (JSON) with the format, the scoring mode and the content
+  hashes of the data file, gazetteer, skill aliases and code it
+  was built from;
+- every posting as one compact JSON line, like an NDJSON catalogue;
+- the pickled records, CatalogueIndex and VectorizedScorer, where records
+  keep only their scoring fields and the byte range of their posting line;
+- the NumPy arrays these refer to, in the .npy format (np.save), outside
+  the pickle;
+- the offsets of the pickle and the arrays, as 8 bytes each at the end.
+
+The snapshot is memory-mapped like an NDJSON catalogue, so full postings are
+parsed from it when they are returned rather than kept in memory. A snapshot
+is only used when the hashes of the data file, gazetteer, skill aliases and
+code, the scoring mode and the record layout all match;
+otherwise the catalogue is built from the data file and the snapshot
+rewritten. The pickle may only refer to the application's own catalogue
+classes and a few builtins, and arrays are loaded without pickle support,
+but still only load snapshots written by this application, from a directory
+other users cannot write to.
+
+Build one ahead of time (e.g. in the deployment's build step) with:
+
+    python backend/catalogue_snapshot.py build data/sample_internships.json data/catalogue.snapshot
+"""
+import argparse
+import gc
+import hashlib
+import io
+import json
+import os
+import pickle
+import struct
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from catalogue_store import NdjsonCatalogue
+from gazetteer import GAZETTEER
+from internship_record import InternshipRecord
+from skill_vocabulary import SKILLS
+
+SNAPSHOT_MAGIC = b'PMI-CATALOGUE-SNAPSHOT\n'
+SNAPSHOT_FORMAT = 2
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose objects a snapshot holds: it is only loaded by the code that wrote it
+SNAPSHOT_MODULES = ('catalogue_snapshot', 'catalogue_index', 'internship_record', 'vectorized_scoring',
+                    'skill_vocabulary', 'gazetteer')
+
+# Fields restored for every record; the full posting is read from the snapshot
+RECORD_FIELDS = ('id', 'sector_label', 'sector', 'location', 'place', 'is_remote', 'requirements',
+                 'has_education_preference', 'preferred_education', 'min_education_level')
+
+_TRAILER = struct.Struct('<QQ')
+
+# Stands for the snapshot file in pickled records
+_SNAPSHOT_SOURCE = object()
+
+# Classes a snapshot may contain, by module
+_SNAPSHOT_CLASSES = {
+    'builtins': {'bytearray', 'frozenset', 'set'},
+    'collections': {'Counter'},
+    'catalogue_index': {'CatalogueIndex'},
+    'vectorized_scoring': {'VectorizedScorer'}
+}
+
+
+def file_hash(path: str) -> str:
+    """Content hash of a file"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_digest() -> str:
+    """Content hash of the modules whose objects a snapshot holds"""
+    digest = hashlib.blake2b(digest_size=16)
+    for module in SNAPSHOT_MODULES:
+        with open(os.path.join(BACKEND_DIR, f'{module}.py'), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+SNAPSHOT_CODE = code_digest()
+
+
+def snapshot_header(source_hash: str, scoring_mode: str, postings: int) -> Dict[str, Any]:
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'code': SNAPSHOT_CODE,
+        'source_hash': source_hash,
+        'scoring_mode': scoring_mode,
+        'record_fields': list(RECORD_FIELDS),
+        # Records hold gazetteer place ids
+        'gazetteer': GAZETTEER.digest,
+        # Skill matches depend on the aliases
+        'skills': SKILLS.digest,
+        'postings': postings
+    }
+
+
+def restore_record(source, position: int, offset: int, length: int, *fields) -> InternshipRecord:
+    record = InternshipRecord.__new__(InternshipRecord)
+    record.position = position
+    record._internship = None
+    record.source = source
+    record.offset = offset
+    record.length = length
+    record.encoded = None
+    for name, value in zip(RECORD_FIELDS, fields):
+        setattr(record, name, value)
+    # Set with the vocabulary of the catalogue state the records are installed in
+    record.skill_mask = 0
+    return record
+
+
+class SnapshotPickler(pickle.Pickler):
+    """
+    Pickles records as their scoring fields and posting line; the engine and
+    the snapshot file by reference, and NumPy arrays as their number in `arrays`
+    """
+
+    def __init__(self, file, engine, line_ranges):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.engine = engine
+        self.line_ranges = line_ranges
+        # Only catalogues with encoded arrays or embeddings hold arrays, and need NumPy
+        self.ndarray = getattr(sys.modules.get('numpy'), 'ndarray', None)
+        self.arrays = []
+
+    def persistent_id(self, obj):
+        if obj is self.engine:
+            return 'engine'
+        if obj is _SNAPSHOT_SOURCE:
+            return 'source'
+        if self.ndarray is not None and type(obj) is self.ndarray:
+            self.arrays.append(obj)
+            return ('array', len(self.arrays) - 1)
+        return None
+
+    def reducer_override(self, obj):
+        if type(obj) is InternshipRecord:
+            offset, length = self.line_ranges[obj.position]
+            return restore_record, (_SNAPSHOT_SOURCE, obj.position, offset, length,
+                                    *(getattr(obj, name) for name in RECORD_FIELDS))
+        return NotImplemented
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, engine, source, arrays):
+        super().__init__(file)
+        self.references = {'engine': engine, 'source': source}
+        self.arrays = arrays
+
+    def persistent_load(self, reference):
+        if isinstance(reference, tuple) and reference[0] == 'array':
+            return self.arrays[reference[1]]
+        return self.references[reference]
+
+    def find_class(self, module, name):
+        # Restricted to what snapshots contain; arrays are stored outside the pickle
+        if module == 'catalogue_snapshot' and name == 'restore_record':
+            return restore_record
+        if name in _SNAPSHOT_CLASSES.get(module, ()):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Unexpected class in catalogue snapshot: {module}.{name}")
+
+
+def read_arrays(data, start: int, end: int) -> list:
+    """The arrays of a snapshot, written one after the other with np.save"""
+    if start == end:
+        return []
+    import numpy as np  # Only catalogues with encoded arrays or embeddings hold arrays
+
+    stream = io.BytesIO(data[start:end])
+    arrays = []
+    while stream.tell() < end - start:
+        # Plain arrays only: an object array would need unpickling
+        arrays.append(np.load(stream, allow_pickle=False))
+    return arrays
+
+
+def write_snapshot(path: str, engine, state, source_hash: str):
+    """Write the snapshot of a freshly built catalogue state (before any delta), atomically"""
+    records = state.records
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary_path, 'wb') as file:
+            file.write(SNAPSHOT_MAGIC)
+            header = snapshot_header(source_hash, engine.scoring_mode, len(records))
+            file.write(json.dumps(header).encode('utf-8') + b'\n')
+            line_ranges = []
+            for record in records:
+                if record.source is not None:
+                    # Already one JSON line in an NDJSON catalogue
+                    line = record.source.line(record.offset, record.length)
+                else:
+                    line = json.dumps(record.internship, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                line_ranges.append((file.tell(), len(line)))
+                file.write(line + b'\n')
+
+            state_offset = file.tell()
+            pickler = SnapshotPickler(file, engine, line_ranges)
+            pickler.dump((records, state.index, state.vectorized_scorer))
+            arrays_offset = file.tell()
+            if pickler.arrays:
+                import numpy as np
+                for array in pickler.arrays:
+                    np.save(file, array, allow_pickle=False)
+            file.write(_TRAILER.pack(state_offset, arrays_offset))
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def read_snapshot(path: str, engine, source_hash: str) -> Optional[Tuple[list, Any, Any]]:
+    """
+    The (records, index, vectorized scorer) of a snapshot, or None if there is
+    no snapshot or it does not match the data file, scoring mode or code
+    """
+    try:
+        source = NdjsonCatalogue(path)
+    except OSError:
+        return None
+    snapshot = _load_snapshot(source, engine, source_hash)
+    if snapshot is None:
+        # Nothing refers to the mapping of a rejected snapshot
+        source.close()
+    return snapshot
+
+
+def _load_snapshot(source: NdjsonCatalogue, engine, source_hash: str) -> Optional[Tuple[list, Any, Any]]:
+    data = source.data
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or len(data) < len(SNAPSHOT_MAGIC) + _TRAILER.size:
+        return None
+    header_end = data.find(b'\n', len(SNAPSHOT_MAGIC))
+    try:
+        header = json.loads(data[len(SNAPSHOT_MAGIC):header_end])
+    except ValueError:
+        return None
+    if header != snapshot_header(source_hash, engine.scoring_mode, header.get('postings')):
+        return None
+
+    end = len(data) - _TRAILER.size
+    state_offset, arrays_offset = _TRAILER.unpack(data[end:])
+    # Unpickling creates a lot of objects and no garbage; collecting meanwhile only slows it down
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        arrays = read_arrays(data, arrays_offset, end)
+        state = io.BytesIO(data[state_offset:arrays_offset])
+        records, index, vectorized_scorer = SnapshotUnpickler(state, engine, source, arrays).load()
+    except Exception:
+        return None  # e.g. written by a different version of the code
+    finally:
+        if collecting:
+            gc.enable()
+    return records, index, vectorized_scorer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Catalogue snapshot tools')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='build the snapshot of a catalogue')
+    build.add_argument('source', help='JSON or NDJSON catalogue, e.g. data/sample_internships.json')
+    build.add_argument('target', help='snapshot file to write')
+    build.add_argument('--scoring-mode', default=os.environ.get('SCORING_MODE', 'scalar'),
+                       help='scoring mode the server runs with (default: SCORING_MODE or scalar)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from recommendation_engine import RecommendationEngine
+        started = time.perf_counter()
+        # Writes the snapshot unless an up-to-date one exists
+        engine = RecommendationEngine(scoring_mode=args.scoring_mode, data_path=args.source,
+                                      snapshot_path=args.target)
+        if not engine.records:
+            parser.error(f"No internships could be loaded from {args.source}")
+        print(f"Snapshot of {len(engine.records)} internships in {args.target} "
+              f"({time.perf_counter() - started:.2f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Line-delimited (NDJSON) internship catalogues.
+
+Each line of a `.ndjson` / `.jsonl` catalogue holds one internship object as in
+data/sample_internships.json. The file is memory-mapped and streamed once at
+load time: only the scoring fields of each posting stay resident (as an
+InternshipRecord with the byte offset of its line), and the full posting is
+parsed again from the mapping when it is returned to a client.
+
+Convert an existing JSON catalogue with:
+
+    python backend/catalogue_store.py convert data/sample_internships.json data/internships.ndjson
+"""
+import argparse
+import json
+import mmap
+import os
+from typing import List, Dict, Any, Iterator, Tuple
+
+from internship_record import InternshipRecord
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+
+def is_ndjson_path(path: str) -> bool:
+    """Whether a catalogue path uses the line-delimited format"""
+    return path.lower().endswith(NDJSON_EXTENSIONS)
+
+
+class NdjsonCatalogue:
+    """A memory-mapped NDJSON catalogue file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                self._map = b''
+            else:
+                # The mapping stays valid after the file object is closed
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def data(self):
+        """The mapped contents of the file"""
+        return self._map
+
+    def close(self):
+        """Unmap the file; its postings can no longer be fetched"""
+        if not isinstance(self._map, bytes):
+            self._map.close()
+        self._map = b''
+
+    def iter_lines(self) -> Iterator[Tuple[int, int]]:
+        """Yield (offset, length) of every non-blank line"""
+        data = self._map
+        size = len(data)
+        offset = 0
+        while offset < size:
+            end = data.find(b'\n', offset)
+            if end == -1:
+                end = size
+            if data[offset:end].strip():
+                yield offset, end - offset
+            offset = end + 1
+
+    def line(self, offset: int, length: int) -> bytes:
+        """The JSON line of the posting stored at a byte range"""
+        return self._map[offset:offset + length]
+
+    def fetch(self, offset: int, length: int) -> Dict[str, Any]:
+        """Parse the posting stored at a byte range"""
+        return json.loads(self.line(offset, length))
+
+    def load_records(self) -> List[InternshipRecord]:
+        """Stream the file into records that keep only their scoring fields resident"""
+        records = []
+        for offset, length in self.iter_lines():
+            # The parsed posting is dropped as soon as its record is built
+            records.append(InternshipRecord(len(records), self.fetch(offset, length),
+                                            source=self, offset=offset, length=length))
+        return records
+
+
+def convert_json_to_ndjson(source_path: str, target_path: str) -> int:
+    """Convert a JSON array catalogue into NDJSON; returns the number of postings written"""
+    with open(source_path, 'r', encoding='utf-8') as file:
+        internships = json.load(file)
+
+    temporary_path = target_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        for internship in internships:
+            file.write(json.dumps(internship, ensure_ascii=False, separators=(',', ':')))
+            file.write('\n')
+    os.replace(temporary_path, target_path)
+    return len(internships)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Internship catalogue tools')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    convert = subcommands.add_parser('convert', help='convert a JSON array catalogue to NDJSON')
+    convert.add_argument('source', help='JSON catalogue, e.g. data/sample_internships.json')
+    convert.add_argument('target', help='NDJSON catalogue to write')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        count = convert_json_to_ndjson(args.source, args.target)
+        print(f"Wrote {count} internships to {args.target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Offline gazetteer of Indian cities, for location proximity scoring.
+
+data/india_gazetteer.json lists cities and district headquarters with their
+state, approximate coordinates and alternative names. Locations are resolved
+to a place id once (when a record is loaded, or per request for candidates),
+and the proximity of two places is a lookup in a table of distance bands:
+the row of one place holds its proximity score to every other place, and is
+computed the first time that place is looked up. Scoring a posting is then
+O(1), whatever the size of the gazetteer.
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+from typing import Dict, List, Optional
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'data', 'india_gazetteer.json')
+
+# (distance up to, in km, location score), from the nearest band
+DISTANCE_BANDS = (
+    (50, 80),   # Same metropolitan area
+    (200, 60),  # Commutable or a short trip
+    (500, 40)   # Same part of the country
+)
+# Score of places in the same state beyond those bands
+SAME_STATE_SCORE = 40
+# Score of distant places, and of locations that are not in the gazetteer
+DISTANT_SCORE = 20
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def _normalize(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two coordinates, in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distance_score(distance_km: float, same_state: bool) -> int:
+    """Location score of a place at a given distance"""
+    for limit, score in DISTANCE_BANDS:
+        if distance_km <= limit:
+            return score
+    return SAME_STATE_SCORE if same_state else DISTANT_SCORE
+
+
+class Gazetteer:
+    """Places with coordinates, name lookup and a lazily filled proximity table"""
+
+    def __init__(self, places: List[Dict], digest: str = ''):
+        self.names: List[str] = []
+        self.states: List[str] = []
+        self.coordinates: List[tuple] = []
+        self.place_ids: Dict[str, int] = {}
+        # Content hash of the gazetteer file; place ids are only comparable between equal digests
+        self.digest = digest
+        # Place id -> proximity score to every place id
+        self._rows: Dict[int, bytes] = {}
+
+        for place in places:
+            place_id = len(self.names)
+            self.names.append(place['name'])
+            self.states.append(place['state'])
+            self.coordinates.append((float(place['lat']), float(place['lon'])))
+            for name in [place['name'], *place.get('aliases', [])]:
+                # The first place keeps an ambiguous name
+                self.place_ids.setdefault(sys.intern(_normalize(name)), place_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve(self, location: str) -> Optional[int]:
+        """
+        Place id of a location such as "Pune" or "Pune, Maharashtra", or None
+        if it is not in the gazetteer
+        """
+        if not location:
+            return None
+        normalized = _normalize(location)
+        place_id = self.place_ids.get(normalized)
+        if place_id is None and ',' in normalized:
+            place_id = self.place_ids.get(normalized.split(',', 1)[0].strip())
+        return place_id
+
+    def proximity_row(self, place_id: int) -> bytes:
+        """Proximity score of a place to every place, by place id"""
+        row = self._rows.get(place_id)
+        if row is None:
+            lat, lon = self.coordinates[place_id]
+            state = self.states[place_id]
+            row = bytes(distance_score(haversine_km(lat, lon, other_lat, other_lon), state == other_state)
+                        for (other_lat, other_lon), other_state in zip(self.coordinates, self.states))
+            # Rows are immutable, so concurrent requests at worst compute one twice
+            self._rows[place_id] = row
+        return row
+
+    def proximity(self, place_a: Optional[int], place_b: Optional[int]) -> int:
+        """Location score of two resolved places; DISTANT_SCORE if either is unknown"""
+        if place_a is None or place_b is None:
+            return DISTANT_SCORE
+        return self.proximity_row(place_a)[place_b]
+
+
+def load_gazetteer(path: str = DEFAULT_GAZETTEER_PATH) -> Gazetteer:
+    with open(path, 'rb') as file:
+        content = file.read()
+    return Gazetteer(json.loads(content)['places'], hashlib.blake2b(content, digest_size=16).hexdigest())
+
+
+# Shared by records, candidate profiles and the engine
+GAZETTEER = load_gazetteer()
@@ -0,0 +1,128 @@
+import sys
+from typing import List, Dict, Any, Optional
+
+from gazetteer import GAZETTEER
+from skill_vocabulary import SkillVocabulary
+
+# Education levels from lowest to highest
+EDUCATION_LEVELS = ('10th', '12th', 'diploma', 'undergraduate', 'postgraduate')
+EDUCATION_LEVEL_INDEX = {level: index for index, level in enumerate(EDUCATION_LEVELS)}
+
+
+def _normalize(value: str) -> str:
+    """Lowercase and intern a string so equal values share one object"""
+    return sys.intern(value.lower())
+
+
+class InternshipRecord:
+    """
+    Scoring view of one internship, normalized once at load time.
+
+    Holds lowercased and interned fields, the lowest preferred education level
+    as an int, the gazetteer place id of the location and the requirements as
+    a bitmask of the terms of its catalogue's skill vocabulary (set when the
+    record is installed in a catalogue state), so scoring does no string work. The
+    original dict is what the API returns, via `internship`. It is either kept
+    in memory or, for records loaded from a catalogue file with a `source`,
+    re-read from that file on access so that descriptions, benefits and
+    contact details are only resident for the postings being returned.
+    """
+
+    __slots__ = ('position', '_internship', 'source', 'offset', 'length', 'id', 'sector_label',
+                 'sector', 'location', 'place', 'is_remote', 'requirements', 'skill_mask',
+                 'has_education_preference', 'preferred_education', 'min_education_level', 'encoded')
+
+    def __init__(self, position: int, internship: Dict[str, Any], source=None, offset: int = 0, length: int = 0):
+        self.position = position
+        self._internship = internship if source is None else None
+        self.source = source
+        self.offset = offset
+        self.length = length
+        self.id = internship.get('id')
+        self.sector_label = internship.get('sector', '')
+        self.sector = _normalize(self.sector_label)
+        self.location = _normalize(internship.get('location', ''))
+        self.place = GAZETTEER.resolve(self.location)
+        self.is_remote = bool(internship.get('is_remote', False))
+
+        # Duplicates are kept: the skills score is a fraction of all requirements
+        self.requirements = tuple(_normalize(skill) for skill in internship.get('requirements', []))
+        # Bitmask of the vocabulary ids of the distinct requirements, in the vocabulary of
+        # the catalogue state the record is installed in (see skill_vocabulary)
+        self.skill_mask = 0
+
+        preferred_education = internship.get('preferred_education', [])
+        self.has_education_preference = bool(preferred_education)
+        self.preferred_education = frozenset(_normalize(level) for level in preferred_education)
+        levels = [EDUCATION_LEVEL_INDEX[level] for level in self.preferred_education if level in EDUCATION_LEVEL_INDEX]
+        self.min_education_level = min(levels) if levels else None
+
+        # Pre-encoded JSON members of the internship, made on first use (see json_serializer)
+        self.encoded = None
+
+    @property
+    def internship(self) -> Dict[str, Any]:
+        """The full internship dict, as loaded from the catalogue"""
+        if self._internship is not None:
+            return self._internship
+        return self.source.fetch(self.offset, self.length)
+
+    def relocated(self, position: int) -> 'InternshipRecord':
+        """A copy of this record at another catalogue position"""
+        record = InternshipRecord.__new__(InternshipRecord)
+        for slot in InternshipRecord.__slots__:
+            setattr(record, slot, getattr(self, slot))
+        record.position = position
+        return record
+
+    def scoring_copy(self) -> 'InternshipRecord':
+        """A copy with the scoring fields only, without the internship dict or its source"""
+        record = self.relocated(self.position)
+        record._internship = record.source = record.encoded = None
+        return record
+
+
+class Recommendation(dict):
+    """An internship dict with its match score and reason, and the record it was built from"""
+
+    __slots__ = ('record',)
+
+    def __init__(self, record: InternshipRecord, score: int, reason: str):
+        super().__init__(record.internship)
+        self['match_score'] = score
+        self['match_reason'] = reason
+        self.record = record
+
+
+class CandidateProfile:
+    """
+    Candidate profile normalized once per request.
+
+    Also carries per-request memo tables, so each distinct requirement list,
+    sector, location and education preference is scored at most once. Skills
+    are compared with each term of the skill vocabulary of the catalogue being
+    scored at most once, as the bitmask of the terms they match: filled in on
+    first use, and extended to terms added meanwhile.
+    """
+
+    __slots__ = ('skills', 'interests', 'location', 'place', 'education', 'education_level',
+                 'vocabulary', 'skill_forms', 'skill_mask', 'skill_terms_checked',
+                 'skill_scores', 'sector_scores', 'location_scores', 'education_scores')
+
+    def __init__(self, candidate_profile: Dict[str, Any], vocabulary: SkillVocabulary):
+        self.skills: List[str] = [skill.lower() for skill in candidate_profile.get('skills') or []]
+        self.interests: List[str] = [interest.lower() for interest in candidate_profile.get('interests') or []]
+        self.location: str = (candidate_profile.get('location') or '').lower()
+        self.place: Optional[int] = GAZETTEER.resolve(self.location)
+        self.education: str = (candidate_profile.get('education') or '').lower()
+        self.education_level: Optional[int] = EDUCATION_LEVEL_INDEX.get(self.education)
+
+        # Vocabulary of the catalogue state the profile is scored against
+        self.vocabulary = vocabulary
+        self.skill_forms = vocabulary.candidate_forms(self.skills)
+        self.skill_mask = 0
+        self.skill_terms_checked = 0
+        self.skill_scores: Dict[tuple, float] = {}
+        self.sector_scores: Dict[str, float] = {}
+        self.location_scores: Dict[tuple, float] = {}
+        self.education_scores: Dict[frozenset, float] = {}
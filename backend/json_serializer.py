@@ -0,0 +1,130 @@
+"""
+JSON encoding of API responses.
+
+JsonSerializer encodes compact JSON with sorted keys, byte for byte like
+jsonify, using orjson when it is installed and the standard library
+otherwise. Like jsonify, both write non-ASCII characters as \\u escapes
+(orjson's UTF-8 output is escaped afterwards, only when it is not ASCII).
+
+Internships never change once loaded, so the encoding of each record held in
+memory is made once and kept on the record. A recommendation is then encoded
+by joining the record's pre-encoded members with its `match_reason` and
+`match_score`, which sort between them. Encoded marks such ready-made JSON;
+dumps returns it unchanged, so stream_json can splice it into a response.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from internship_record import InternshipRecord, Recommendation
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used instead
+    orjson = None
+
+SERIALIZERS = ('auto', 'orjson', 'stdlib')
+
+# Characters escaped in ASCII-only JSON output
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+# Distinct match reasons whose encoding is kept (they come from a few templates per sector)
+MAX_ENCODED_REASONS = 4096
+
+
+def _escape(match) -> str:
+    code = ord(match.group())
+    if code < 0x10000:
+        return '\\u%04x' % code
+    # As a UTF-16 surrogate pair, like json.dumps
+    code -= 0x10000
+    return '\\u%04x\\u%04x' % (0xd800 | (code >> 10), 0xdc00 | (code & 0x3ff))
+
+
+def ascii_json(data: bytes) -> bytes:
+    """UTF-8 encoded JSON with its non-ASCII characters (only found in strings) written as \\u escapes"""
+    if data.isascii():
+        return data
+    return _NON_ASCII.sub(_escape, data.decode('utf-8')).encode('ascii')
+
+
+class Encoded(bytes):
+    """Bytes that are already JSON"""
+
+    __slots__ = ()
+
+
+class JsonSerializer:
+    """Compact, key-sorted JSON encoder with a fast backend and pre-encoded internships"""
+
+    def __init__(self, name: str = 'auto', default: Optional[Callable[[Any], Any]] = None):
+        if name not in SERIALIZERS:
+            raise ValueError(f"Unknown JSON serializer: {name}")
+        if name == 'orjson' and orjson is None:
+            raise ValueError('The orjson serializer needs the orjson package')
+        if name == 'auto':
+            name = 'orjson' if orjson is not None else 'stdlib'
+        self.name = name
+        # Converts values neither backend can encode (e.g. Flask's handling of dates)
+        self.default = default
+        self._reasons: Dict[str, bytes] = {}
+
+    def dumps(self, value: Any) -> bytes:
+        """Encode a value; Encoded values are returned as they are"""
+        if type(value) is Encoded:
+            return value
+        if type(value) is Recommendation:
+            return self.recommendation(value)
+        if self.name == 'orjson':
+            try:
+                return ascii_json(orjson.dumps(value, default=self.default, option=orjson.OPT_SORT_KEYS))
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits or non-string keys: the standard library handles them
+        return json.dumps(value, default=self.default, separators=(',', ':'), sort_keys=True).encode('ascii')
+
+    def internship_members(self, record: InternshipRecord) -> Optional[Tuple[bytes, bytes]]:
+        """
+        The encoded members of a record's internship that sort before and after
+        `match_reason` / `match_score`, without braces; made once per record.
+        None for records held in a catalogue file, and for internships with
+        keys that sort between (or are) those two.
+        """
+        if record.encoded is not None or record.source is not None:
+            # Records read from a catalogue file on demand are not kept in memory, nor is their JSON
+            return record.encoded or None
+        internship = record.internship
+        before, after = [], []
+        for key in sorted(internship):
+            if key < 'match_reason':
+                before.append(self.dumps(key) + b':' + self.dumps(internship[key]))
+            elif key > 'match_score':
+                after.append(self.dumps(key) + b':' + self.dumps(internship[key]))
+            else:
+                record.encoded = False
+                return None
+        record.encoded = (b','.join(before), b','.join(after))
+        return record.encoded
+
+    def internship(self, record: InternshipRecord) -> Encoded:
+        """A record's internship, encoded"""
+        members = self.internship_members(record)
+        if members is None:
+            return Encoded(self.dumps(record.internship))
+        before, after = members
+        return Encoded(b'{%s%s%s}' % (before, b',' if before and after else b'', after))
+
+    def recommendation(self, recommendation: Recommendation) -> bytes:
+        """A recommendation, encoded from its record's pre-encoded members (it must not have been modified)"""
+        members = self.internship_members(recommendation.record)
+        if members is None:
+            return self.dumps(dict(recommendation))
+        before, after = members
+        reason = recommendation['match_reason']
+        encoded_reason = self._reasons.get(reason)
+        if encoded_reason is None:
+            if len(self._reasons) >= MAX_ENCODED_REASONS:
+                self._reasons.clear()
+            encoded_reason = self._reasons[reason] = self.dumps(reason)
+        return b'{%s%s"match_reason":%s,"match_score":%s%s%s}' % (
+            before, b',' if before else b'', encoded_reason, self.dumps(recommendation['match_score']),
+            b',' if after else b'', after)
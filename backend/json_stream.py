@@ -0,0 +1,63 @@
+"""
+Chunked JSON encoding for large responses.
+
+stream_json writes a JSON object whose list members may be iterators, one
+item at a time, so a response listing the whole catalogue is never built
+in memory. The output is byte-for-byte what jsonify produces for the same
+object (keys sorted, compact separators, trailing newline), chunked into
+pieces of about `chunk_size` bytes.
+"""
+import collections.abc
+from typing import Any, Callable, Dict, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+
+def stream_json(payload: Dict[str, Any], dumps: Callable[[Any], bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encode `payload` as JSON in chunks.
+
+    Values that are iterators (e.g. generators) are written as arrays, item
+    by item; every other value and every array item is encoded with `dumps`,
+    which must produce compact, key-sorted, UTF-8 encoded JSON.
+    """
+    buffer, size = [], 0
+
+    def write(data: bytes):
+        nonlocal size
+        buffer.append(data)
+        size += len(data)
+
+    def flush() -> bytes:
+        nonlocal buffer, size
+        chunk = b''.join(buffer)
+        buffer, size = [], 0
+        return chunk
+
+    write(b'{')
+    for number, key in enumerate(sorted(payload)):
+        value = payload[key]
+        if number:
+            write(b',')
+        write(dumps(key))
+        write(b':')
+        if isinstance(value, collections.abc.Iterator):
+            write(b'[')
+            for index, item in enumerate(value):
+                if index:
+                    write(b',')
+                write(dumps(item))
+                if size >= chunk_size:
+                    yield flush()
+            write(b']')
+        else:
+            write(dumps(value))
+    write(b'}\n')
+    yield flush()
+
+
+def project(internship: Dict[str, Any], fields) -> Dict[str, Any]:
+    """The given fields of an internship (all of them when fields is None)"""
+    if fields is None:
+        return internship
+    return {field: internship[field] for field in fields if field in internship}
@@ -0,0 +1,243 @@
+"""
+Prometheus metrics in the text exposition format, without dependencies.
+
+A MetricsRegistry holds counters, gauges and histograms (each with optional
+labels), plus callback metrics whose samples are read when /metrics is
+scraped, such as cache counters kept elsewhere. Metrics are kept per process:
+with several gunicorn workers every scrape sees the worker that served it.
+
+ScoringMetrics times RecommendationEngine scoring: every call, and the time
+spent in each scoring phase (skills, sector, location and education matching,
+selecting the top k, explaining the winners) for a sample of requests, as
+timing every posting of the scalar mode costs about as much as scoring it.
+"""
+import bisect
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds (seconds) of request latency buckets, and of scoring phase buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Labels = Tuple[str, ...]
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(str(value))}"' for name, value in zip(names, values)) + '}'
+
+
+class Metric(ABC):
+    """One metric family: a name, a help text and samples per label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterable[Tuple[str, Labels, Tuple[str, ...], float]]:
+        """(name suffix, label values, (extra label name, value, ...), value) of every sample"""
+
+    def render(self) -> List[str]:
+        help_text = self.help_text.replace('\\', '\\\\').replace('\n', '\\n')
+        lines = [f'# HELP {self.name} {help_text}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, extra, value in self.samples():
+            names = self.label_names + extra[0::2]
+            values = labels + extra[1::2]
+            lines.append(f'{self.name}{suffix}{format_labels(names, values)} {format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    """A value that only goes up"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [('', labels, (), value) for labels, value in values]
+
+
+class Gauge(Counter):
+    """A value that goes up and down"""
+
+    kind = 'gauge'
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """Observations counted in cumulative buckets, with their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket (the last one is +Inf)..., sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[bucket] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        samples = []
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', labels, ('le', format_value(bound)), cumulative))
+            samples.append(('_sum', labels, (), counts[-1]))
+            samples.append(('_count', labels, (), cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """A counter or gauge whose samples are read from `collect` on every scrape"""
+
+    def __init__(self, kind: str, name: str, help_text: str, collect: Callable[[], Iterable[Tuple[Labels, float]]],
+                 label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self):
+        return [('', labels, (), value) for labels, value in self.collect()]
+
+
+class MetricsRegistry:
+    """The metrics of one process, rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def callback(self, kind: str, name: str, help_text: str, collect: Callable[[], Iterable[Tuple[Labels, float]]],
+                 label_names: Sequence[str] = ()) -> CallbackMetric:
+        return self.register(CallbackMetric(kind, name, help_text, collect, label_names))
+
+    def render(self) -> bytes:
+        """Every metric in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class PhaseTimer:
+    """Time spent in the named phases of one scoring call"""
+
+    __slots__ = ('totals', '_last')
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        """Add the time since the previous lap (or since the timer started) to `phase`"""
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def skip(self):
+        """Start the next lap now: the time since the previous lap is not counted"""
+        self._last = time.perf_counter()
+
+    def timed(self, phase: str, function: Callable) -> Callable:
+        """`function`, adding the time of every call to `phase`"""
+        totals, clock = self.totals, time.perf_counter
+
+        def timed_function(*args):
+            started = clock()
+            result = function(*args)
+            totals[phase] = totals.get(phase, 0.0) + clock() - started
+            return result
+        return timed_function
+
+
+class ScoringMetrics:
+    """Scoring durations of a RecommendationEngine, and phase timings of a sample of its calls"""
+
+    def __init__(self, registry: MetricsRegistry, phase_sample_rate: float = 0.1):
+        self.phase_sample_rate = phase_sample_rate
+        self.scoring_seconds = registry.histogram(
+            'recommendation_scoring_seconds', 'Time to score the catalogue for a request or a batch chunk',
+            ('mode',), LATENCY_BUCKETS)
+        self.candidates = registry.counter(
+            'recommendation_scored_candidates_total', 'Candidate profiles scored (cache misses)', ('mode',))
+        self.phase_seconds = registry.histogram(
+            'recommendation_scoring_phase_seconds', 'Time per scoring phase of a sampled request',
+            ('mode', 'phase'), PHASE_BUCKETS)
+
+    def phase_timer(self) -> Optional[PhaseTimer]:
+        """A timer for this call if it is sampled, else None"""
+        if self.phase_sample_rate > 0 and random.random() < self.phase_sample_rate:
+            return PhaseTimer()
+        return None
+
+    def observe(self, mode: str, seconds: float, candidates: int, timer: Optional[PhaseTimer] = None):
+        self.scoring_seconds.observe(seconds, (mode,))
+        self.candidates.inc((mode,), candidates)
+        if timer is not None:
+            for phase, phase_seconds in timer.totals.items():
+                self.phase_seconds.observe(phase_seconds, (mode, phase))
@@ -0,0 +1,237 @@
+"""
+Scoring sharded across a pool of worker processes.
+
+Scoring is CPU-bound Python, so one process scores on one core at a time.
+ParallelScorer forks a pool of workers that inherit the catalogue state
+copy-on-write (nothing is pickled but the candidate profiles and the
+results), splits the catalogue into one contiguous shard per worker, lets
+every worker compute a local top-k per candidate with the engine's own
+scoring code, and merges the shards' top-k in the parent. Ties keep
+catalogue order, so results are identical to scoring in one process.
+
+The pool is started once per process, before it starts any threads (see
+start), and lives as long as the process. Catalogue changes are passed on
+to the workers through a changes file: a delta as its operations, which
+every worker applies to its own copy of the catalogue, anything else
+(reloads) as the new records. Every task names the catalogue version it
+scores, and a worker first applies the changes up to that version; a
+worker that cannot reach it returns nothing and the parent scores that
+shard itself, as it does for the shards not returned within `timeout`
+seconds (e.g. a worker was killed while scoring them). Needs the fork start
+method.
+"""
+import heapq
+import itertools
+import multiprocessing
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from internship_record import CandidateProfile
+
+# Length prefix of every change in a changes file
+FRAME_HEADER = struct.Struct('>Q')
+
+# Seconds a request waits for the shards of the pool before scoring the missing ones itself
+SHARD_TIMEOUT = float(os.environ.get('SCORING_SHARD_TIMEOUT', 30))
+
+# Engine of a worker process, the catalogue version it holds and how far it
+# has read the changes file, set when it is forked
+_worker_engine = None
+_worker_version = None
+_worker_changes = (None, 0)
+
+
+def score_shard(engine, state, start: int, end: int, candidate_profiles: List[Dict[str, Any]],
+                k: int) -> List[List[Tuple[int, int]]]:
+    """(score, position) top-k of postings start to end of a state for every candidate"""
+    candidates = [CandidateProfile(candidate_profile, state.skills) for candidate_profile in candidate_profiles]
+    if state.vectorized_scorer is not None:
+        return state.vectorized_scorer.top_k_entries(candidates, k, start, end)
+    return [engine.top_k_entries(state, candidate, k, start, end) for candidate in candidates]
+
+
+def _init_worker(engine, changes_path: str):
+    global _worker_engine, _worker_version, _worker_changes
+    # The parent keeps the caches and the store up to date; a worker only scores
+    engine.result_cache = engine.recommendation_store = engine.parallel_scorer = None
+    engine.snapshot_path = None
+    _worker_engine = engine
+    _worker_version = engine.state.version
+    _worker_changes = (changes_path, 0)
+
+
+def _catch_up(changes_path: str, version: int) -> bool:
+    """Apply the parent's catalogue changes up to `version`; False if they cannot be reached"""
+    global _worker_version, _worker_changes
+    if _worker_version >= version:
+        return _worker_version == version
+    path, offset = _worker_changes
+    if path != changes_path:
+        # A new file starts with a complete catalogue
+        offset = 0
+    try:
+        with open(changes_path, 'rb') as file:
+            file.seek(offset)
+            data = file.read()
+    except OSError:
+        return False  # Replaced by a newer catalogue meanwhile
+
+    position = 0
+    while _worker_version < version and len(data) - position >= FRAME_HEADER.size:
+        (length,) = FRAME_HEADER.unpack_from(data, position)
+        if len(data) - position - FRAME_HEADER.size < length:
+            break  # Still being written
+        position += FRAME_HEADER.size
+        change_version, records, operations = pickle.loads(data[position:position + length])
+        position += length
+        if change_version > _worker_version:
+            if records is not None:
+                _worker_engine.install_records(records)
+            else:
+                _worker_engine.apply_delta(operations)
+            _worker_version = change_version
+    _worker_changes = (changes_path, offset + position)
+    return _worker_version == version
+
+
+def _score_shard(changes_path: str, version: int, start: int, end: int, candidate_profiles: List[Dict[str, Any]],
+                 k: int) -> Optional[List[List[Tuple[int, int]]]]:
+    """score_shard of catalogue `version` in a worker; None if the worker cannot reach that version"""
+    if not _catch_up(changes_path, version):
+        return None
+    return score_shard(_worker_engine, _worker_engine.state, start, end, candidate_profiles, k)
+
+
+class ParallelScorer:
+    """Scores an engine's catalogue on a pool of `workers` forked processes"""
+
+    def __init__(self, engine, workers: int, timeout: float = SHARD_TIMEOUT):
+        if workers < 1:
+            raise ValueError('Parallel scoring needs at least one worker')
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError('Parallel scoring needs the fork start method')
+        self.engine = engine
+        self.workers = workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._changes_path = None
+
+    @property
+    def running(self) -> bool:
+        """Whether this process has started its pool"""
+        return self._pool is not None and self._pool_pid == os.getpid()
+
+    def start(self):
+        """
+        Fork the worker processes from the current catalogue.
+
+        Call once in each process that scores, before it starts any threads:
+        a process forked while other threads hold locks can deadlock. Pre-forking
+        servers call it in every worker (see gunicorn.conf.py). Until then the
+        engine scores in its own process.
+        """
+        with self._lock:
+            if self.running:
+                return
+            self._changes_path = _new_changes_file()
+            context = multiprocessing.get_context('fork')
+            self._pool = context.Pool(self.workers, initializer=_init_worker,
+                                      initargs=(self.engine, self._changes_path))
+            self._pool_pid = os.getpid()
+
+    def catalogue_changed(self, state, operations: List[Any] = None):
+        """
+        Pass a catalogue change on to the workers; called by the engine under its write lock.
+
+        `operations` is the delta that produced `state`; without one, the whole
+        catalogue is written to a new changes file, as the workers need none of
+        the earlier changes then.
+        """
+        if not self.running:
+            return
+        if operations is None:
+            change = (state.version, [record.scoring_copy() for record in state.records], None)
+        else:
+            change = (state.version, None, operations)
+        payload = pickle.dumps(change, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = FRAME_HEADER.pack(len(payload)) + payload
+
+        if operations is None:
+            path = _new_changes_file()
+            with open(path, 'ab') as file:
+                file.write(frame)
+            with self._lock:
+                replaced, self._changes_path = self._changes_path, path
+            # Workers still reading it keep it open; the others move to the new file
+            _remove(replaced)
+        else:
+            with self._lock:
+                with open(self._changes_path, 'ab') as file:
+                    file.write(frame)
+
+    def _submit(self, state, candidate_profiles: List[Dict[str, Any]], k: int) -> List[Tuple[int, int, Any]]:
+        """Start scoring every shard of `state`; returns the bounds and pending result of every shard"""
+        with self._lock:
+            size = len(state.records)
+            bounds = [size * shard // self.workers for shard in range(self.workers + 1)]
+            return [(start, end, self._pool.apply_async(
+                        _score_shard, (self._changes_path, state.version, start, end, candidate_profiles, k)))
+                    for start, end in zip(bounds, bounds[1:]) if start < end]
+
+    def top_k_entries(self, state, candidate_profiles: List[Dict[str, Any]], k: int) -> List[List[Tuple[int, int]]]:
+        """(score, position) of the k best postings for every candidate, highest score first"""
+        shard_entries = []
+        deadline = time.monotonic() + self.timeout
+        for start, end, pending in self._submit(state, candidate_profiles, k):
+            try:
+                entries = pending.get(max(0.0, deadline - time.monotonic()))
+            except multiprocessing.TimeoutError:
+                entries = None  # e.g. the worker scoring it was killed
+            if entries is None:
+                # Not scored in time, or the catalogue changed while this request was scored
+                entries = score_shard(self.engine, state, start, end, candidate_profiles, k)
+            shard_entries.append(entries)
+        return [
+            heapq.nsmallest(k, itertools.chain.from_iterable(entries[row] for entries in shard_entries),
+                            key=lambda entry: (-entry[0], entry[1]))
+            for row in range(len(candidate_profiles))
+        ]
+
+    def recommend_many(self, state, candidate_profiles: List[Dict[str, Any]], k: int) -> List[List[Dict]]:
+        """Top-k recommendations with match scores and reasons for every candidate"""
+        recommendations = []
+        for candidate_profile, entries in zip(candidate_profiles, self.top_k_entries(state, candidate_profiles, k)):
+            candidate = CandidateProfile(candidate_profile, state.skills)
+            recommendations.append([self.engine.build_record_recommendation(candidate, state.records[position])
+                                    for _, position in entries])
+        return recommendations
+
+    def close(self):
+        """Stop the worker processes and wait for them to exit"""
+        with self._lock:
+            if self.running:
+                self._pool.terminate()
+                self._pool.join()
+                _remove(self._changes_path)
+            self._pool = None
+            self._changes_path = None
+
+
+def _new_changes_file() -> str:
+    descriptor, path = tempfile.mkstemp(prefix='scoring-changes-')
+    os.close(descriptor)
+    return path
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,160 @@
+"""
+Per-client token bucket rate limiting.
+
+Every client has a bucket of up to `burst` tokens, refilled at `rate` tokens
+per second; a request takes one token, or is rejected straight away with the
+time until one is available (the API answers 429 with Retry-After rather
+than queueing it).
+
+Buckets live in a pluggable store with a single atomic operation, take():
+
+- MemoryTokenStore keeps them in this process (each server process limits
+  on its own);
+- SharedTokenStore keeps them in a separate server process started with
+  multiprocessing's manager, shared by every process that uses it, such as
+  the workers forked from a preloaded gunicorn master. It is a local
+  stand-in for a shared store like Redis: one round trip per request, and the
+  refill is computed on the store's clock.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, Hashable, Optional
+
+# Buckets kept per store; the least recently used ones beyond it are dropped (i.e. refilled)
+DEFAULT_MAX_CLIENTS = 100000
+
+
+class TokenBucketStore(ABC):
+    """Interface of bucket stores"""
+
+    @abstractmethod
+    def take(self, key: Hashable, rate: float, burst: float, cost: float = 1) -> float:
+        """
+        Take `cost` tokens from the bucket of `key`. Returns 0 when they were
+        taken, else the seconds until the bucket holds enough (nothing is taken)
+        """
+
+
+class MemoryTokenStore(TokenBucketStore):
+    """Buckets in a dict of this process, bounded to `max_clients` (LRU)"""
+
+    def __init__(self, max_clients: int = DEFAULT_MAX_CLIENTS, clock=time.monotonic):
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: OrderedDict = OrderedDict()  # Key -> (tokens, time of the last update)
+        self._lock = threading.Lock()
+
+    def take(self, key: Hashable, rate: float, burst: float, cost: float = 1) -> float:
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = burst
+            else:
+                tokens, updated = bucket
+                tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+# The buckets of the manager server process
+_shared_buckets: Optional[MemoryTokenStore] = None
+
+
+def _get_shared_buckets() -> MemoryTokenStore:
+    global _shared_buckets
+    if _shared_buckets is None:
+        _shared_buckets = MemoryTokenStore()
+    return _shared_buckets
+
+
+class _BucketManager(BaseManager):
+    pass
+
+
+_BucketManager.register('buckets', callable=_get_shared_buckets, exposed=('take',))
+
+
+class SharedTokenStore(TokenBucketStore):
+    """
+    Buckets in a manager server process. Without an address, the server is
+    started here (and stopped when this process exits); processes forked
+    afterwards connect to it on first use.
+    """
+
+    def __init__(self, address: Any = None, authkey: bytes = None):
+        self._manager = None
+        if address is None:
+            authkey = os.urandom(32)
+            self._manager = _BucketManager(authkey=authkey)
+            self._manager.start()
+            address = self._manager.address
+        self.address = address
+        self.authkey = authkey
+        self._lock = threading.Lock()
+        self._pid = None
+        self._proxy = None
+
+    def _buckets(self):
+        # Connections do not survive a fork: every process opens its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    client = _BucketManager(address=self.address, authkey=self.authkey)
+                    client.connect()
+                    self._proxy = client.buckets()
+                    self._pid = os.getpid()
+        return self._proxy
+
+    def take(self, key: Hashable, rate: float, burst: float, cost: float = 1) -> float:
+        return self._buckets().take(key, rate, burst, cost)
+
+
+class RateLimiter:
+    """Token bucket limit of `rate` requests per second per client, in bursts of up to `burst`"""
+
+    def __init__(self, store: TokenBucketStore, rate: float, burst: float = None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.store = store
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.allowed = 0
+        self.limited = 0
+        self.store_errors = 0
+
+    def check(self, client: Hashable) -> float:
+        """0 when a request of `client` may proceed, else the seconds it should wait"""
+        try:
+            wait = self.store.take(client, self.rate, self.burst)
+        except Exception:
+            # An unavailable store must not take the API down with it: let requests through
+            self.store_errors += 1
+            return 0.0
+        if wait:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'store': type(self.store).__name__,
+            'rate': self.rate,
+            'burst': self.burst,
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'store_errors': self.store_errors
+        }
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional
+
+
+def canonical_profile(candidate_profile: Dict[str, Any]) -> tuple:
+    """
+    Canonical, hashable form of a candidate profile.
+
+    Two profiles with the same canonical form always receive the same
+    recommendations: scoring is case-insensitive and treats skills and
+    interests as sets, so they are lowercased, deduplicated and sorted.
+    """
+    # Missing, None and empty values all score the same way
+    return (
+        (candidate_profile.get('education') or '').lower(),
+        tuple(sorted({skill.lower() for skill in candidate_profile.get('skills') or []})),
+        tuple(sorted({interest.lower() for interest in candidate_profile.get('interests') or []})),
+        (candidate_profile.get('location') or '').lower()
+    )
+
+
+class RecommendationCache:
+    """Thread-safe LRU cache with a time-to-live, plus hit/miss counters"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -1,54 +1,636 @@
+import base64
+import binascii
+import heapq
+import itertools
 import json
 import os
-from typing import List, Dict, Any
+import sys
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from bisect import bisect_left
 from datetime import datetime
 
+from catalogue_delta import parse_operation
+from catalogue_index import CatalogueIndex
+from catalogue_store import NdjsonCatalogue, is_ndjson_path
+from gazetteer import GAZETTEER, DISTANT_SCORE
+from internship_record import InternshipRecord, CandidateProfile, Recommendation, EDUCATION_LEVELS
+from metrics import PhaseTimer, ScoringMetrics
+from sampling_profiler import SamplingProfiler
+from single_flight import SingleFlight
+from skill_vocabulary import SKILLS, SkillVocabulary
+from recommendation_cache import RecommendationCache, canonical_profile
+
+SCORING_MODES = ('scalar', 'vectorized')
+
+# Number of recommendations returned by default, and the most a client may request
+DEFAULT_RECOMMENDATIONS = 5
+MAX_RECOMMENDATIONS = 50
+
+# Component weights of the overall match score
+SKILLS_WEIGHT = 0.4
+SECTOR_WEIGHT = 0.3
+LOCATION_WEIGHT = 0.2
+EDUCATION_WEIGHT = 0.1
+
+
+# Smallest catalogue worth sharding across worker processes
+PARALLEL_MIN_POSTINGS = 50000
+
+# Distinct profiles of a batch scored together
+BATCH_CHUNK_SIZE = 64
+
+# Removed postings are compacted away once they outnumber the live ones (and this minimum)
+COMPACTION_MIN_REMOVED = 1024
+
+# Catalogue loaded when no data path is given: a JSON array, or NDJSON by file extension
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'data', 'sample_internships.json')
+
+
+class CatalogueState:
+    """
+    One loaded catalogue and everything derived from it.
+
+    A state is fully built before the engine starts using it. Afterwards it
+    only changes through apply_delta, which appends postings and marks removed
+    ones inactive, always writing a posting's data before making it visible:
+    a record is appended to `records` first, then indexed, then encoded.
+    Lookups only reach it through the index, and full scans stop at the end
+    of the index's `active` bitmap, so a record is never read before it is
+    indexed. Skill masks of the records are ids in the state's own vocabulary
+    (`skills`), which only grows with the terms of added postings.
+    Replacing the catalogue is a single assignment of `engine.state`, and each
+    request reads `engine.state` once, so in-flight requests finish on the
+    state they started with.
+    """
+
+    __slots__ = ('records', 'skills', 'index', 'vectorized_scorer', 'version', 'tag', 'loaded_at',
+                 'build_seconds')
+
+    def __init__(self, records: List[InternshipRecord], skills: SkillVocabulary, index: CatalogueIndex,
+                 vectorized_scorer, version: int, build_seconds: float):
+        self.records = records
+        self.skills = skills
+        self.index = index
+        self.vectorized_scorer = vectorized_scorer
+        self.version = version
+        self.tag = new_catalogue_tag(version)
+        self.loaded_at = datetime.now()
+        self.build_seconds = build_seconds
+
+
+def new_catalogue_tag(version: int) -> str:
+    """
+    Identifier of one catalogue version, used as the ETag of catalogue responses.
+
+    Versions are counted per process, and forked workers change their
+    catalogues independently, so the tag adds a random part: equal tags always
+    mean the same catalogue, even across processes and restarts.
+    """
+    return f'{version}-{os.urandom(6).hex()}'
+
+
 class RecommendationEngine:
-    def __init__(self):
-        self.internships = self.load_internships()
-        
-    def load_internships(self) -> List[Dict]:
+    def __init__(self, scoring_mode: str = 'scalar', internships: List[Dict] = None,
+                 cache: RecommendationCache = None, data_path: str = None,
+                 workers: int = 0, parallel_min_postings: int = PARALLEL_MIN_POSTINGS,
+                 metrics: ScoringMetrics = None, profiler: SamplingProfiler = None,
+                 snapshot_path: str = None, recommendation_store=None):
+        if scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring_mode}")
+
+        self.scoring_mode = scoring_mode
+        self.result_cache = cache
+        # Times every scoring call when set
+        self.metrics = metrics
+        # Samples the stacks of recommend_internships calls while a profiling session runs
+        self.profiler = profiler
+        # Concurrent requests for the same profile share one computation
+        self.single_flight = SingleFlight()
+        # Precomputed recommendations, served while they match the catalogue (see recommendation_store)
+        self.recommendation_store = recommendation_store
+        self.data_path = data_path or DEFAULT_DATA_PATH
+        # Prepared catalogue state of the data file, loaded instead of rebuilding it (see catalogue_snapshot)
+        self.snapshot_path = snapshot_path
+        # Catalogues of at least parallel_min_postings are sharded across a pool of `workers`
+        # processes, once it is started (see ParallelScorer.start)
+        self.parallel_scorer = None
+        self.parallel_min_postings = parallel_min_postings
+        if workers > 0:
+            from parallel_scoring import ParallelScorer
+            self.parallel_scorer = ParallelScorer(self, workers)
+        self._versions = itertools.count(1)
+        # Serializes catalogue writers (reloads and deltas); readers never take it
+        self._write_lock = threading.RLock()
+        if internships is not None:
+            self.load_catalogue(internships)
+        else:
+            self.reload()
+
+    @property
+    def records(self) -> List[InternshipRecord]:
+        return self.state.records
+
+    @property
+    def index(self) -> CatalogueIndex:
+        return self.state.index
+
+    @property
+    def vectorized_scorer(self):
+        return self.state.vectorized_scorer
+
+    @property
+    def catalogue_version(self) -> int:
+        return self.state.version
+
+    @property
+    def catalogue_tag(self) -> str:
+        return self.state.tag
+
+    def load_catalogue(self, internships: List[Dict]):
+        """Install an in-memory catalogue and rebuild everything derived from it"""
+        self.install_records([InternshipRecord(position, internship) for position, internship in enumerate(internships)])
+
+    def install_records(self, records: List[InternshipRecord]) -> CatalogueState:
+        """Build a new catalogue state from records and swap it in"""
+        with self._write_lock:
+            return self._install_records(records)
+
+    def _install_records(self, records: List[InternshipRecord], index: CatalogueIndex = None,
+                         vectorized_scorer=None, compacted: bool = False) -> CatalogueState:
+        # The index and encoded arrays are only passed in when loaded from a snapshot
+        started = time.perf_counter()
+        # A new vocabulary per catalogue, so terms no posting requires any more are dropped
+        skills = SKILLS.for_catalogue()
+        for record in records:
+            record.skill_mask = skills.mask(record.requirements)
+        if index is None:
+            index = CatalogueIndex(records)
+        if self.scoring_mode == 'vectorized' and vectorized_scorer is None:
+            # Imported lazily so the scalar mode does not require NumPy
+            from vectorized_scoring import VectorizedScorer
+            vectorized_scorer = VectorizedScorer(self, records)
+        state = CatalogueState(records, skills, index, vectorized_scorer, next(self._versions),
+                               time.perf_counter() - started)
+
+        # Results are cached per catalogue version, so entries of the previous
+        # state can never be served again; clearing just frees them early
+        self.state = state
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        if self.recommendation_store is not None:
+            self.recommendation_store.catalogue_changed(self, state)
+        # Scoring workers compact their catalogue themselves when they apply the delta
+        if self.parallel_scorer is not None and not compacted:
+            self.parallel_scorer.catalogue_changed(state)
+        return state
+
+    def apply_delta(self, operations: List[Any]) -> Dict[str, Any]:
+        """
+        Apply add / update / delete operations (see catalogue_delta) to the live catalogue.
+
+        Postings are appended to the current state and removed ones are marked
+        inactive, so the cost is proportional to the size of the delta rather
+        than the catalogue. An update removes the old posting and appends the
+        new one. Invalid operations are reported in `errors` and skipped.
+        """
+        added = updated = deleted = 0
+        errors = []
+        # Records taken out of and put into the index, for the recommendation store
+        removed_records, added_records = [], []
+        with self._write_lock:
+            state = self.state
+            index, scorer = state.index, state.vectorized_scorer
+            for number, operation in enumerate(operations, start=1):
+                try:
+                    op, internship_id, internship = parse_operation(operation)
+                    existing = index.get(internship_id)
+                    if op == 'add' and existing is not None:
+                        raise ValueError(f"internship {internship_id} already exists")
+                    if op != 'add' and existing is None:
+                        raise ValueError(f"internship {internship_id} not found")
+                except ValueError as e:
+                    errors.append({'operation': number, 'error': str(e)})
+                    continue
+
+                if existing is not None:
+                    index.remove(existing)
+                    removed_records.append(existing)
+                    if scorer is not None:
+                        scorer.remove(existing.position)
+                if internship is not None:
+                    record = InternshipRecord(len(state.records), internship)
+                    record.skill_mask = state.skills.mask(record.requirements)
+                    state.records.append(record)
+                    index.add(record)
+                    added_records.append(record)
+                    if scorer is not None:
+                        scorer.add(record)
+                if op == 'add':
+                    added += 1
+                elif op == 'update':
+                    updated += 1
+                else:
+                    deleted += 1
+
+            if added or updated or deleted:
+                live = len(state.records) - index.removed
+                if index.removed >= max(live, COMPACTION_MIN_REMOVED):
+                    state = self._install_records(
+                        [record.relocated(position) for position, record in enumerate(index.search())],
+                        compacted=True)
+                else:
+                    state.version = next(self._versions)
+                    state.tag = new_catalogue_tag(state.version)
+                    if self.result_cache is not None:
+                        self.result_cache.clear()
+                    if self.recommendation_store is not None:
+                        self.recommendation_store.catalogue_changed(self, state, removed_records, added_records)
+                if self.parallel_scorer is not None:
+                    self.parallel_scorer.catalogue_changed(state, operations)
+
+        return {
+            'added': added,
+            'updated': updated,
+            'deleted': deleted,
+            'errors': errors,
+            'version': state.version,
+            'internships': len(state.records) - state.index.removed
+        }
+
+    def reload(self, strict: bool = False, path: str = None) -> CatalogueState:
+        """
+        Reload the catalogue from disk (with strict=True, load errors are raised),
+        from the data file or a copy of it at `path`
+        """
+        path = path or self.data_path
+        if self.snapshot_path is None:
+            return self.install_records(self.load_records(strict=strict, path=path))
+
+        # Imported lazily: only needed with a snapshot
+        from catalogue_snapshot import file_hash, read_snapshot, write_snapshot
+        with self._write_lock:
+            try:
+                source_hash = file_hash(path)
+            except OSError:
+                source_hash = None
+            if source_hash is not None:
+                snapshot = read_snapshot(self.snapshot_path, self, source_hash)
+                if snapshot is not None:
+                    return self._install_records(*snapshot)
+
+            state = self._install_records(self.load_records(strict=strict, path=path))
+            # Only snapshot what was read from the file that was hashed
+            if state.records and source_hash is not None and file_hash(path) == source_hash:
+                try:
+                    write_snapshot(self.snapshot_path, self, state, source_hash)
+                except OSError:
+                    pass  # e.g. a read-only directory: the next start builds the catalogue again
+            return state
+
+    def load_records(self, strict: bool = False, path: str = None) -> List[InternshipRecord]:
+        """Load catalogue records from the data path (or `path`)"""
+        path = path or self.data_path
+        if is_ndjson_path(path):
+            try:
+                # Streamed from a memory map; full postings are re-read on demand
+                return NdjsonCatalogue(path).load_records()
+            except (FileNotFoundError, json.JSONDecodeError):
+                if strict:
+                    raise
+                return []
+        return [InternshipRecord(position, internship)
+                for position, internship in enumerate(self.load_internships(strict=strict, path=path))]
+
+    def load_internships(self, strict: bool = False, path: str = None) -> List[Dict]:
         """Load internship data from JSON file"""
         try:
-            # Get the path to the data directory
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            data_path = os.path.join(os.path.dirname(current_dir), 'data', 'sample_internships.json')
-            
-            with open(data_path, 'r', encoding='utf-8') as file:
+            with open(path or self.data_path, 'r', encoding='utf-8') as file:
                 return json.load(file)
         except FileNotFoundError:
+            if strict:
+                raise
             # Return empty list if file not found
             return []
         except json.JSONDecodeError:
+            if strict:
+                raise
             # Return empty list if JSON is invalid
             return []
     
-    def recommend_internships(self, candidate_profile: Dict[str, Any]) -> List[Dict]:
+    def recommend_internships(self, candidate_profile: Dict[str, Any], k: int = DEFAULT_RECOMMENDATIONS) -> List[Dict]:
         """
         Generate personalized internship recommendations based on candidate profile
         
         Args:
             candidate_profile: Dictionary containing candidate's education, skills, interests, and location
+            k: Maximum number of recommendations to return
             
         Returns:
             List of recommended internships with match scores and reasons
         """
-        if not self.internships:
+        profiled_call = self.profiler.profile(sys._getframe()) if self.profiler is not None else None
+        if profiled_call is not None:
+            with profiled_call:
+                return self._recommend_internships(candidate_profile, k)
+        return self._recommend_internships(candidate_profile, k)
+
+    def _recommend_internships(self, candidate_profile: Dict[str, Any], k: int) -> List[Dict]:
+        state = self.state
+        # Cached and shared results are keyed on the catalogue version so that
+        # a reload racing with this request can never store stale recommendations
+        key = (state.version, canonical_profile(candidate_profile), k)
+        if self.result_cache is not None:
+            recommendations = self.result_cache.get(key)
+            if recommendations is not None:
+                return recommendations
+        return self.single_flight.run(key, self._score_and_cache, state, candidate_profile, k, key)
+    
+    def _score_and_cache(self, state: CatalogueState, candidate_profile: Dict[str, Any], k: int,
+                         key: tuple) -> List[Dict]:
+        recommendations = None
+        if self.recommendation_store is not None:
+            recommendations = self.recommendation_store.lookup(state, key[1], k)
+        if recommendations is None:
+            recommendations = self._score_recommendations(state, candidate_profile, k)
+        if self.result_cache is not None:
+            self.result_cache.put(key, recommendations)
+        return recommendations
+    
+    def recommend_batch(self, candidate_profiles: Iterable[Dict[str, Any]],
+                        k: int = DEFAULT_RECOMMENDATIONS) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Recommendations for many candidate profiles, as (input index, recommendations) pairs.
+
+        Profiles with the same canonical form are scored once, and distinct
+        profiles are scored BATCH_CHUNK_SIZE at a time (as one score matrix in
+        the vectorized mode). Results are yielded in input order as soon as
+        each chunk is done, so callers can stream them.
+        """
+        state = self.state
+        candidate_profiles = list(candidate_profiles)
+        keys = [canonical_profile(candidate_profile) for candidate_profile in candidate_profiles]
+
+        # Index of the distinct profile behind every input, in order of first appearance
+        distinct_ids: Dict[tuple, int] = {}
+        inputs = [distinct_ids.setdefault(key, len(distinct_ids)) for key in keys]
+        distinct_profiles = [None] * len(distinct_ids)
+        for position, distinct_id in enumerate(inputs):
+            if distinct_profiles[distinct_id] is None:
+                distinct_profiles[distinct_id] = candidate_profiles[position]
+        distinct_keys = list(distinct_ids)
+
+        results: List[List[Dict]] = [None] * len(distinct_profiles)
+        emitted = 0
+        for chunk_start in range(0, len(distinct_profiles), BATCH_CHUNK_SIZE):
+            chunk_end = min(chunk_start + BATCH_CHUNK_SIZE, len(distinct_profiles))
+            missing = []
+            for distinct_id in range(chunk_start, chunk_end):
+                if self.result_cache is not None:
+                    results[distinct_id] = self.result_cache.get((state.version, distinct_keys[distinct_id], k))
+                if results[distinct_id] is None and self.recommendation_store is not None:
+                    results[distinct_id] = self.recommendation_store.lookup(state, distinct_keys[distinct_id], k)
+                if results[distinct_id] is None:
+                    missing.append(distinct_id)
+
+            scored = self.score_many(state, [distinct_profiles[distinct_id] for distinct_id in missing], k)
+            for distinct_id, recommendations in zip(missing, scored):
+                results[distinct_id] = recommendations
+                if self.result_cache is not None:
+                    self.result_cache.put((state.version, distinct_keys[distinct_id], k), recommendations)
+
+            while emitted < len(inputs) and inputs[emitted] < chunk_end:
+                yield emitted, results[inputs[emitted]]
+                emitted += 1
+
+    def score_many(self, state: CatalogueState, candidate_profiles: List[Dict[str, Any]], k: int) -> List[List[Dict]]:
+        """
+        Top-k recommendations of several candidates against a catalogue state,
+        scored without the result cache or the recommendation store
+        """
+        if not candidate_profiles or not state.records or k <= 0:
+            return [[] for _ in candidate_profiles]
+        if self.metrics is None:
+            return self._score_many_with(state, candidate_profiles, k)
+        started = time.perf_counter()
+        results = self._score_many_with(state, candidate_profiles, k)
+        self.metrics.observe(self._scoring_path(state), time.perf_counter() - started, len(candidate_profiles))
+        return results
+
+    def is_current(self, state: CatalogueState, version: int) -> bool:
+        """
+        Whether a state at `version` is still the engine's catalogue; waits for
+        a change being applied, so nothing was changed since when it returns True
+        """
+        with self._write_lock:
+            return self.state is state and state.version == version
+
+    def score_many_at(self, state: CatalogueState, version: int, candidate_profiles: List[Dict[str, Any]],
+                      k: int) -> Optional[List[List[Dict]]]:
+        """
+        score_many against version `version` of a catalogue state; None if the
+        catalogue changed meanwhile, as the results may then mix two catalogues
+        """
+        results = self.score_many(state, candidate_profiles, k)
+        return results if self.is_current(state, version) else None
+
+    def _score_many_with(self, state: CatalogueState, candidate_profiles: List[Dict[str, Any]], k: int) -> List[List[Dict]]:
+        if self._runs_in_parallel(state):
+            return self.parallel_scorer.recommend_many(state, candidate_profiles, k)
+        if state.vectorized_scorer is not None:
+            return state.vectorized_scorer.recommend_many(
+                [CandidateProfile(candidate_profile, state.skills) for candidate_profile in candidate_profiles], k)
+        return [self._score_one(state, candidate_profile, k) for candidate_profile in candidate_profiles]
+
+    def _score_recommendations(self, state: CatalogueState, candidate_profile: Dict[str, Any], k: int) -> List[Dict]:
+        """Score a catalogue state for a candidate and return the top k"""
+        if not state.records or k <= 0:
             return []
+        if self.metrics is None:
+            return self._score_one(state, candidate_profile, k)
+        # Phase timings of a sample of requests
+        timer = self.metrics.phase_timer()
+        started = time.perf_counter()
+        recommendations = self._score_one(state, candidate_profile, k, timer)
+        self.metrics.observe(self._scoring_path(state), time.perf_counter() - started, 1, timer)
+        return recommendations
+
+    def _score_one(self, state: CatalogueState, candidate_profile: Dict[str, Any], k: int,
+                   timer: PhaseTimer = None) -> List[Dict]:
+        if self._runs_in_parallel(state):
+            # Workers score in other processes, so there are no phase timings
+            return self.parallel_scorer.recommend_many(state, [candidate_profile], k)[0]
+        
+        if state.vectorized_scorer is not None:
+            return state.vectorized_scorer.recommend(CandidateProfile(candidate_profile, state.skills), k, timer)
+        
+        candidate = CandidateProfile(candidate_profile, state.skills)
+        entries = self.top_k_entries(state, candidate, k, timer=timer)
+        if timer is not None:
+            timer.skip()
+        # Build result dicts and reasons for the winners only
+        recommendations = [self.build_record_recommendation(candidate, state.records[position])
+                           for _, position in entries]
+        if timer is not None:
+            timer.lap('explain')
+        return recommendations
+
+    def _runs_in_parallel(self, state: CatalogueState) -> bool:
+        return (self.parallel_scorer is not None and self.parallel_scorer.running
+                and len(state.records) >= self.parallel_min_postings)
+
+    def _scoring_path(self, state: CatalogueState) -> str:
+        """How a catalogue state is scored: 'parallel' or the scoring mode"""
+        return 'parallel' if self._runs_in_parallel(state) else self.scoring_mode
+
+    def top_k_entries(self, state: CatalogueState, candidate: CandidateProfile, k: int,
+                      start: int = 0, end: int = None, timer: PhaseTimer = None) -> List[Tuple[int, int]]:
+        """(score, position) of the k best postings among records[start:end], highest score first"""
+        matchers = (self.record_skills_match, self.record_sector_match,
+                    self.record_location_match, self.record_education_match)
+        if timer is not None:
+            # Every component call is timed, which makes this call about twice as slow
+            matchers = tuple(timer.timed(phase, matcher)
+                             for phase, matcher in zip(('skills', 'sector', 'location', 'education'), matchers))
+
+        # Candidate generation: score a subset of the postings first, and
+        # stop there when its k-th best beats any posting outside it
+        for positions, outside_best in self.candidate_sets(state, candidate, start, end):
+            top_k = self._top_k(state, candidate, k, (state.records[position] for position in positions), matchers)
+            if len(top_k) == k and top_k[0][0] > outside_best:
+                return [(score, -negative_position) for score, negative_position in sorted(top_k, reverse=True)]
+
+        # Up to the last indexed posting: a record being added is appended before it is indexed
+        indexed = len(state.index.active)
+        end = indexed if end is None else min(end, indexed)
+        top_k = self._top_k(state, candidate, k, itertools.islice(state.records, start, end), matchers)
+        return [(score, -negative_position) for score, negative_position in sorted(top_k, reverse=True)]
+
+    def _top_k(self, state: CatalogueState, candidate: CandidateProfile, k: int,
+               records: Iterable[InternshipRecord], matchers: tuple) -> List[Tuple[int, int]]:
+        """Bounded min-heap of the k best (score, -position) of records given in catalogue order"""
+        skills_match, sector_match, location_match, education_match = matchers
+
+        # Its root is the current k-th best; on equal scores the later posting
+        # ranks lower, matching a stable sort by score.
+        active = state.index.active
+        top_k = []
+        for record in records:
+            if not active[record.position]:
+                continue
+            sector_score = sector_match(candidate, record)
+            location_score = location_match(candidate, record)
+            education_score = education_match(candidate, record)
+            
+            # Skip the (most expensive) skills match when even a perfect one
+            # could not beat the current k-th best
+            if len(top_k) == k:
+                best_possible = self.combine_scores(100, sector_score, location_score, education_score)
+                if best_possible <= top_k[0][0]:
+                    continue
+            
+            skills_score = skills_match(candidate, record)
+            score = self.combine_scores(skills_score, sector_score, location_score, education_score)
+            if score <= 0:  # Only include internships with some match
+                continue
+            
+            if len(top_k) < k:
+                heapq.heappush(top_k, (score, -record.position))
+            elif score > top_k[0][0]:
+                heapq.heapreplace(top_k, (score, -record.position))
         
-        # Calculate match scores for all internships
-        scored_internships = []
-        for internship in self.internships:
-            score, reason = self.calculate_match_score(candidate_profile, internship)
-            if score > 0:  # Only include internships with some match
-                internship_with_score = internship.copy()
-                internship_with_score['match_score'] = score
-                internship_with_score['match_reason'] = reason
-                scored_internships.append(internship_with_score)
-        
-        # Sort by match score (highest first) and return top 5
-        scored_internships.sort(key=lambda x: x['match_score'], reverse=True)
-        return scored_internships[:5]
+        return top_k
+
+    def candidate_sets(self, state: CatalogueState, candidate: CandidateProfile,
+                       start: int = 0, end: int = None) -> Iterator[Tuple[List[int], int]]:
+        """
+        Subsets of the postings from start to end worth scoring before all of
+        them, as (positions in catalogue order, best score of any posting
+        outside the subset):
+
+        - postings near the candidate: remote ones and those in cities with a
+          location score above DISTANT_SCORE; the others score DISTANT_SCORE
+        - postings sharing a requirement term or sector with the candidate, or
+          without requirements; the others score 0 for skills and sector
+
+        When both apply, their intersection comes first. A subset holding most
+        postings is left out, as scanning all of them is then cheaper.
+        """
+        end = len(state.records) if end is None else min(end, len(state.records))
+        if end - start <= 0:
+            return
+        near = self._near_postings(state, candidate)
+        matching = self._matching_postings(state, candidate)
+        subsets = []
+        if near is not None:
+            subsets.append((near if matching is None else near & matching,
+                            self.combine_scores(100, 100, DISTANT_SCORE, 100)))
+        if matching is not None:
+            subsets.append((matching, self.combine_scores(0, 0, 100, 100)))
+        for positions, outside_best in subsets:
+            positions = sorted(positions)
+            yield positions[bisect_left(positions, start):bisect_left(positions, end)], outside_best
+
+    def _near_postings(self, state: CatalogueState, candidate: CandidateProfile) -> Optional[set]:
+        """Positions of the remote postings and those near the candidate, or None (see candidate_sets)"""
+        if not candidate.location or candidate.location == 'any':
+            return None  # Every posting has the same location score
+        index = state.index
+        # The location score of an on-site posting only depends on its city,
+        # so score the (few) distinct cities rather than the postings
+        postings = [index.remote_postings[1]]
+        for city, city_id in list(index.city_ids.items()):
+            if self.calculate_location_match(candidate.location, {'location': city}) > DISTANT_SCORE:
+                postings.append(index.city_postings.get(city_id, ()))
+        if sum(map(len, postings)) * 2 > len(state.records):
+            return None
+        return set(itertools.chain.from_iterable(postings))
+
+    def _matching_postings(self, state: CatalogueState, candidate: CandidateProfile) -> Optional[set]:
+        """Positions of the postings sharing a skill or sector with the candidate, or None (see candidate_sets)"""
+        index = state.index
+        postings = [index.open_postings]
+        if candidate.skills:
+            vocabulary = candidate.vocabulary
+            candidate.skill_mask, candidate.skill_terms_checked = vocabulary.matched_mask(
+                candidate.skill_forms, candidate.skill_mask, candidate.skill_terms_checked)
+            # Inverted index lookups of the matched terms
+            for term in vocabulary.terms_of(candidate.skill_mask):
+                postings.append(index.skill_postings.get(term, ()))
+        for sector, sector_id in list(index.sector_ids.items()):
+            if self.calculate_sector_match(candidate.interests, sector) > 0:
+                postings.append(index.sector_postings.get(sector_id, ()))
+        if sum(map(len, postings)) * 2 > len(state.records):
+            return None
+        return set(itertools.chain.from_iterable(postings))
+
+    def score_record(self, candidate: CandidateProfile, record: InternshipRecord) -> int:
+        """Match score of a record for a candidate"""
+        return self.combine_scores(self.record_skills_match(candidate, record),
+                                   self.record_sector_match(candidate, record),
+                                   self.record_location_match(candidate, record),
+                                   self.record_education_match(candidate, record))
+
+    def build_record_recommendation(self, candidate: CandidateProfile, record: InternshipRecord) -> Dict:
+        """Score a record and return its internship with match score and reason attached"""
+        skills_score = self.record_skills_match(candidate, record)
+        sector_score = self.record_sector_match(candidate, record)
+        location_score = self.record_location_match(candidate, record)
+        education_score = self.record_education_match(candidate, record)
+        score = self.combine_scores(skills_score, sector_score, location_score, education_score)
+        reason = self.build_match_reason(skills_score, sector_score, location_score, education_score,
+                                         record.sector_label)
+        # Keeps the record, so the response can reuse its pre-encoded JSON
+        return Recommendation(record, score, reason)
+    
+    def build_recommendation(self, internship: Dict[str, Any], score: int, reason: str) -> Dict:
+        """Copy an internship and attach its match score and reason"""
+        internship_with_score = internship.copy()
+        internship_with_score['match_score'] = score
+        internship_with_score['match_reason'] = reason
+        return internship_with_score
     
     def calculate_match_score(self, candidate: Dict[str, Any], internship: Dict[str, Any]) -> tuple:
         """
@@ -57,44 +639,57 @@ class RecommendationEngine:
         Returns:
             tuple: (score, reason) where score is 0-100 and reason explains the match
         """
-        score = 0
-        match_reasons = []
-        
         # 1. Skills matching (40% weight)
         skills_score = self.calculate_skills_match(candidate.get('skills', []), internship.get('requirements', []))
-        score += skills_score * 0.4
+        
+        # 2. Interest/Sector matching (30% weight)
+        sector_score = self.calculate_sector_match(candidate.get('interests', []), internship.get('sector', ''))
+        
+        # 3. Location matching (20% weight)
+        location_score = self.calculate_location_match(candidate.get('location', ''), internship)
+        
+        # 4. Education matching (10% weight)
+        education_score = self.calculate_education_match(candidate.get('education', ''), internship.get('preferred_education', []))
+        
+        score = self.combine_scores(skills_score, sector_score, location_score, education_score)
+        reason = self.build_match_reason(skills_score, sector_score, location_score, education_score,
+                                         internship.get('sector', ''))
+        return score, reason
+    
+    def build_match_reason(self, skills_score: float, sector_score: float, location_score: float,
+                           education_score: float, sector: str) -> str:
+        """Explain a match in plain words from its component scores"""
+        match_reasons = []
+        
         if skills_score > 70:
             match_reasons.append(f"Strong skills match ({skills_score}%)")
         elif skills_score > 40:
             match_reasons.append(f"Good skills alignment ({skills_score}%)")
         
-        # 2. Interest/Sector matching (30% weight)
-        sector_score = self.calculate_sector_match(candidate.get('interests', []), internship.get('sector', ''))
-        score += sector_score * 0.3
         if sector_score > 0:
-            match_reasons.append(f"Matches your interest in {internship.get('sector', '')}")
+            match_reasons.append(f"Matches your interest in {sector}")
         
-        # 3. Location matching (20% weight)
-        location_score = self.calculate_location_match(candidate.get('location', ''), internship)
-        score += location_score * 0.2
         if location_score > 80:
             match_reasons.append("Perfect location match")
         elif location_score > 40:
             match_reasons.append("Good location fit")
         
-        # 4. Education matching (10% weight)
-        education_score = self.calculate_education_match(candidate.get('education', ''), internship.get('preferred_education', []))
-        score += education_score * 0.1
         if education_score > 80:
             match_reasons.append("Education level perfectly matches requirements")
         
         # Generate human-readable reason
         if not match_reasons:
-            reason = "Basic compatibility with your profile"
-        else:
-            reason = ". ".join(match_reasons[:2])  # Use top 2 reasons
-        
-        return min(100, max(0, int(score))), reason
+            return "Basic compatibility with your profile"
+        return ". ".join(match_reasons[:2])  # Use top 2 reasons
+    
+    def combine_scores(self, skills_score: float, sector_score: float, location_score: float, education_score: float) -> int:
+        """Combine component scores into the weighted 0-100 match score used by calculate_match_score"""
+        score = 0
+        score += skills_score * SKILLS_WEIGHT
+        score += sector_score * SECTOR_WEIGHT
+        score += location_score * LOCATION_WEIGHT
+        score += education_score * EDUCATION_WEIGHT
+        return min(100, max(0, int(score)))
     
     def calculate_skills_match(self, candidate_skills: List[str], required_skills: List[str]) -> float:
         """Calculate percentage match between candidate skills and job requirements"""
@@ -104,16 +699,13 @@ class RecommendationEngine:
         if not candidate_skills:
             return 0
         
-        # Normalize skills for comparison
-        candidate_skills_lower = [skill.lower() for skill in candidate_skills]
-        required_skills_lower = [skill.lower() for skill in required_skills]
+        # Normalize skills for comparison, with the canonical skills of known aliases
+        candidate_forms = SKILLS.candidate_forms(skill.lower() for skill in candidate_skills)
         
         matches = 0
-        for req_skill in required_skills_lower:
-            for candidate_skill in candidate_skills_lower:
-                if candidate_skill in req_skill or req_skill in candidate_skill:
-                    matches += 1
-                    break
+        for req_skill in required_skills:
+            if SKILLS.matches(candidate_forms, req_skill.lower()):
+                matches += 1
         
         return (matches / len(required_skills)) * 100
     
@@ -124,14 +716,16 @@ class RecommendationEngine:
         
         internship_sector_lower = internship_sector.lower()
         
+        # Best match over all interests, so the order of interests does not matter
+        best_score = 0  # No match
         for interest in candidate_interests:
             interest_lower = interest.lower()
             if interest_lower == internship_sector_lower:
                 return 100  # Perfect match
             elif interest_lower in internship_sector_lower or internship_sector_lower in interest_lower:
-                return 75   # Good match
+                best_score = 75   # Good match
         
-        return 0  # No match
+        return best_score
     
     def calculate_location_match(self, candidate_location: str, internship: Dict[str, Any]) -> float:
         """Calculate location compatibility"""
@@ -155,30 +749,12 @@ class RecommendationEngine:
         if internship.get('is_remote', False):
             return 80
         
-        # Check if location is in same region/state (simplified)
-        if self.is_same_region(candidate_location_lower, internship_location_lower):
-            return 60
-        
-        return 20  # Low score for distant locations
-    
-    def is_same_region(self, loc1: str, loc2: str) -> bool:
-        """Check if two locations are in the same region (simplified logic)"""
-        # This is a simplified implementation
-        # In a real system, you'd use proper geographical data
-        metro_cities = {
-            'mumbai': 'west',
-            'pune': 'west',
-            'bangalore': 'south',
-            'chennai': 'south',
-            'hyderabad': 'south',
-            'delhi': 'north',
-            'kolkata': 'east'
-        }
-        
-        region1 = metro_cities.get(loc1)
-        region2 = metro_cities.get(loc2)
-        
-        return region1 == region2 and region1 is not None
+        # Distance band of the two places (low for distant or unknown locations)
+        return self.calculate_proximity_match(candidate_location_lower, internship_location_lower)
+    
+    def calculate_proximity_match(self, loc1: str, loc2: str) -> float:
+        """Score two locations by the distance between them, from the bundled gazetteer"""
+        return GAZETTEER.proximity(GAZETTEER.resolve(loc1), GAZETTEER.resolve(loc2))
     
     def calculate_education_match(self, candidate_education: str, preferred_education: List[str]) -> float:
         """Calculate education level compatibility"""
@@ -195,11 +771,9 @@ class RecommendationEngine:
                 return 100  # Exact match
         
         # Check if candidate's education level is higher than minimum required
-        education_levels = ['10th', '12th', 'diploma', 'undergraduate', 'postgraduate']
-        
         try:
-            candidate_level = education_levels.index(candidate_education.lower())
-            min_required_level = min([education_levels.index(pref.lower()) for pref in preferred_education if pref.lower() in education_levels])
+            candidate_level = EDUCATION_LEVELS.index(candidate_education.lower())
+            min_required_level = min([EDUCATION_LEVELS.index(pref.lower()) for pref in preferred_education if pref.lower() in EDUCATION_LEVELS])
             
             if candidate_level >= min_required_level:
                 return 80  # Qualified (higher education is acceptable)
@@ -208,38 +782,140 @@ class RecommendationEngine:
         except (ValueError, IndexError):
             return 50  # Unknown education levels
     
+    # Record-based equivalents of the helpers above, used on the hot path. They
+    # take a normalized CandidateProfile and InternshipRecord, memoize per
+    # distinct value, and must return exactly what the dict-based helpers do.
+    
+    def record_skills_match(self, candidate: CandidateProfile, record: InternshipRecord) -> float:
+        """calculate_skills_match for a normalized candidate and record"""
+        if not record.requirements:
+            return 50  # Neutral score if no requirements specified
+        
+        if not candidate.skills:
+            return 0
+        
+        score = candidate.skill_scores.get(record.requirements)
+        if score is not None:
+            return score
+        
+        skill_mask = record.skill_mask
+        if skill_mask.bit_length() > candidate.skill_terms_checked:
+            # Compare the candidate with the vocabulary terms it has not seen
+            candidate.skill_mask, candidate.skill_terms_checked = candidate.vocabulary.matched_mask(
+                candidate.skill_forms, candidate.skill_mask, candidate.skill_terms_checked)
+        
+        if skill_mask.bit_count() == len(record.requirements):
+            matches = (candidate.skill_mask & skill_mask).bit_count()
+        else:
+            # Repeated requirements count once per occurrence
+            term_ids = candidate.vocabulary.term_ids
+            matches = sum(candidate.skill_mask >> term_ids[req_skill] & 1 for req_skill in record.requirements)
+        
+        score = candidate.skill_scores[record.requirements] = (matches / len(record.requirements)) * 100
+        return score
+    
+    def record_sector_match(self, candidate: CandidateProfile, record: InternshipRecord) -> float:
+        """calculate_sector_match for a normalized candidate and record"""
+        score = candidate.sector_scores.get(record.sector)
+        if score is None:
+            score = candidate.sector_scores[record.sector] = self.calculate_sector_match(candidate.interests, record.sector)
+        return score
+    
+    def record_location_match(self, candidate: CandidateProfile, record: InternshipRecord) -> float:
+        """calculate_location_match for a normalized candidate and record"""
+        key = (record.location, record.is_remote)
+        score = candidate.location_scores.get(key)
+        if score is not None:
+            return score
+        
+        if not candidate.location:
+            score = 50  # Neutral if no preference
+        elif candidate.location == 'any':
+            score = 100
+        elif record.is_remote and candidate.location == 'remote':
+            score = 100
+        elif candidate.location in record.location or record.location in candidate.location:
+            score = 100
+        elif record.is_remote:
+            score = 80  # Remote work is always an option for flexibility
+        else:
+            score = GAZETTEER.proximity(candidate.place, record.place)  # Distance band
+        
+        candidate.location_scores[key] = score
+        return score
+    
+    def record_education_match(self, candidate: CandidateProfile, record: InternshipRecord) -> float:
+        """calculate_education_match for a normalized candidate and record"""
+        score = candidate.education_scores.get(record.preferred_education)
+        if score is not None:
+            return score
+        
+        if not record.has_education_preference:
+            score = 100  # If no preference, all are welcome
+        elif not candidate.education:
+            score = 0
+        elif candidate.education in record.preferred_education:
+            score = 100  # Exact match
+        elif candidate.education_level is None or record.min_education_level is None:
+            score = 50  # Unknown education levels
+        elif candidate.education_level >= record.min_education_level:
+            score = 80  # Qualified (higher education is acceptable)
+        else:
+            score = 30  # Under-qualified but might still be considered
+        
+        candidate.education_scores[record.preferred_education] = score
+        return score
+    
     def get_all_internships(self) -> List[Dict]:
         """Return all available internships"""
-        return self.internships
+        return [record.internship for record in self.state.index.search()]
     
     def get_available_sectors(self) -> List[str]:
         """Return list of all available sectors"""
-        sectors = set()
-        for internship in self.internships:
-            if internship.get('sector'):
-                sectors.add(internship['sector'])
-        return sorted(list(sectors))
+        return list(self.state.index.sectors)
     
     def get_internship_by_id(self, internship_id: str) -> Dict:
         """Get specific internship by ID"""
-        for internship in self.internships:
-            if internship.get('id') == internship_id:
-                return internship
-        return {}
+        record = self.state.index.get(internship_id)
+        return record.internship if record is not None else {}
     
+    def find_records(self, sector: str = None, location: str = None, is_remote: bool = None,
+                     cursor: str = None, limit: int = None) -> Tuple[List[InternshipRecord], int, Optional[str]]:
+        """
+        Records matching the filters: all of them, or one page of at most `limit`.
+
+        Returns the records, the total number of matches and the cursor of the
+        next page (None on the last page). Raises ValueError for invalid cursors.
+        """
+        state = self.state
+        after = self.decode_cursor(state, cursor) if cursor else -1
+        records, total, has_more = state.index.search_page(sector=sector, location=location, is_remote=is_remote,
+                                                           after=after, limit=limit)
+        next_cursor = self.encode_cursor(records[-1]) if has_more else None
+        return records, total, next_cursor
+
+    @staticmethod
+    def encode_cursor(record: InternshipRecord) -> str:
+        """Opaque cursor continuing after a record"""
+        return base64.urlsafe_b64encode(json.dumps([record.position, record.id]).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(state: CatalogueState, cursor: str) -> int:
+        """Catalogue position a cursor continues after"""
+        try:
+            position, internship_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            position = int(position)
+        except (ValueError, TypeError, binascii.Error):
+            raise ValueError('Invalid cursor')
+        if 0 <= position < len(state.records) and state.records[position].id == internship_id:
+            return position
+        # The catalogue has been reloaded or compacted since: continue after the same internship
+        record = state.index.get(internship_id)
+        if record is None:
+            raise ValueError('Cursor is no longer valid; start again without a cursor')
+        return record.position
+
     def search_internships(self, sector: str = None, location: str = None, is_remote: bool = None) -> List[Dict]:
         """Search internships based on filters"""
-        results = self.internships.copy()
-        
-        if sector:
-            results = [i for i in results if i.get('sector', '').lower() == sector.lower()]
-        
-        if location:
-            results = [i for i in results if 
-                      location.lower() in i.get('location', '').lower() or 
-                      (location.lower() == 'remote' and i.get('is_remote', False))]
-        
-        if is_remote is not None:
-            results = [i for i in results if i.get('is_remote', False) == is_remote]
-        
-        return results
+        records = self.state.index.search(sector=sector, location=location, is_remote=is_remote)
+        return [record.internship for record in records]
@@ -0,0 +1,506 @@
+"""
+Persistent store of precomputed recommendations, in SQLite.
+
+The profiles the form can submit are finite: an education level, subsets of
+the schema's skills and interests, and a location. An offline job scores a
+set of them ahead of time, either every combination (with at most a few
+skills and interests each) or the most frequent profiles of a request log,
+and stores the top `depth` recommendations of each. /api/recommend then
+answers those profiles with one primary-key lookup and scores the others
+live.
+
+Entries hold the id, score and reason of every recommendation; the postings
+themselves are taken from the catalogue in service. Entries are only valid
+for the catalogue they were computed against, identified by a fingerprint:
+a hash of the position, id and scoring fields of every posting, and of the
+gazetteer and skill aliases. The engine serves from the store only while
+the fingerprint of its catalogue equals the store's, so a store that is
+behind (or ahead of) a process's catalogue is bypassed, never served stale.
+
+The fingerprint is a sum of one hash per posting, so a delta updates it from
+the postings it adds and removes alone. Positions are those of the process's
+catalogue: after a delta they keep the gaps of the removed postings until the
+catalogue is compacted, so such a process serves from a store refreshed
+against its own catalogue (see auto_refresh) rather than one built from the
+data file.
+
+Refreshing the store for a changed catalogue is incremental. The store keeps
+the fingerprint of every posting, and only recomputes the entries that
+recommend a posting that was removed or changed, or that an added or
+changed posting would enter. Everything is recomputed when the order of the
+postings, the gazetteer, the aliases or the depth changed. Entries are
+scored outside any write transaction, and written in one short transaction
+at the end, so readers keep seeing the previous entries and other writers
+are only blocked while they are written.
+
+Build or refresh a store with:
+
+    python backend/recommendation_store.py build data/sample_internships.json data/recommendations.sqlite
+    python backend/recommendation_store.py build data/sample_internships.json data/recommendations.sqlite \\
+        --profiles requests.ndjson --top 10000
+
+A server can also refresh it against its own catalogue, after every change
+or on request (see app.py).
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gazetteer import GAZETTEER
+from internship_record import CandidateProfile, InternshipRecord, Recommendation
+from recommendation_cache import canonical_profile
+from skill_vocabulary import SKILLS
+
+STORE_FORMAT = 2
+
+# Posting hashes are summed modulo this
+FINGERPRINT_MODULUS = 1 << 128
+
+# Recommendations stored per profile; requests for up to that many are served from the store
+DEFAULT_DEPTH = 5
+
+# Profiles scored and written together during a refresh
+REFRESH_CHUNK_SIZE = 512
+
+# Default bounds of the enumerated profile space: skills and interests per profile
+DEFAULT_MAX_SKILLS = 2
+DEFAULT_MAX_INTERESTS = 2
+
+CANDIDATE_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'candidate_schema.json')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS postings (position INTEGER PRIMARY KEY, id TEXT NOT NULL, digest TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS results (
+    profile TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    recommendations TEXT NOT NULL
+) WITHOUT ROWID;
+'''
+
+_LOOKUP = '''
+SELECT results.depth, results.recommendations FROM results
+JOIN meta ON meta.key = 'catalogue' AND meta.value = ?
+WHERE results.profile = ?
+'''
+
+
+def posting_digest(record: InternshipRecord) -> str:
+    """Hash of the fields of a posting that its scores and match reasons depend on"""
+    fields = (record.sector_label, record.location, record.is_remote, record.requirements,
+              sorted(record.preferred_education))
+    return hashlib.blake2b(repr(fields).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def scoring_environment() -> str:
+    """Everything besides the postings that scores depend on"""
+    return json.dumps({'format': STORE_FORMAT, 'gazetteer': GAZETTEER.digest, 'skills': SKILLS.digest})
+
+
+def posting_hash(position: int, internship_id: Any, digest: str) -> int:
+    """A posting's term of the catalogue fingerprint"""
+    data = json.dumps([position, internship_id, digest]).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=16).digest(), 'big')
+
+
+def fingerprint_of_sum(total: int) -> str:
+    """Fingerprint of a catalogue from the sum of its posting hashes"""
+    digest = hashlib.blake2b(scoring_environment().encode('utf-8'), digest_size=16)
+    digest.update((total % FINGERPRINT_MODULUS).to_bytes(16, 'big'))
+    return digest.hexdigest()
+
+
+def catalogue_fingerprint(postings: Iterable[Tuple[int, Any, str]]) -> str:
+    """Fingerprint of a catalogue from the (position, id, digest) of its postings"""
+    return fingerprint_of_sum(sum(posting_hash(*posting) for posting in postings))
+
+
+def profile_key(profile: tuple) -> str:
+    """Key of a canonical profile (see canonical_profile) in the store"""
+    return json.dumps(profile, ensure_ascii=False, separators=(',', ':'))
+
+
+def profile_of_key(key: str) -> Dict[str, Any]:
+    """The candidate profile dict of a store key"""
+    education, skills, interests, location = json.loads(key)
+    return {'education': education, 'skills': skills, 'interests': interests, 'location': location}
+
+
+def enumerate_profiles(max_skills: int = DEFAULT_MAX_SKILLS, max_interests: int = DEFAULT_MAX_INTERESTS,
+                       schema_path: str = CANDIDATE_SCHEMA_PATH) -> Iterator[tuple]:
+    """
+    Canonical profiles of every combination of the candidate schema's
+    education levels, locations, and 1 to max_skills skills and 1 to
+    max_interests interests
+    """
+    with open(schema_path, encoding='utf-8') as file:
+        properties = json.load(file)['properties']
+    skills = sorted(properties['skills']['items']['enum'])
+    interests = sorted(properties['interests']['items']['enum'])
+
+    def subsets(values: List[str], largest: int) -> List[tuple]:
+        return [subset for size in range(1, min(largest, len(values)) + 1)
+                for subset in itertools.combinations(values, size)]
+
+    for education in properties['education']['enum']:
+        for location in properties['location']['enum']:
+            for skill_set in subsets(skills, max_skills):
+                for interest_set in subsets(interests, max_interests):
+                    yield education, skill_set, interest_set, location
+
+
+def frequent_profiles(candidate_profiles: Iterable[Dict[str, Any]], top: int) -> List[tuple]:
+    """The `top` most frequent canonical profiles among logged candidate profiles"""
+    counts = Counter(canonical_profile(candidate_profile) for candidate_profile in candidate_profiles)
+    return [profile for profile, _ in counts.most_common(top)]
+
+
+def read_profiles(path: str) -> List[Dict[str, Any]]:
+    """Candidate profiles of a JSON array or NDJSON file (e.g. a log of /api/recommend bodies)"""
+    with open(path, encoding='utf-8') as file:
+        content = file.read()
+    if content.lstrip().startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+class RecommendationStore:
+    """
+    Precomputed recommendations of one SQLite file.
+
+    Lookups use a read-only connection per thread (and process), and fail
+    open: any error is counted and answered as a miss. The catalogue of an
+    engine is fingerprinted whenever it changes (catalogue_changed), by the
+    engine's writer, so lookups do no hashing; a delta only hashes the
+    postings it adds and removes.
+    """
+
+    def __init__(self, path: str, auto_refresh: bool = False):
+        self.path = path
+        # Refresh the store in the background after every catalogue change of the engine
+        self.auto_refresh = auto_refresh
+        self._local = threading.local()
+        # (catalogue version, fingerprint) of the engine's catalogue, None if it cannot be served
+        self._catalogue: Optional[Tuple[int, Optional[str]]] = None
+        # Position -> (record, digest) of the active postings of the engine's catalogue
+        self._digests: Dict[int, Tuple[InternshipRecord, str]] = {}
+        # Sum of their posting hashes, and whether their ids are unique
+        self._total = 0
+        self._unique_ids = True
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refresh_pending = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.last_refresh: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def _digest(self, record: InternshipRecord) -> str:
+        known = self._digests.get(record.position)
+        return known[1] if known is not None and known[0] is record else posting_digest(record)
+
+    def catalogue_postings(self, state) -> List[Tuple[int, Any, str]]:
+        """(position, id, digest) of the active postings of a catalogue state, in order"""
+        # Only indexed records: a delta may be appending one meanwhile
+        return [(record.position, record.id, self._digest(record)) for record in state.index.search()]
+
+    def catalogue_changed(self, engine, state, removed: List[InternshipRecord] = None,
+                          added: List[InternshipRecord] = None):
+        """
+        Fingerprint the engine's new catalogue; called by the engine with its write lock held.
+
+        `removed` and `added` are the records a delta took out of and put into
+        the index; without them, the whole catalogue is hashed.
+        """
+        if removed is None:
+            postings = self.catalogue_postings(state)
+            self._digests = {position: (state.records[position], digest) for position, _, digest in postings}
+            self._total = sum(posting_hash(*posting) for posting in postings)
+            # Entries name postings by id, so a catalogue with duplicated ids is never served
+            self._unique_ids = len({internship_id for _, internship_id, _ in postings}) == len(postings)
+        else:
+            # Added first: a delta may add a posting and remove it again. Deltas
+            # never duplicate an id, so the catalogue stays as servable as it was
+            for record in added or ():
+                digest = posting_digest(record)
+                self._digests[record.position] = (record, digest)
+                self._total += posting_hash(record.position, record.id, digest)
+            for record in removed:
+                self._total -= posting_hash(record.position, record.id, self._digest(record))
+                self._digests.pop(record.position, None)
+            self._total %= FINGERPRINT_MODULUS
+        self._catalogue = (state.version, fingerprint_of_sum(self._total) if self._unique_ids else None)
+        if self.auto_refresh and self._unique_ids:
+            self.request_refresh(engine)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        # Connections must not be shared with forked processes
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def lookup(self, state, profile: tuple, k: int) -> Optional[List[Dict]]:
+        """The top k recommendations of a canonical profile, or None when they are not stored"""
+        catalogue = self._catalogue
+        if catalogue is None or catalogue[0] != state.version or catalogue[1] is None:
+            return None
+        try:
+            row = self._connection().execute(_LOOKUP, (catalogue[1], profile_key(profile))).fetchone()
+        except sqlite3.Error:
+            # e.g. no store built yet
+            self.errors += 1
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        depth, recommendations = row
+        entries = json.loads(recommendations)
+        # A list shorter than its depth holds every posting with a positive score
+        if k > depth and len(entries) == depth:
+            self.misses += 1
+            return None
+
+        index = state.index
+        results = []
+        for internship_id, score, reason in entries[:k]:
+            record = index.get(internship_id)
+            if record is None:
+                self.misses += 1
+                return None
+            results.append(Recommendation(record, score, reason))
+        self.hits += 1
+        return results
+
+    def refresh(self, engine, profiles: Iterable[tuple] = (), depth: int = None) -> Dict[str, Any]:
+        """
+        Bring the store up to date with the engine's catalogue, adding the
+        given canonical profiles; returns what was recomputed.
+
+        Entries are scored from one read of the store, then written in one
+        write transaction. Nothing is written, and `aborted` is set, when the
+        catalogue or the store changed meanwhile.
+        """
+        started = time.perf_counter()
+        state = engine.state
+        version = state.version
+        postings = self.catalogue_postings(state)
+        if len({internship_id for _, internship_id, _ in postings}) != len(postings):
+            raise ValueError('The catalogue has duplicated internship ids')
+        fingerprint = catalogue_fingerprint(postings)
+
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            # A read transaction, which blocks no writer
+            connection.execute('BEGIN')
+            meta = dict(connection.execute('SELECT key, value FROM meta'))
+            depth = depth or int(meta.get('depth', DEFAULT_DEPTH))
+            stored = {key for (key,) in connection.execute('SELECT profile FROM results')}
+            stale = None
+            if meta.get('environment') == scoring_environment() and meta.get('depth') == str(depth):
+                stale = self._stale_profiles(engine, state, connection, meta.get('catalogue'), postings,
+                                             fingerprint, depth)
+            connection.execute('COMMIT')
+            full = stale is None
+            if full:
+                stale = list(stored)
+
+            # Stale entries first, then the profiles not stored yet
+            previously_stored = len(stored)
+            rows = []
+            aborted = False
+            keys = itertools.chain(stale, self._new_keys(profiles, stored))
+            for chunk in iter(lambda: list(itertools.islice(keys, REFRESH_CHUNK_SIZE)), []):
+                scored = self._score_results(engine, state, version, chunk, depth)
+                if scored is None:
+                    aborted = True
+                    break
+                rows.extend(scored)
+
+            if not aborted:
+                connection.execute('BEGIN IMMEDIATE')
+                # Another refresh may have written meanwhile; the entries were scored against what it replaced
+                aborted = dict(connection.execute('SELECT key, value FROM meta')) != meta
+                if not aborted:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO results (profile, depth, recommendations) VALUES (?, ?, ?)', rows)
+                    connection.execute('DELETE FROM postings')
+                    connection.executemany('INSERT INTO postings (position, id, digest) VALUES (?, ?, ?)',
+                                           [(position, json.dumps(internship_id), digest)
+                                            for position, internship_id, digest in postings])
+                    connection.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+                        ('environment', scoring_environment()),
+                        ('depth', str(depth)),
+                        ('catalogue', fingerprint)
+                    ])
+                    aborted = not engine.is_current(state, version)
+                connection.execute('ROLLBACK' if aborted else 'COMMIT')
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+
+        return {
+            'full': full,
+            'recomputed': len(stale),
+            'added': len(stored) - previously_stored,
+            'profiles': len(stored),
+            'depth': depth,
+            'aborted': aborted,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    @staticmethod
+    def _new_keys(profiles: Iterable[tuple], stored: set) -> Iterator[str]:
+        """Keys of the profiles not in `stored`, which they are added to"""
+        for profile in profiles:
+            key = profile_key(profile)
+            if key not in stored:
+                stored.add(key)
+                yield key
+
+    @staticmethod
+    def _score_results(engine, state, version: int, keys: List[str], depth: int) -> Optional[List[Tuple[str, int, str]]]:
+        """Rows of the top `depth` of some profiles; None if the catalogue changed meanwhile"""
+        scored = engine.score_many_at(state, version, [profile_of_key(key) for key in keys], depth)
+        if scored is None:
+            return None
+        return [(key, depth, json.dumps([[recommendation['id'], recommendation['match_score'],
+                                          recommendation['match_reason']] for recommendation in recommendations],
+                                        ensure_ascii=False, separators=(',', ':')))
+                for key, recommendations in zip(keys, scored)]
+
+    def _stale_profiles(self, engine, state, connection, previous_fingerprint: Optional[str],
+                        postings: List[Tuple[int, Any, str]], fingerprint: str, depth: int) -> Optional[List[str]]:
+        """The keys of the stored entries a catalogue change affects, or None if it affects all of them"""
+        if previous_fingerprint == fingerprint:
+            return []
+
+        previous = [(json.loads(internship_id), digest) for internship_id, digest
+                    in connection.execute('SELECT id, digest FROM postings ORDER BY position')]
+        current = [(internship_id, digest) for _, internship_id, digest in postings]
+        kept = set(previous) & set(current)
+        # Ties are ranked by catalogue position, so unchanged postings must keep their order
+        if [posting for posting in previous if posting in kept] != [posting for posting in current if posting in kept]:
+            return None
+        removed = {internship_id for internship_id, digest in previous if (internship_id, digest) not in kept}
+        added = [state.records[position] for position, internship_id, digest in postings
+                 if (internship_id, digest) not in kept]
+
+        stale = []
+        for key, recommendations in connection.execute('SELECT profile, recommendations FROM results'):
+            entries = json.loads(recommendations)
+            if any(internship_id in removed for internship_id, _, _ in entries):
+                stale.append(key)
+            elif added:
+                # A posting enters a full list by scoring at least its last entry, any other list by scoring
+                lowest = entries[-1][1] if len(entries) == depth else 1
+                candidate = CandidateProfile(profile_of_key(key), state.skills)
+                if any(engine.score_record(candidate, record) >= lowest for record in added):
+                    stale.append(key)
+        return stale
+
+    def request_refresh(self, engine) -> bool:
+        """Refresh in the background; returns False if a refresh is already running (it runs again after)"""
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                self._refresh_pending = True
+                return False
+            self._refresh_pending = False
+            self._refresh_thread = threading.Thread(target=self._refresh_in_background, args=(engine,),
+                                                    name='recommendation-store-refresh', daemon=True)
+            self._refresh_thread.start()
+            return True
+
+    def _refresh_in_background(self, engine):
+        while True:
+            try:
+                self.last_refresh = self.refresh(engine)
+                self.last_error = None
+                if self.last_refresh['aborted']:
+                    self._refresh_pending = True
+            except Exception as e:
+                self.last_error = str(e)
+            with self._refresh_lock:
+                if not self._refresh_pending:
+                    self._refresh_thread = None
+                    return
+                self._refresh_pending = False
+
+    def stats(self) -> Dict[str, Any]:
+        catalogue = self._catalogue
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'servable': catalogue is not None and catalogue[1] is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'errors': self.errors,
+            'refreshing': self._refresh_thread is not None,
+            'last_refresh': self.last_refresh,
+            'last_error': self.last_error
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precomputed recommendation store tools')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    build = subcommands.add_parser('build', help='build or incrementally refresh the store of a catalogue')
+    build.add_argument('source', help='JSON or NDJSON catalogue, e.g. data/sample_internships.json')
+    build.add_argument('target', help='SQLite store to create or refresh')
+    build.add_argument('--profiles', help='JSON array or NDJSON log of candidate profiles; precompute the most '
+                                          'frequent ones instead of enumerating the profile space')
+    build.add_argument('--top', type=int, default=10000, help='profiles taken from --profiles (default: 10000)')
+    build.add_argument('--max-skills', type=int, default=DEFAULT_MAX_SKILLS,
+                       help=f'skills per enumerated profile (default: {DEFAULT_MAX_SKILLS})')
+    build.add_argument('--max-interests', type=int, default=DEFAULT_MAX_INTERESTS,
+                       help=f'interests per enumerated profile (default: {DEFAULT_MAX_INTERESTS})')
+    build.add_argument('--refresh-only', action='store_true', help='only bring the stored profiles up to date')
+    build.add_argument('--depth', type=int, help=f'recommendations per profile (default: the store\'s, '
+                                                 f'or {DEFAULT_DEPTH})')
+    # Both modes compute the same recommendations; the vectorized one scores many profiles at once
+    build.add_argument('--scoring-mode', default='vectorized', help='scoring mode to compute with (default: vectorized)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from recommendation_engine import RecommendationEngine, MAX_RECOMMENDATIONS
+        if args.depth is not None and not 1 <= args.depth <= MAX_RECOMMENDATIONS:
+            parser.error(f"--depth must be between 1 and {MAX_RECOMMENDATIONS}")
+        engine = RecommendationEngine(scoring_mode=args.scoring_mode, data_path=args.source)
+        if not engine.records:
+            parser.error(f"No internships could be loaded from {args.source}")
+        if args.refresh_only:
+            profiles = ()
+        elif args.profiles:
+            profiles = frequent_profiles(read_profiles(args.profiles), args.top)
+        else:
+            profiles = enumerate_profiles(args.max_skills, args.max_interests)
+        try:
+            result = RecommendationStore(args.target).refresh(engine, profiles, args.depth)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"{args.target}: {result['profiles']} profiles (top {result['depth']}), "
+              f"{result['recomputed']} recomputed{' (catalogue rescored)' if result['full'] else ''}, "
+              f"{result['added']} added ({result['seconds']:.2f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Encoded responses cached per catalogue version, and precompressed static assets.
+
+Catalogue endpoints return the same bytes until the catalogue changes, so
+ResponseCache keeps each encoded body under the catalogue tag it was built
+from, together with its gzip (and, when the brotli package is installed,
+brotli) compression, made the first time a client accepts it. Entries of
+older tags are dropped as soon as a newer tag is seen. Bodies larger than
+`max_body_bytes` are never kept; the key is remembered as too large and such
+responses keep streaming.
+
+StaticAsset holds one frontend file, its compressions and its ETag, read once.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, Optional, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzipped
+    brotli = None
+
+# Content codings offered to clients, most preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Smaller bodies are sent as they are; compression would barely shrink them
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """`body` compressed with a content coding from ENCODINGS"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encodings, size: int) -> Optional[str]:
+    """The best content coding the client accepts for a body of `size` bytes (None: send it as is)"""
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    for encoding in ENCODINGS:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+class EncodedBody:
+    """A response body and its compressions, made on first use"""
+
+    __slots__ = ('body', 'compressed')
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.compressed: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.compressed.values())
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """The body in a content coding (None: uncompressed)"""
+        if encoding is None:
+            return self.body
+        data = self.compressed.get(encoding)
+        if data is None:
+            # Two threads may both compress a new body; either result is kept
+            data = self.compressed[encoding] = compress(self.body, encoding)
+        return data
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded bodies per catalogue tag, bounded in bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_body_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_body_bytes = min(max_body_bytes, max_bytes)
+        self._tag = None
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _switch_tag(self, tag: str):
+        # Called with the lock held: entries built from another tag are stale
+        if tag != self._tag:
+            self._tag = tag
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, tag: str, key: Hashable) -> Union[EncodedBody, bool, None]:
+        """The cached body of key; False if it is known to be too large; None if absent"""
+        with self._lock:
+            self._switch_tag(tag)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def fill(self, tag: str, key: Hashable, chunks: Iterator[bytes]) -> Tuple[Optional[EncodedBody], Iterator[bytes]]:
+        """
+        Read a response body chunk by chunk and cache it.
+
+        Returns the cached body, or (None, chunks) when the body is larger than
+        max_body_bytes: the chunks read so far and the rest of them, to stream.
+        """
+        buffer, size = [], 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                self.put(tag, key, False)
+                return None, self._rest(buffer, chunks)
+        entry = EncodedBody(b''.join(buffer))
+        self.put(tag, key, entry)
+        return entry, iter(())
+
+    @staticmethod
+    def _rest(buffer, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        yield from buffer
+        buffer.clear()
+        yield from chunks
+
+    def put(self, tag: str, key: Hashable, entry: Union[EncodedBody, bool]):
+        """Store an encoded body (or False: too large to cache), evicting least recently used ones"""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            if tag != self._tag:
+                # Built from a catalogue that has changed (or one not seen yet); it is never served again
+                return
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            if entry:
+                self._bytes += entry.size
+            self._evict()
+
+    def encoded(self, tag: str, key: Hashable, entry: EncodedBody, encoding: Optional[str]) -> bytes:
+        """The body of a cached entry in a content coding, compressing and caching it on first use"""
+        if encoding is None or encoding in entry.compressed:
+            return entry.encoded(encoding)
+        data = compress(entry.body, encoding)
+        with self._lock:
+            if encoding not in entry.compressed:
+                # Another thread may have compressed it meanwhile; only one copy is kept
+                entry.compressed[encoding] = data
+                if tag == self._tag and self._entries.get(key) is entry:
+                    self._bytes += len(data)
+                    self._evict()
+        return data
+
+    def _evict(self):
+        # Called with the lock held; the newest entry is kept even if it alone exceeds the budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            if entry:
+                self._bytes -= entry.size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'encodings': list(ENCODINGS)
+            }
+
+
+class StaticAsset:
+    """A static file read once, with its compressions and a content-hash ETag"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.content = EncodedBody(file.read())
+        self.etag = hashlib.blake2b(self.content.body, digest_size=12).hexdigest()
+        # Compressed up front: assets are small and served on every page load
+        if len(self.content.body) >= MIN_COMPRESS_BYTES:
+            for encoding in ENCODINGS:
+                self.content.encoded(encoding)
+
+    @classmethod
+    def find(cls, name: str, *directories: str) -> Optional['StaticAsset']:
+        """The asset `name` from the first directory that has it, or None"""
+        for directory in directories:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return cls(path)
+        return None
@@ -0,0 +1,354 @@
+"""
+Sampling profiler for recommendation requests, switched on at run time.
+
+While a profiling session runs, a fraction of recommend_internships calls
+(`sample_rate`) register their thread. A background thread wakes up every
+`interval` seconds, reads the current stack of every registered thread with
+sys._current_frames() and counts it, from the recommend_internships frame
+down to the frame executing at that moment. Unsampled calls and the rest of
+the server are not slowed down beyond one attribute check per request.
+
+Memory is bounded: stacks are cut to MAX_DEPTH frames and at most
+`max_stacks` distinct stacks are kept (later new ones are counted as
+"[other]"). A session switches itself off after `duration` seconds or
+`max_samples` samples; its counts stay available until the next one starts.
+
+collapsed() writes the counts in the collapsed-stack format read by
+flamegraph.pl, speedscope and similar tools: one line per distinct stack,
+frames from the root down separated by ';', then the sample count.
+
+With a `shared_dir`, every process of a server (e.g. the gunicorn workers)
+takes part in the same session, whichever of them handles the admin
+requests. The session is described by session.json in that directory: a
+process checks it at most every SHARED_SYNC_INTERVAL seconds, when a
+recommendation is profiled or the profiler is queried, and starts or stops
+its own sampling thread to follow it. Every process writes its counts to
+stacks-<pid>-<profiler>.json as often, and status() and collapsed() add up the counts
+of every process for the current session. max_samples applies to each
+process.
+"""
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Longest profiling session, and defaults of a session
+MAX_DURATION = 600
+DEFAULT_DURATION = 60
+DEFAULT_INTERVAL = 0.005
+DEFAULT_MAX_STACKS = 5000
+DEFAULT_MAX_SAMPLES = 200000
+
+# Frames kept per stack, counted from the executing frame
+MAX_DEPTH = 64
+
+OTHER_STACKS = '[other]'
+
+# Seconds between a process's checks of a shared session, and between writes of its counts
+SHARED_SYNC_INTERVAL = 1.0
+
+SESSION_FILE = 'session.json'
+
+
+def write_json(path: str, value: Any):
+    """Replace a JSON file atomically"""
+    temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(value, file)
+    os.replace(temporary_path, path)
+
+
+def read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def frame_name(code) -> str:
+    """`module.py:qualified name` of a code object"""
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class ProfiledCall:
+    """Registers the calling thread with the profiler while a sampled call runs"""
+
+    __slots__ = ('profiler', 'root')
+
+    def __init__(self, profiler: 'SamplingProfiler', root):
+        self.profiler = profiler
+        self.root = root
+
+    def __enter__(self):
+        self.profiler._threads[threading.get_ident()] = self.root
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._threads.pop(threading.get_ident(), None)
+        return False
+
+
+class SamplingProfiler:
+    """Samples the stacks of profiled calls on a background thread"""
+
+    def __init__(self, shared_dir: str = None):
+        # Directory through which the processes of a server share sessions, or None
+        self.shared_dir = shared_dir
+        self.session_id: Optional[str] = None
+        self._session: Optional[Dict[str, Any]] = None
+        self._session_stamp = None
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._threads: Dict[int, Any] = {}  # Thread id -> root frame of its profiled call
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._names: Dict[Any, str] = {}
+        self.stacks: Counter = Counter()
+        # A sampled call checks this first; False unless a session is running
+        self.active = False
+        self.sample_rate = 1.0
+        self.interval = DEFAULT_INTERVAL
+        self.max_stacks = DEFAULT_MAX_STACKS
+        self.max_samples = DEFAULT_MAX_SAMPLES
+        self.started_at: Optional[datetime] = None
+        self.ends_at: Optional[float] = None
+        self.stopped_reason: Optional[str] = None
+        self.samples = 0
+        self.calls = 0
+
+    def profile(self, root) -> Optional[ProfiledCall]:
+        """
+        Context manager profiling the call running in frame `root`, or None if
+        no session is running or this call is not sampled
+        """
+        if self.shared_dir is not None and time.monotonic() >= self._next_sync:
+            self.sync(wait=False)
+        if not self.active or random.random() >= self.sample_rate:
+            return None
+        self.calls += 1
+        return ProfiledCall(self, root)
+
+    def start(self, duration: float = DEFAULT_DURATION, sample_rate: float = 1.0,
+              interval: float = DEFAULT_INTERVAL, max_stacks: int = DEFAULT_MAX_STACKS,
+              max_samples: int = DEFAULT_MAX_SAMPLES):
+        """Start a new session, discarding the counts of the previous one; raises ValueError"""
+        if not 0 < duration <= MAX_DURATION:
+            raise ValueError(f'duration must be between 0 and {MAX_DURATION} seconds')
+        if not 0 < sample_rate <= 1:
+            raise ValueError('sample_rate must be between 0 and 1')
+        if not 0.001 <= interval <= 1:
+            raise ValueError('interval must be between 0.001 and 1 seconds')
+        if max_stacks < 1 or max_samples < 1:
+            raise ValueError('max_stacks and max_samples must be positive')
+        now = time.time()
+        session = {'id': uuid.uuid4().hex, 'started_at': now, 'ends_at': now + duration, 'stopped': False,
+                   'sample_rate': sample_rate, 'interval': interval, 'max_stacks': max_stacks,
+                   'max_samples': max_samples}
+        if self.shared_dir is None:
+            self._start(session)
+            return
+        self._stop_sampling()
+        write_json(os.path.join(self.shared_dir, SESSION_FILE), session)
+        # Counts of earlier sessions
+        for path in self._counts_paths():
+            _remove(path)
+        self.sync()
+
+    def _start(self, session: Dict[str, Any]):
+        """Start this process's part of a session"""
+        self._stop_sampling()
+        with self._lock:
+            self.session_id = session['id']
+            self.stacks = Counter()
+            self._names = {}
+            self.samples = 0
+            self.calls = 0
+            self.sample_rate = session['sample_rate']
+            self.interval = session['interval']
+            self.max_stacks = session['max_stacks']
+            self.max_samples = session['max_samples']
+            self.started_at = datetime.fromtimestamp(session['started_at'])
+            self.ends_at = time.monotonic() + session['ends_at'] - time.time()
+            self.stopped_reason = None
+            if session['stopped'] or self.ends_at <= time.monotonic():
+                return  # Over before this process saw it
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name='sampling-profiler', daemon=True)
+            self.active = True
+            self._thread.start()
+
+    def sync(self, wait: bool = True):
+        """Follow the shared session: start or stop this process's part of it"""
+        if self.shared_dir is None or not self._sync_lock.acquire(blocking=wait):
+            return
+        try:
+            self._next_sync = time.monotonic() + SHARED_SYNC_INTERVAL
+            path = os.path.join(self.shared_dir, SESSION_FILE)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return
+            if (stat.st_mtime_ns, stat.st_size) == self._session_stamp:
+                return
+            session = read_json(path)
+            if session is None:
+                return  # Being replaced; read again next time
+            self._session, self._session_stamp = session, (stat.st_mtime_ns, stat.st_size)
+            if session['id'] != self.session_id:
+                self._start(session)
+            elif session['stopped']:
+                self._stop_sampling()
+        finally:
+            self._sync_lock.release()
+
+    def stop(self, reason: str = 'stopped'):
+        """End the running session, if any (in every process sharing it); its counts are kept"""
+        if self.shared_dir is not None:
+            self.sync()
+            session = self._session
+            if session is not None and not session['stopped']:
+                write_json(os.path.join(self.shared_dir, SESSION_FILE), dict(session, stopped=True))
+                self.sync()
+        self._stop_sampling(reason)
+
+    def _stop_sampling(self, reason: str = 'stopped'):
+        """End this process's sampling thread, if running"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._finish(reason)
+        if thread is not threading.current_thread():
+            thread.join()
+        self._write_counts()
+
+    def _finish(self, reason: str):
+        # Called with the lock held
+        self.active = False
+        self._stop.set()
+        self._thread = None
+        self._threads.clear()
+        self.stopped_reason = reason
+
+    def _run(self, stop: threading.Event):
+        written_at = time.monotonic()
+        while not stop.wait(self.interval):
+            if time.monotonic() >= written_at + SHARED_SYNC_INTERVAL:
+                self._write_counts()
+                written_at = time.monotonic()
+            if time.monotonic() >= self.ends_at:
+                reason = 'duration elapsed'
+            elif self.samples >= self.max_samples:
+                reason = 'max_samples reached'
+            else:
+                self._sample()
+                continue
+            with self._lock:
+                if not stop.is_set():
+                    self._finish(reason)
+            self._write_counts()
+            return
+
+    def _sample(self):
+        threads = list(self._threads.items())
+        if not threads:
+            return
+        frames = sys._current_frames()
+        for thread_id, root in threads:
+            frame = frames.get(thread_id)
+            names = []
+            while frame is not None and len(names) < MAX_DEPTH:
+                names.append(self._frame_name(frame.f_code))
+                if frame is root:
+                    break
+                frame = frame.f_back
+            if frame is not root:
+                if self._threads.get(thread_id) is not root:
+                    continue  # The call finished meanwhile; the thread runs something else
+                names.append('[truncated]')
+            stack = ';'.join(reversed(names))
+            with self._lock:
+                if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                    stack = OTHER_STACKS
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def _frame_name(self, code) -> str:
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = frame_name(code)
+        return name
+
+    def _counts_paths(self) -> List[str]:
+        return glob.glob(os.path.join(glob.escape(self.shared_dir), 'stacks-*.json'))
+
+    def _write_counts(self):
+        """Write this process's counts of the shared session for the others"""
+        if self.shared_dir is None or self.session_id is None:
+            return
+        with self._lock:
+            counts = {'session': self.session_id, 'samples': self.samples, 'calls': self.calls,
+                      'stacks': dict(self.stacks)}
+        # Named after the process and the profiler, which a forked worker inherits
+        write_json(os.path.join(self.shared_dir, f'stacks-{os.getpid()}-{id(self)}.json'), counts)
+
+    def _shared_counts(self) -> List[Dict[str, Any]]:
+        """The counts of every process for the shared session"""
+        self.sync()
+        self._write_counts()
+        counts = (read_json(path) for path in self._counts_paths())
+        return [count for count in counts if count is not None and count['session'] == self.session_id]
+
+    def collapsed(self) -> str:
+        """The counted stacks in the collapsed-stack format, most frequent first"""
+        if self.shared_dir is not None:
+            stacks = Counter()
+            for count in self._shared_counts():
+                stacks.update(count['stacks'])
+            stacks = stacks.most_common()
+        else:
+            with self._lock:
+                stacks = self.stacks.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        counts = self._shared_counts() if self.shared_dir is not None else None
+        with self._lock:
+            status = {
+                'active': self.active,
+                'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+                'seconds_left': round(max(0.0, self.ends_at - time.monotonic()), 1) if self.active else 0,
+                'stopped_reason': self.stopped_reason,
+                'sample_rate': self.sample_rate,
+                'interval_ms': round(self.interval * 1000, 3),
+                'profiled_calls': self.calls,
+                'samples': self.samples,
+                'stacks': len(self.stacks),
+                'max_stacks': self.max_stacks,
+                'max_samples': self.max_samples
+            }
+        if counts is not None:
+            # Totals of every process taking part in the session
+            stacks = set()
+            for count in counts:
+                stacks.update(count['stacks'])
+            status.update(profiled_calls=sum(count['calls'] for count in counts),
+                          samples=sum(count['samples'] for count in counts), stacks=len(stacks),
+                          processes=len(counts))
+        return status
@@ -0,0 +1,135 @@
+"""
+Skill vocabulary: requirement terms with ids, and skill aliases.
+
+Every distinct requirement term gets an id when a record is loaded, and a
+record keeps its requirements as a bitmask of term ids. A candidate's skills
+are compared with each term of the vocabulary once per request, giving the
+candidate's bitmask of matched terms; the skills score of a posting is then
+an AND and a popcount rather than substring checks per posting.
+
+A candidate skill matches a requirement term when one is part of the other,
+or when their canonical skills are (data/skill_aliases.json: other names of
+the same skill, e.g. "ms excel" for "excel"). A broader requirement also
+accepts the skills listed under it, one way only: a posting asking for
+"programming" accepts a candidate who knows "python", but "python" and
+"java" never match each other through "programming".
+
+Term ids are numbered per catalogue: every catalogue state has a vocabulary
+of its own (for_catalogue), sharing the aliases, so the terms of a replaced
+catalogue are dropped with it and those of postings removed by deltas with
+the next compaction.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+DEFAULT_SKILL_ALIASES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                          'data', 'skill_aliases.json')
+
+
+class SkillVocabulary:
+    """Requirement terms by id, the canonical skill of every synonym, and the broader skills of a skill"""
+
+    def __init__(self, synonyms: Dict[str, List[str]], digest: str = '', broader: Dict[str, List[str]] = None):
+        # Content hash of the aliases file, which skill matches depend on
+        self.digest = digest
+        self.canonical: Dict[str, str] = {}
+        for skill, names in synonyms.items():
+            skill = sys.intern(skill.lower())
+            for name in [skill, *names]:
+                name = sys.intern(name.lower())
+                if self.canonical.get(name, skill) != skill:
+                    # Two skills would match each other through the name
+                    raise ValueError(f"Skill synonym {name!r} is listed under {self.canonical[name]!r} and {skill!r}")
+                self.canonical[name] = skill
+        # Skill -> the broader requirements that accept it
+        self.broader: Dict[str, Tuple[str, ...]] = {}
+        for skill, names in (broader or {}).items():
+            skill = sys.intern(skill.lower())
+            for name in names:
+                name = name.lower()
+                self.broader[name] = self.broader.get(name, ()) + (skill,)
+        self.term_ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self._term_forms: List[Tuple[str, ...]] = []
+        self._lock = threading.Lock()
+
+    def for_catalogue(self) -> 'SkillVocabulary':
+        """A vocabulary with the same aliases and no terms yet, for the records of one catalogue"""
+        vocabulary = SkillVocabulary({}, self.digest)
+        vocabulary.canonical = self.canonical
+        vocabulary.broader = self.broader
+        return vocabulary
+
+    def forms(self, skill: str) -> Tuple[str, ...]:
+        """A lowercased skill, and its canonical skill if that differs"""
+        canonical = self.canonical.get(skill)
+        return (skill,) if canonical is None or canonical == skill else (skill, canonical)
+
+    def candidate_forms(self, skills: Iterable[str]) -> Tuple[str, ...]:
+        """forms() of every (lowercased) candidate skill"""
+        return tuple({form: None for skill in skills for form in self.forms(skill)})
+
+    def forms_match(self, candidate_forms: Tuple[str, ...], term_forms: Tuple[str, ...]) -> bool:
+        broader = self.broader
+        return any(skill in term or term in skill or term in broader.get(skill, ())
+                   for skill in candidate_forms for term in term_forms)
+
+    def matches(self, candidate_forms: Tuple[str, ...], term: str) -> bool:
+        """Whether any candidate skill (see candidate_forms) matches a lowercased requirement term"""
+        return self.forms_match(candidate_forms, self.forms(term))
+
+    def term_id(self, term: str) -> int:
+        """Id of a requirement term, adding it to the vocabulary if it is new"""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            with self._lock:
+                term_id = self.term_ids.get(term)
+                if term_id is None:
+                    # Forms first: readers take the number of terms from term_ids
+                    self._term_forms.append(self.forms(term))
+                    self.terms.append(term)
+                    term_id = self.term_ids[term] = len(self.terms) - 1
+        return term_id
+
+    def mask(self, terms: Iterable[str]) -> int:
+        """Bitmask of the ids of some requirement terms"""
+        mask = 0
+        for term in terms:
+            mask |= 1 << self.term_id(term)
+        return mask
+
+    def matched_mask(self, candidate_forms: Tuple[str, ...], mask: int = 0, checked: int = 0) -> Tuple[int, int]:
+        """
+        Extend the bitmask of terms a candidate matches, `mask` over the first
+        `checked` terms, to every term; returns it with the new term count
+        """
+        term_forms = self._term_forms
+        count = len(self.term_ids)
+        for term_id in range(checked, count):
+            if self.forms_match(candidate_forms, term_forms[term_id]):
+                mask |= 1 << term_id
+        return mask, count
+
+    def terms_of(self, mask: int) -> Iterator[str]:
+        """The terms in a bitmask"""
+        terms = self.terms
+        while mask:
+            lowest = mask & -mask
+            yield terms[lowest.bit_length() - 1]
+            mask ^= lowest
+
+
+def load_skill_vocabulary(path: str = DEFAULT_SKILL_ALIASES_PATH) -> SkillVocabulary:
+    with open(path, 'rb') as file:
+        content = file.read()
+    aliases = json.loads(content)
+    return SkillVocabulary(aliases['synonyms'], hashlib.blake2b(content, digest_size=16).hexdigest(),
+                           aliases.get('broader'))
+
+
+# The skill aliases, shared by the vocabularies of all catalogues and by the dict-based scorer
+SKILLS = load_skill_vocabulary()
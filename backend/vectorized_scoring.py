@@ -0,0 +1,288 @@
+import numpy as np
+from typing import List, Dict
+
+from internship_record import InternshipRecord, CandidateProfile
+from metrics import PhaseTimer
+from recommendation_engine import SKILLS_WEIGHT, SECTOR_WEIGHT, LOCATION_WEIGHT, EDUCATION_WEIGHT
+from skill_vocabulary import SKILLS
+
+# Upper bound on the cells of one candidates x postings score matrix
+MATRIX_CELLS = 4_000_000
+
+
+class VectorizedScorer:
+    """
+    Precompiled scoring mode for RecommendationEngine.
+
+    The catalogue records are encoded once into NumPy arrays so that a request
+    only has to score each *distinct* sector, location and education preference
+    with the scalar helpers, and then broadcast those scores over every posting
+    with array indexing. Skills are scored the same way, once per distinct
+    requirement list. Several candidates can be scored at once as a matrix.
+
+    The scalar helpers on the engine remain the source of truth: lookup tables
+    are filled by calling them on a representative record of each distinct
+    value, and the returned top-k are scored and explained by the engine, so
+    results are identical to the scalar path.
+
+    Catalogue deltas append postings with add() and exclude removed ones with
+    remove(); removed postings score 0 until the catalogue is compacted.
+    """
+
+    def __init__(self, engine, records: List[InternshipRecord]):
+        self.engine = engine
+        self.records = records
+
+        # Arrays are allocated with spare capacity so that add() is amortized
+        # O(1); only the first `size` postings are valid
+        self.size = 0
+        capacity = max(16, len(records))
+        self.posting_requirements = np.zeros(capacity, dtype=np.int32)
+        self.posting_sector = np.zeros(capacity, dtype=np.int32)
+        self.posting_location = np.zeros(capacity, dtype=np.int32)
+        self.posting_remote = np.zeros(capacity, dtype=np.int8)
+        self.posting_education = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        # Skill requirement terms, and the distinct requirement lists as runs of
+        # term ids: list i holds set_terms[set_starts[i]:set_starts[i] + set_sizes[i]].
+        # Requirement order does not affect the score, so lists are sorted first.
+        self.term_ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.requirement_set_ids: Dict[tuple, int] = {}
+        self.set_count = 0
+        self.set_entry_count = 0
+        self.set_starts = np.zeros(16, dtype=np.int64)
+        self.set_sizes = np.zeros(16, dtype=np.int64)
+        self.set_terms = np.zeros(64, dtype=np.int64)
+
+        # One representative record per distinct sector / location / education preference
+        self.sector_ids: Dict[str, int] = {}
+        self.location_ids: Dict[str, int] = {}
+        self.education_ids: Dict[frozenset, int] = {}
+        self.sector_records: List[InternshipRecord] = []
+        self.location_records: List[InternshipRecord] = []
+        self.education_records: List[InternshipRecord] = []
+
+        for record in records:
+            self.add(record)
+
+    @staticmethod
+    def _value_id(ids: Dict, representatives: List, value, representative) -> int:
+        """Return the id of a distinct value, remembering the first representative that has it"""
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = len(representatives)
+            representatives.append(representative)
+            ids[value] = value_id
+        return value_id
+
+    @staticmethod
+    def _grown(array: np.ndarray, needed: int) -> np.ndarray:
+        """A copy of array with room for at least `needed` items, or array itself"""
+        if needed <= len(array):
+            return array
+        grown = np.zeros(max(needed, 2 * len(array)), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _requirement_set_id(self, requirements: tuple) -> int:
+        """Return the id of a distinct (sorted) requirement list, encoding it if it is new"""
+        key = tuple(sorted(requirements))
+        set_id = self.requirement_set_ids.get(key)
+        if set_id is not None:
+            return set_id
+
+        set_id = self.set_count
+        start = self.set_entry_count
+        self.set_terms = self._grown(self.set_terms, start + len(key))
+        for offset, term in enumerate(key):
+            self.set_terms[start + offset] = self._value_id(self.term_ids, self.terms, term, term)
+        self.set_starts = self._grown(self.set_starts, set_id + 1)
+        self.set_sizes = self._grown(self.set_sizes, set_id + 1)
+        self.set_starts[set_id] = start
+        self.set_sizes[set_id] = len(key)
+        self.set_entry_count = start + len(key)
+        self.set_count = set_id + 1
+        self.requirement_set_ids[key] = set_id
+        return set_id
+
+    def add(self, record: InternshipRecord):
+        """
+        Encode a record appended at the end of the catalogue.
+
+        Everything a posting refers to is written before `size` is increased,
+        so concurrent requests (which read `size` first) never see it half-built.
+        """
+        position = self.size
+        if record.position != position:
+            raise ValueError(f"Record position {record.position} does not follow {position} encoded postings")
+
+        if position >= len(self.active):
+            for name in ('posting_requirements', 'posting_sector', 'posting_location',
+                         'posting_remote', 'posting_education', 'active'):
+                setattr(self, name, self._grown(getattr(self, name), position + 1))
+        self.posting_requirements[position] = self._requirement_set_id(record.requirements)
+        self.posting_sector[position] = self._value_id(self.sector_ids, self.sector_records, record.sector, record)
+        self.posting_location[position] = self._value_id(self.location_ids, self.location_records, record.location, record)
+        self.posting_remote[position] = 1 if record.is_remote else 0
+        self.posting_education[position] = self._value_id(
+            self.education_ids, self.education_records, record.preferred_education, record)
+        self.active[position] = True
+        self.size = position + 1
+
+    def remove(self, position: int):
+        """Exclude a posting from scoring"""
+        self.active[position] = False
+
+    @staticmethod
+    def _table(candidates: List[CandidateProfile], key, row) -> np.ndarray:
+        """Stack row(candidate) for every candidate, computing it once per distinct key(candidate)"""
+        rows = {}
+        for candidate in candidates:
+            if key(candidate) not in rows:
+                rows[key(candidate)] = row(candidate)
+        return np.array([rows[key(candidate)] for candidate in candidates], dtype=np.float64)
+
+    def skills_table(self, candidates: List[CandidateProfile]) -> np.ndarray:
+        """record_skills_match of every candidate (rows) for every distinct requirement list (columns)"""
+        # Every list referenced by postings read afterwards is fully written
+        set_count = self.set_count
+        set_entry_count = self.set_entry_count
+        terms = list(self.terms)
+        term_matched = self._table(
+            candidates, lambda candidate: tuple(candidate.skills),
+            lambda candidate: [SKILLS.matches(candidate.skill_forms, term) for term in terms]
+        ).reshape(len(candidates), len(terms))
+
+        # Match count of every list: the difference of a running count over
+        # the term entries at both ends of the list
+        running = np.zeros((len(candidates), set_entry_count + 1))
+        np.cumsum(term_matched[:, self.set_terms[:set_entry_count]], axis=1, out=running[:, 1:])
+        starts = self.set_starts[:set_count]
+        sizes = self.set_sizes[:set_count]
+        matches = running[:, starts + sizes] - running[:, starts]
+        has_requirements = sizes > 0
+        # Avoid division by zero; lists without requirements are masked out
+        return np.where(has_requirements, (matches / np.where(has_requirements, sizes, 1)) * 100, 50.0)
+
+    def sector_table(self, candidates: List[CandidateProfile]) -> np.ndarray:
+        """record_sector_match of every candidate (rows) for every distinct sector (columns)"""
+        records = list(self.sector_records)
+        return self._table(
+            candidates, lambda candidate: tuple(candidate.interests),
+            lambda candidate: [self.engine.record_sector_match(candidate, record) for record in records]
+        ).reshape(len(candidates), len(records))
+
+    def location_table(self, candidates: List[CandidateProfile]) -> np.ndarray:
+        """Location match of every candidate for every distinct location, on-site and remote"""
+        records = list(self.location_records)
+        return self._table(
+            candidates, lambda candidate: candidate.location,
+            lambda candidate: [[self.engine.calculate_location_match(candidate.location, {'location': record.location, 'is_remote': bool(remote)})
+                                for remote in (0, 1)]
+                               for record in records]
+        ).reshape(len(candidates), len(records), 2)
+
+    def education_table(self, candidates: List[CandidateProfile]) -> np.ndarray:
+        """record_education_match of every candidate (rows) for every distinct preference (columns)"""
+        records = list(self.education_records)
+        return self._table(
+            candidates, lambda candidate: candidate.education,
+            lambda candidate: [self.engine.record_education_match(candidate, record) for record in records]
+        ).reshape(len(candidates), len(records))
+
+    def score_matrix(self, candidates: List[CandidateProfile], start: int = 0, end: int = None,
+                     timer: PhaseTimer = None) -> np.ndarray:
+        """
+        Integer match scores (0-100) as a candidates x postings matrix.
+
+        Covers postings start to end (all by default); removed postings score 0.
+        With a timer, the time of each component is added to its phase.
+        """
+        # Read the posting count first: everything it covers is fully written
+        end = self.size if end is None else min(end, self.size)
+        postings = slice(start, end)
+
+        # Weighting the small tables before broadcasting them gives the same
+        # products; the sums accumulate in the same order as combine_scores
+        score = np.take(self.skills_table(candidates) * SKILLS_WEIGHT, self.posting_requirements[postings], axis=1)
+        if timer is not None:
+            timer.lap('skills')
+        score += np.take(self.sector_table(candidates) * SECTOR_WEIGHT, self.posting_sector[postings], axis=1)
+        if timer is not None:
+            timer.lap('sector')
+        location_table = self.location_table(candidates) * LOCATION_WEIGHT
+        score += location_table[:, self.posting_location[postings], self.posting_remote[postings]]
+        if timer is not None:
+            timer.lap('location')
+        score += np.take(self.education_table(candidates) * EDUCATION_WEIGHT, self.posting_education[postings], axis=1)
+        if timer is not None:
+            timer.lap('education')
+        np.trunc(score, out=score)
+        np.clip(score, 0, 100, out=score)
+        scores = score.astype(np.int16)
+        scores[:, ~self.active[postings]] = 0
+        return scores
+
+    def score_all(self, candidate: CandidateProfile) -> np.ndarray:
+        """Return the integer match score (0-100) of every posting for a candidate; 0 for removed ones"""
+        return self.score_matrix([candidate])[0]
+
+    def top_k_matrix(self, scores: np.ndarray, k: int) -> List[np.ndarray]:
+        """
+        Positions of the k best postings with a nonzero score, for every row of a score matrix.
+
+        Ties keep catalogue order, as in the scalar path.
+        """
+        rows, size = scores.shape
+        if size > k:
+            # Only postings scoring at least the k-th best of their row can make it
+            thresholds = np.partition(scores, size - k, axis=1)[:, size - k]
+            thresholds = np.maximum(thresholds, 1)
+        else:
+            thresholds = np.ones(rows, dtype=scores.dtype)
+        candidate_rows, candidate_positions = np.nonzero(scores >= thresholds[:, None])
+        candidate_scores = scores[candidate_rows, candidate_positions]
+        # By row, then highest score, then catalogue position
+        order = np.lexsort((candidate_positions, -candidate_scores.astype(np.int64), candidate_rows))
+        candidate_rows, candidate_positions = candidate_rows[order], candidate_positions[order]
+        bounds = np.searchsorted(candidate_rows, np.arange(rows + 1))
+        return [candidate_positions[bounds[row]:min(bounds[row + 1], bounds[row] + k)] for row in range(rows)]
+
+    def top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k best postings with a nonzero score; ties keep catalogue order"""
+        return self.top_k_matrix(scores[np.newaxis], k)[0]
+
+    def top_k_entries(self, candidates: List[CandidateProfile], k: int,
+                      start: int = 0, end: int = None, timer: PhaseTimer = None) -> List[List[tuple]]:
+        """(score, position) of the k best postings from start to end, best first, for every candidate"""
+        end = self.size if end is None else min(end, self.size)
+        # Score in chunks of candidates so the matrices stay within MATRIX_CELLS
+        chunk_size = max(1, MATRIX_CELLS // max(end - start, self.set_entry_count, 1))
+        entries = []
+        for chunk_start in range(0, len(candidates), chunk_size):
+            scores = self.score_matrix(candidates[chunk_start:chunk_start + chunk_size], start, end, timer)
+            for row_scores, positions in zip(scores, self.top_k_matrix(scores, k)):
+                entries.append([(int(row_scores[position]), start + int(position)) for position in positions])
+            if timer is not None:
+                timer.lap('select')
+        return entries
+
+    def recommend(self, candidate: CandidateProfile, k: int = 5, timer: PhaseTimer = None) -> List[Dict]:
+        """Top-k recommendations with match scores and reasons"""
+        return self.recommend_many([candidate], k, timer)[0]
+
+    def recommend_many(self, candidates: List[CandidateProfile], k: int = 5,
+                       timer: PhaseTimer = None) -> List[List[Dict]]:
+        """Top-k recommendations for several candidates (profiles of this catalogue's vocabulary), as one matrix"""
+        if k <= 0 or not self.size:
+            return [[] for _ in candidates]
+
+        entries = self.top_k_entries(candidates, k, timer=timer)
+        recommendations = [[self.engine.build_record_recommendation(candidate, self.records[position])
+                            for _, position in candidate_entries]
+                           for candidate, candidate_entries in zip(candidates, entries)]
+        if timer is not None:
+            timer.lap('explain')
+        return recommendations
@@ -0,0 +1,10 @@
+"""Benchmarks and synthetic data for the PM Internship recommendation engine"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, 'backend')
+
+# The backend modules import each other as top-level modules
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
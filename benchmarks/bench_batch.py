@@ -0,0 +1,112 @@
+"""
+Compare batch recommendation throughput with one request per candidate.
+
+A batch of profiles (with a share of exact duplicates, as in real uploads)
+is scored once with a loop over recommend_internships and once with
+recommend_batch, for each scoring mode, with result caching disabled. Both
+must return the same recommendations for every profile; any difference
+makes the run fail. The --http flag also times the /api/recommend loop
+against one /api/recommend/batch request through the Flask test client.
+
+    python -m benchmarks.bench_batch --size 100000 --profiles 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_catalogue, generate_profiles
+from recommendation_engine import RecommendationEngine, SCORING_MODES
+
+
+def batch_profiles(count: int, duplicates: float, seed: int) -> list:
+    """`count` profiles of which a `duplicates` share repeats earlier ones"""
+    distinct = max(1, int(count * (1 - duplicates)))
+    profiles = generate_profiles(distinct, seed=seed, edge_cases=True)
+    return [profiles[position % distinct] for position in range(count)]
+
+
+def per_second(count: int, seconds: float) -> float:
+    return round(count / seconds, 1) if seconds else None
+
+
+def time_engine(engine: RecommendationEngine, profiles: list, k: int):
+    started = time.perf_counter()
+    loop = [engine.recommend_internships(profile, k=k) for profile in profiles]
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = [recommendations for _, recommendations in engine.recommend_batch(profiles, k=k)]
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for expected, actual in zip(loop, batch) if expected != actual)
+    return {
+        'mismatches': mismatches + abs(len(loop) - len(batch)),
+        'loop_candidates_per_sec': per_second(len(profiles), loop_seconds),
+        'batch_candidates_per_sec': per_second(len(profiles), batch_seconds)
+    }
+
+
+def time_http(catalogue: list, scoring_mode: str, profiles: list, k: int):
+    """Time the HTTP routes through the Flask test client on a catalogue file"""
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'catalogue.json')
+        with open(data_path, 'w', encoding='utf-8') as file:
+            json.dump(catalogue, file)
+        os.environ.update(INTERNSHIPS_DATA_PATH=data_path, SCORING_MODE=scoring_mode, RECOMMEND_CACHE_SIZE='0')
+        sys.modules.pop('app', None)
+        import app
+        client = app.app.test_client()
+
+        started = time.perf_counter()
+        for profile in profiles:
+            client.post(f'/api/recommend?k={k}', json=profile).get_json()
+        loop_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = client.post(f'/api/recommend/batch?k={k}', data=json.dumps(profiles))
+        lines = response.get_data(as_text=True).splitlines()
+        batch_seconds = time.perf_counter() - started
+
+    return {
+        'lines': len(lines),
+        'loop_candidates_per_sec': per_second(len(profiles), loop_seconds),
+        'batch_candidates_per_sec': per_second(len(profiles), batch_seconds)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=20000, help='synthetic catalogue size')
+    parser.add_argument('--profiles', type=int, default=1000, help='profiles in the batch')
+    parser.add_argument('--duplicates', type=float, default=0.3, help='share of repeated profiles')
+    parser.add_argument('--k', type=int, default=5, help='recommendations per profile')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--http', action='store_true', help='also time the HTTP routes')
+    args = parser.parse_args(argv)
+
+    catalogue = generate_catalogue(args.size, seed=args.seed)
+    profiles = batch_profiles(args.profiles, args.duplicates, seed=args.seed + 1)
+
+    report = {
+        'catalogue_size': args.size,
+        'profiles': args.profiles,
+        'duplicates': args.duplicates,
+        'k': args.k,
+        'engine': {},
+        'http': {}
+    }
+    for scoring_mode in SCORING_MODES:
+        engine = RecommendationEngine(scoring_mode=scoring_mode, internships=catalogue)
+        report['engine'][scoring_mode] = time_engine(engine, profiles, args.k)
+        if args.http:
+            report['http'][scoring_mode] = time_http(catalogue, scoring_mode, profiles, args.k)
+
+    print(json.dumps(report, indent=2))
+    return 1 if any(result['mismatches'] for result in report['engine'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Microbenchmarks of the scoring functions of RecommendationEngine.
+
+Each function is timed in rounds: a round takes a fresh candidate profile
+(so per-request memo tables start empty, as in a real request) and calls the
+function on `--calls` postings; the per-call time of every round is one
+sample. Whole-request functions (recommend_internships in both scoring
+modes, search_internships, find_records) are timed one call per sample.
+Results are per-call p50/p95/p99 in microseconds plus the peak RSS, as JSON
+to compare between commits with benchmarks.compare.
+
+    python -m benchmarks.bench_functions --size 100000 --output functions.json
+"""
+import argparse
+import itertools
+import sys
+import time
+
+from benchmarks.report import latency_summary, peak_rss_kb, write_report
+from benchmarks.synthetic import generate_catalogue, generate_profiles, SECTORS, CITIES
+from internship_record import CandidateProfile
+from recommendation_engine import RecommendationEngine
+
+
+def time_rounds(function, candidates, postings, calls: int) -> list:
+    """Per-call time in microseconds of one round of `calls` calls per candidate"""
+    samples = []
+    postings = itertools.cycle(postings)
+    for candidate in candidates:
+        round_postings = [next(postings) for _ in range(calls)]
+        started = time.perf_counter()
+        for posting in round_postings:
+            function(candidate, posting)
+        samples.append((time.perf_counter() - started) / calls * 1e6)
+    return samples
+
+
+def time_calls(function, arguments) -> list:
+    """Time in microseconds of every call of function(*arguments[i])"""
+    samples = []
+    for argument in arguments:
+        started = time.perf_counter()
+        function(*argument)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def scoring_functions(engine: RecommendationEngine) -> dict:
+    """name -> (function(candidate, posting), whether it takes a CandidateProfile and a record rather than dicts)"""
+    return {
+        # The dict-based helpers behind calculate_match_score
+        'calculate_skills_match': (
+            lambda candidate, internship: engine.calculate_skills_match(candidate['skills'], internship['requirements']),
+            False),
+        'calculate_sector_match': (
+            lambda candidate, internship: engine.calculate_sector_match(candidate['interests'], internship['sector']),
+            False),
+        'calculate_location_match': (
+            lambda candidate, internship: engine.calculate_location_match(candidate['location'], internship),
+            False),
+        'calculate_education_match': (
+            lambda candidate, internship: engine.calculate_education_match(candidate['education'],
+                                                                           internship['preferred_education']),
+            False),
+        'calculate_match_score': (engine.calculate_match_score, False),
+        # The record-based equivalents used on the hot path
+        'record_skills_match': (engine.record_skills_match, True),
+        'record_sector_match': (engine.record_sector_match, True),
+        'record_location_match': (engine.record_location_match, True),
+        'record_education_match': (engine.record_education_match, True),
+        'build_record_recommendation': (engine.build_record_recommendation, True)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='synthetic catalogue size')
+    parser.add_argument('--rounds', type=int, default=200, help='rounds (fresh profiles) per function')
+    parser.add_argument('--calls', type=int, default=500, help='calls per round')
+    parser.add_argument('--requests', type=int, default=50, help='samples of whole-request functions')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    catalogue = generate_catalogue(args.size, seed=args.seed)
+    profiles = generate_profiles(args.rounds, seed=args.seed + 1, edge_cases=True)
+    engines = {mode: RecommendationEngine(scoring_mode=mode, internships=catalogue)
+               for mode in ('scalar', 'vectorized')}
+    engine = engines['scalar']
+    records = engine.records
+
+    results = {}
+    for name, (function, on_records) in scoring_functions(engine).items():
+        # One unmeasured round first, so that caches and the allocator are warm
+        time_rounds(function, [CandidateProfile(profiles[0], engine.state.skills) if on_records else profiles[0]],
+                    records if on_records else catalogue, args.calls)
+        if on_records:
+            # A fresh CandidateProfile (and memo tables) per round, as every request builds its own
+            samples = time_rounds(function, (CandidateProfile(profile, engine.state.skills) for profile in profiles), records, args.calls)
+        else:
+            samples = time_rounds(function, profiles, catalogue, args.calls)
+        results[name] = latency_summary(samples, unit='us')
+
+    requests = profiles[:args.requests]
+    for mode, mode_engine in engines.items():
+        results[f'recommend_internships[{mode}]'] = latency_summary(
+            time_calls(mode_engine.recommend_internships, [(profile, args.k) for profile in requests]), unit='us')
+    searches = [(sector, city.lower(), None) for sector, city in zip(itertools.cycle(SECTORS), CITIES)]
+    results['search_internships'] = latency_summary(
+        time_calls(engine.search_internships, searches * max(1, args.requests // len(searches))), unit='us')
+    results['find_records[limit=50]'] = latency_summary(
+        time_calls(lambda sector: engine.find_records(sector=sector, limit=50),
+                   [(sector,) for sector in SECTORS] * max(1, args.requests // len(SECTORS))), unit='us')
+
+    write_report('functions', vars(args), {'functions': results, 'peak_rss_kb': peak_rss_kb()}, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Measure how sharded scoring scales with the number of worker processes.
+
+A synthetic NDJSON catalogue is loaded once; for every worker count the
+engine's catalogue is sharded across a fresh process pool, and both the
+latency of single requests and the throughput of a batch are timed. The
+in-process engine (no pool) is the reference: any difference in the
+returned recommendations makes the run fail. Speedups are bounded by the
+cores actually available (reported as `cpu_count`).
+
+    python -m benchmarks.bench_parallel --size 1000000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_catalogue, generate_profiles
+from parallel_scoring import ParallelScorer
+from recommendation_engine import RecommendationEngine
+
+
+def run(engine: RecommendationEngine, requests: list, batch: list, k: int):
+    """Single-request results and mean latency, then batch results and throughput"""
+    started = time.perf_counter()
+    singles = [engine.recommend_internships(profile, k=k) for profile in requests]
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = [recommendations for _, recommendations in engine.recommend_batch(batch, k=k)]
+    batch_seconds = time.perf_counter() - started
+    return singles, batched, {
+        'single_mean_ms': round(single_seconds / len(requests) * 1000, 1),
+        'batch_candidates_per_sec': round(len(batch) / batch_seconds, 1)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000, help='synthetic catalogue size')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--scoring-mode', default='scalar', choices=('scalar', 'vectorized'))
+    parser.add_argument('--requests', type=int, default=5, help='single requests to time')
+    parser.add_argument('--batch', type=int, default=64, help='profiles in the timed batch')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'catalogue.ndjson')
+        write_catalogue(data_path, args.size, seed=args.seed)
+        started = time.perf_counter()
+        engine = RecommendationEngine(scoring_mode=args.scoring_mode, data_path=data_path)
+        load_seconds = time.perf_counter() - started
+
+        requests = generate_profiles(args.requests, seed=args.seed + 1, edge_cases=True)
+        batch = generate_profiles(args.batch, seed=args.seed + 2, edge_cases=True)
+        expected_singles, expected_batch, baseline = run(engine, requests, batch, args.k)
+
+        report = {
+            'catalogue_size': args.size,
+            'scoring_mode': args.scoring_mode,
+            'cpu_count': os.cpu_count(),
+            'load_s': round(load_seconds, 1),
+            'in_process': baseline,
+            'workers': {}
+        }
+        mismatches = 0
+        engine.parallel_min_postings = 0
+        if max(args.workers) > (os.cpu_count() or 1):
+            print(f"Warning: {os.cpu_count()} core(s) for up to {max(args.workers)} workers; "
+                  f"these runs measure the pool's overhead, not its speedup", file=sys.stderr)
+        for workers in args.workers:
+            engine.parallel_scorer = ParallelScorer(engine, workers)
+            engine.parallel_scorer.start()
+            try:
+                singles, batched, timings = run(engine, requests, batch, args.k)
+            finally:
+                engine.parallel_scorer.close()
+            mismatches += (singles != expected_singles) + (batched != expected_batch)
+            timings['batch_speedup'] = round(timings['batch_candidates_per_sec'] / baseline['batch_candidates_per_sec'], 2)
+            report['workers'][workers] = timings
+
+    report['mismatches'] = mismatches
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Compare the scalar and vectorized scoring modes of RecommendationEngine.
+
+Every profile is scored by both modes; any difference in the returned top-k
+(ids, match scores or match reasons) is reported and makes the run fail.
+
+    python -m benchmarks.bench_scoring --size 100000 --profiles 50
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.synthetic import generate_catalogue, generate_profiles
+from recommendation_engine import RecommendationEngine
+
+
+def summarize(recommendations):
+    return [(r['id'], r['match_score'], r['match_reason']) for r in recommendations]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='synthetic catalogue size')
+    parser.add_argument('--profiles', type=int, default=200, help='number of candidate profiles')
+    parser.add_argument('--k', type=int, default=5, help='recommendations per profile')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    catalogue = generate_catalogue(args.size, seed=args.seed)
+    profiles = generate_profiles(args.profiles, seed=args.seed + 1, edge_cases=True)
+
+    scalar = RecommendationEngine(scoring_mode='scalar', internships=catalogue)
+    vectorized = RecommendationEngine(scoring_mode='vectorized', internships=catalogue)
+
+    timings = {'scalar': 0.0, 'vectorized': 0.0}
+    mismatches = 0
+    for profile in profiles:
+        started = time.perf_counter()
+        expected = scalar.recommend_internships(profile, k=args.k)
+        timings['scalar'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = vectorized.recommend_internships(profile, k=args.k)
+        timings['vectorized'] += time.perf_counter() - started
+
+        if summarize(expected) != summarize(actual):
+            mismatches += 1
+            print(f"Mismatch for profile {profile['id']}: {profile}", file=sys.stderr)
+
+    report = {
+        'catalogue_size': args.size,
+        'profiles': args.profiles,
+        'k': args.k,
+        'mismatches': mismatches,
+        'mean_ms': {mode: round(total / args.profiles * 1000, 3) for mode, total in timings.items()}
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
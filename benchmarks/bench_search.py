@@ -0,0 +1,117 @@
+"""
+Time catalogue search and id lookup against the previous linear scans.
+
+Results of the indexed search are checked against the linear scan for every
+query; any difference makes the run fail. The --http flag also times the
+/api/internships/search route end to end through the Flask test client.
+
+    python -m benchmarks.bench_search --size 100000
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.synthetic import generate_catalogue, SECTORS
+from recommendation_engine import RecommendationEngine
+
+QUERIES = [
+    {'sector': 'technology'},
+    {'location': 'mumbai'},
+    {'location': 'remote'},
+    {'location': 'delhi', 'is_remote': False},
+    {'sector': 'healthcare', 'location': 'chennai'},
+    {'sector': 'finance', 'location': 'pune', 'is_remote': True},
+    {'sector': 'agriculture', 'is_remote': False},
+    {'is_remote': True},
+    {'sector': 'space'},
+]
+
+
+def linear_search(internships, sector=None, location=None, is_remote=None):
+    """The full-scan search that the index replaces, kept as the reference"""
+    results = internships.copy()
+    if sector:
+        results = [i for i in results if i.get('sector', '').lower() == sector.lower()]
+    if location:
+        results = [i for i in results if
+                   location.lower() in i.get('location', '').lower() or
+                   (location.lower() == 'remote' and i.get('is_remote', False))]
+    if is_remote is not None:
+        results = [i for i in results if i.get('is_remote', False) == is_remote]
+    return results
+
+
+def linear_get(internships, internship_id):
+    for internship in internships:
+        if internship.get('id') == internship_id:
+            return internship
+    return {}
+
+
+def best_of(repeat, function, *args, **kwargs):
+    """Best wall time in milliseconds over `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000, help='synthetic catalogue size')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--http', action='store_true', help='also time the Flask route')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    catalogue = generate_catalogue(args.size, seed=args.seed)
+    started = time.perf_counter()
+    engine = RecommendationEngine(internships=catalogue)
+    build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    mismatches = 0
+    queries = []
+    for query in QUERIES:
+        expected = linear_search(catalogue, **query)
+        if engine.search_internships(**query) != expected:
+            mismatches += 1
+            print(f"Mismatch for query {query}", file=sys.stderr)
+        queries.append({
+            'query': query,
+            'results': len(expected),
+            'linear_ms': best_of(max(1, args.repeat // 10), linear_search, catalogue, **query),
+            'indexed_ms': best_of(args.repeat, engine.search_internships, **query)
+        })
+
+    last_id = catalogue[-1]['id'] if catalogue else ''
+    report = {
+        'catalogue_size': args.size,
+        'index_build_ms': build_ms,
+        'mismatches': mismatches,
+        'get_by_id': {
+            'linear_ms': best_of(max(1, args.repeat // 10), linear_get, catalogue, last_id),
+            'indexed_ms': best_of(args.repeat, engine.get_internship_by_id, last_id)
+        },
+        'search': queries
+    }
+
+    if args.http:
+        import app as flask_app
+        flask_app.rec_engine.load_catalogue(catalogue)
+        client = flask_app.app.test_client()
+        report['http_search'] = [
+            {'url': url, 'ms': best_of(max(1, args.repeat // 10), client.get, url)}
+            for url in ('/api/internships/search?sector=%s&location=patna' % SECTORS[0],
+                        '/api/internships/search?sector=%s&location=mumbai' % SECTORS[1],
+                        '/api/internships/search?location=guwahati&remote=true')
+        ]
+
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Cold start time of the app, with and without a catalogue snapshot.
+
+Every run starts a fresh Python process that imports Flask and then
+backend/app.py (which loads the catalogue) on a synthetic catalogue, and
+reports the time of both imports, the wall time from starting the process
+to its exit and its peak RSS. Variants:
+
+- build: the catalogue is parsed and prepared from the data file;
+- snapshot: it is loaded from a snapshot written by an unmeasured first run.
+
+Results are p50/p95/p99 in milliseconds per variant, as JSON to compare
+between commits with benchmarks.compare. The OS page cache is warm after the
+first run, as on a server restarting its workers.
+
+    python -m benchmarks.bench_startup --size 100000 --runs 5 --scoring-mode vectorized
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import PROJECT_ROOT
+from benchmarks.report import latency_summary, write_report
+from benchmarks.synthetic import write_catalogue
+
+# Runs in the measured process; prints its timings as JSON
+CHILD_SCRIPT = '''
+import json, resource, sys, time
+started = time.perf_counter()
+import flask
+flask_imported = time.perf_counter()
+import app
+app_imported = time.perf_counter()
+print(json.dumps({
+    'flask_import_ms': (flask_imported - started) * 1000,
+    'app_import_ms': (app_imported - flask_imported) * 1000,
+    'internships': len(app.rec_engine.records),
+    'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+}))
+'''
+
+VARIANTS = ('build', 'snapshot')
+
+
+def run_once(env: dict) -> dict:
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=os.path.join(PROJECT_ROOT, 'backend'),
+                               env=env, capture_output=True, text=True, check=True)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['wall_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help='synthetic catalogue size')
+    parser.add_argument('--format', choices=('json', 'ndjson'), default='json', help='catalogue file format')
+    parser.add_argument('--scoring-mode', default='scalar', choices=('scalar', 'vectorized'))
+    parser.add_argument('--runs', type=int, default=5, help='measured runs per variant')
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, f'catalogue.{args.format}')
+        write_catalogue(data_path, args.size, seed=args.seed)
+        for variant in args.variants:
+            env = dict(os.environ, INTERNSHIPS_DATA_PATH=data_path, SCORING_MODE=args.scoring_mode)
+            env.pop('CATALOGUE_SNAPSHOT_PATH', None)
+            if variant == 'snapshot':
+                env['CATALOGUE_SNAPSHOT_PATH'] = os.path.join(directory, 'catalogue.snapshot')
+                run_once(env)  # Writes the snapshot
+            runs = [run_once(env) for _ in range(args.runs)]
+            if any(run['internships'] != args.size for run in runs):
+                raise SystemExit(f'{variant}: expected {args.size} internships, got {runs[0]["internships"]}')
+            results[variant] = {
+                'wall': latency_summary([run['wall_ms'] for run in runs], digits=1),
+                'flask_import': latency_summary([run['flask_import_ms'] for run in runs], digits=1),
+                'app_import': latency_summary([run['app_import_ms'] for run in runs], digits=1),
+                'peak_rss_kb': max(run['peak_rss_kb'] for run in runs)
+            }
+
+    write_report('startup', vars(args), results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Measure per-worker memory of gunicorn with and without a preloaded catalogue.
+
+For each mode, gunicorn is started with gunicorn.conf.py on a synthetic
+catalogue, every worker is warmed up with recommendation requests, and the
+RSS, PSS (proportional set size: shared pages divided among the processes
+sharing them) and private memory of each worker is read from /proc. PSS and
+private memory are what show the copy-on-write savings; RSS counts shared
+pages in full for every process. Linux only.
+
+    python -m benchmarks.bench_workers --size 100000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks import PROJECT_ROOT
+from benchmarks.synthetic import generate_catalogue, generate_profiles
+
+
+def read_memory_kb(pid: int) -> dict:
+    """RSS, PSS and private memory of a process, in kB, from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'private_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def child_pids(parent_pid: int) -> list:
+    """Pids of the direct children of a process"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as file:
+                # The command name may contain spaces; fields resume after ')'
+                fields = file.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('The server exited during startup')
+        try:
+            urllib.request.urlopen(base_url + '/api-status', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('The server did not become ready in time')
+
+
+def measure(args, data_path: str, preload: bool, port: int) -> dict:
+    env = dict(os.environ,
+               INTERNSHIPS_DATA_PATH=data_path,
+               SCORING_MODE=args.scoring_mode,
+               WEB_CONCURRENCY=str(args.workers),
+               PRELOAD_APP='true' if preload else 'false',
+               PORT=str(port),
+               RECOMMEND_CACHE_SIZE='0')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', os.path.join(PROJECT_ROOT, 'gunicorn.conf.py')],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_until_ready(base_url, process, args.timeout)
+        # Wait for every worker to finish loading (without preload each loads its own copy)
+        deadline = time.monotonic() + args.timeout
+        while len(child_pids(process.pid)) < args.workers and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+        # Warm up: enough requests that every worker scores the catalogue
+        for profile in generate_profiles(args.workers * 4, seed=2):
+            request = urllib.request.Request(base_url + '/api/recommend', data=json.dumps(profile).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(request, timeout=args.timeout).read()
+
+        workers = [dict(pid=pid, **read_memory_kb(pid)) for pid in child_pids(process.pid)]
+        return {
+            'preload': preload,
+            'master': read_memory_kb(process.pid),
+            'workers': workers,
+            'total_pss_kb': read_memory_kb(process.pid)['pss_kb'] + sum(worker['pss_kb'] for worker in workers)
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000, help='synthetic catalogue size')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--format', choices=('json', 'ndjson'), default='json')
+    parser.add_argument('--scoring-mode', default='vectorized', choices=('scalar', 'vectorized'))
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, f'catalogue.{args.format}')
+        with open(data_path, 'w', encoding='utf-8') as file:
+            catalogue = generate_catalogue(args.size)
+            if args.format == 'json':
+                json.dump(catalogue, file)
+            else:
+                file.writelines(json.dumps(internship) + '\n' for internship in catalogue)
+            del catalogue
+
+        report = {
+            'catalogue_size': args.size,
+            'format': args.format,
+            'scoring_mode': args.scoring_mode,
+            'runs': [measure(args, data_path, preload, args.port) for preload in (False, True)]
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare two benchmark reports, e.g. of the parent commit and a change.
+
+Every numeric result present in both reports is compared: latencies
+(`*_ms`, `*_us`, `*_s`, except maxima) and memory (`*rss*`) should not
+grow, throughputs (`*per_sec*`) should not shrink. Changes beyond
+`--threshold` (relative) are listed as regressions or improvements; any
+regression makes the run fail.
+Microbenchmark latencies are noisy below a few microseconds, so compare
+reports measured on the same idle machine, ideally with several runs.
+
+    python -m benchmarks.bench_functions --output before.json   # on the parent commit
+    python -m benchmarks.bench_functions --output after.json    # with the change
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+def metrics(value: Any, path: str = '') -> Iterator[Tuple[str, float]]:
+    """(dotted path, number) of every numeric leaf of a report's results"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from metrics(item, f'{path}.{key}' if path else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, value
+
+
+def direction(path: str) -> Optional[int]:
+    """+1 if larger values are better, -1 if smaller ones are, None if the metric is not compared"""
+    name = path.rsplit('.', 1)[-1]
+    if name.startswith('max_'):
+        return None  # A single worst sample; too noisy to compare
+    if 'per_sec' in name or 'speedup' in name:
+        return 1
+    if name.endswith(('_ms', '_us', '_s')) or 'rss' in path:
+        return -1
+    return None
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    old = dict(metrics(before.get('results', {})))
+    new = dict(metrics(after.get('results', {})))
+    regressions, improvements, compared = [], [], 0
+    for path, old_value in old.items():
+        better = direction(path)
+        if better is None or path not in new:
+            continue
+        compared += 1
+        new_value = new[path]
+        if not old_value:
+            continue
+        change = (new_value - old_value) / abs(old_value)
+        entry = {'metric': path, 'before': old_value, 'after': new_value, 'change': round(change, 4)}
+        if change * better < -threshold:
+            regressions.append(entry)
+        elif change * better > threshold:
+            improvements.append(entry)
+    return {
+        'before': before.get('environment', {}).get('commit'),
+        'after': after.get('environment', {}).get('commit'),
+        'threshold': threshold,
+        'compared': compared,
+        'regressions': regressions,
+        'improvements': improvements
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('before', help='report of the baseline')
+    parser.add_argument('after', help='report of the change')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change to report (0.1 = 10%%)')
+    args = parser.parse_args(argv)
+
+    with open(args.before, encoding='utf-8') as file:
+        before = json.load(file)
+    with open(args.after, encoding='utf-8') as file:
+        after = json.load(file)
+    if before.get('benchmark') != after.get('benchmark'):
+        parser.error(f"Reports of different benchmarks: {before.get('benchmark')} and {after.get('benchmark')}")
+
+    result = compare(before, after, args.threshold)
+    print(json.dumps(result, indent=2))
+    return 1 if result['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+End-to-end HTTP load test of the recommendation API.
+
+Starts the app on a synthetic catalogue (the Flask development server,
+gunicorn, or gunicorn with ASGI workers), or targets a running instance with
+--url, then sends a weighted mix of requests from `--concurrency` keep-alive
+connections for `--duration` seconds after a warm-up. Reports latency
+p50/p95/p99 and throughput per endpoint and overall, status codes, and the
+peak RSS of the server processes (Linux, local servers only) as JSON, to
+compare between commits with benchmarks.compare.
+
+The load generator shares the machine (and, in Python, one core per client
+process) with the server, so compare results from the same machine only.
+
+    python -m benchmarks.load_http --size 100000 --server gunicorn --concurrency 16 --duration 30
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from benchmarks import PROJECT_ROOT
+from benchmarks.bench_workers import child_pids, wait_until_ready
+from benchmarks.report import latency_summary, peak_rss_kb, write_report
+from benchmarks.synthetic import SECTORS, CANDIDATE_LOCATIONS, write_catalogue, generate_profiles
+
+# Default share of each kind of request
+DEFAULT_MIX = 'recommend=6,listing=2,search=2,detail=2,sectors=1'
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint: {name} (one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def recommend_request(rng: random.Random, profiles: list, size: int):
+    return 'POST', '/api/recommend', json.dumps(rng.choice(profiles)).encode()
+
+
+def listing_request(rng: random.Random, profiles: list, size: int):
+    return 'GET', '/api/internships?limit=50&fields=id,title,company,location,stipend', None
+
+
+def search_request(rng: random.Random, profiles: list, size: int):
+    query = urllib.parse.urlencode({'sector': rng.choice(SECTORS), 'location': rng.choice(CANDIDATE_LOCATIONS),
+                                    'limit': 50})
+    return 'GET', f'/api/internships/search?{query}', None
+
+
+def detail_request(rng: random.Random, profiles: list, size: int):
+    # Synthetic ids (see benchmarks.synthetic)
+    return 'GET', f'/api/internships/SYN{rng.randrange(size):07d}', None
+
+
+def sectors_request(rng: random.Random, profiles: list, size: int):
+    return 'GET', '/api/sectors', None
+
+
+ENDPOINTS = {
+    'recommend': recommend_request,
+    'listing': listing_request,
+    'search': search_request,
+    'detail': detail_request,
+    'sectors': sectors_request
+}
+
+
+class LoadClient(threading.Thread):
+    """One keep-alive connection sending requests until the deadline"""
+
+    def __init__(self, host: str, port: int, mix: dict, profiles: list, size: int, seed: int,
+                 warm_until: float, deadline: float, timeout: float):
+        super().__init__(daemon=True)
+        self.host, self.port, self.timeout = host, port, timeout
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.profiles, self.size = profiles, size
+        self.rng = random.Random(seed)
+        self.warm_until, self.deadline = warm_until, deadline
+        self.latencies = {name: [] for name in mix}
+        self.statuses = {}
+        self.errors = 0
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        while True:
+            now = time.perf_counter()
+            if now >= self.deadline:
+                break
+            name = self.rng.choices(self.names, self.weights)[0]
+            method, path, body = ENDPOINTS[name](self.rng, self.profiles, self.size)
+            headers = {'Content-Type': 'application/json'} if body else {}
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if started >= self.warm_until:
+                self.latencies[name].append(elapsed_ms)
+                self.statuses[response.status] = self.statuses.get(response.status, 0) + 1
+        connection.close()
+
+
+def start_server(args, data_path: str) -> subprocess.Popen:
+    env = dict(os.environ,
+               INTERNSHIPS_DATA_PATH=data_path,
+               SCORING_MODE=args.scoring_mode,
+               PORT=str(args.port),
+               WEB_CONCURRENCY=str(args.workers),
+               ASGI='true' if args.server == 'asgi' else 'false')
+    if args.server == 'flask':
+        command = [sys.executable, os.path.join(PROJECT_ROOT, 'backend', 'app.py')]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '--config', os.path.join(PROJECT_ROOT, 'gunicorn.conf.py')]
+    return subprocess.Popen(command, cwd=PROJECT_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_load(args, base_url: str) -> dict:
+    parsed = urllib.parse.urlsplit(base_url)
+    profiles = generate_profiles(500, seed=args.seed + 1)
+    mix = args.mix
+    started = time.perf_counter()
+    warm_until = started + args.warmup
+    deadline = warm_until + args.duration
+    clients = [LoadClient(parsed.hostname, parsed.port or 80, mix, profiles, args.size, args.seed + number,
+                          warm_until, deadline, args.timeout)
+               for number in range(args.concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    endpoints = {}
+    for name in mix:
+        samples = list(itertools.chain.from_iterable(client.latencies[name] for client in clients))
+        endpoints[name] = dict(latency_summary(samples), requests_per_sec=round(len(samples) / args.duration, 1))
+    samples = list(itertools.chain.from_iterable(
+        latencies for client in clients for latencies in client.latencies.values()))
+    statuses = {}
+    for client in clients:
+        for status, count in client.statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    return {
+        'overall': dict(latency_summary(samples), requests_per_sec=round(len(samples) / args.duration, 1)),
+        'endpoints': endpoints,
+        'statuses': statuses,
+        'errors': sum(client.errors for client in clients)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='running server to load (default: start one locally); '
+                                      'the detail requests expect a synthetic catalogue of --size postings')
+    parser.add_argument('--server', choices=('flask', 'gunicorn', 'asgi'), default='gunicorn')
+    parser.add_argument('--size', type=int, default=10000, help='synthetic catalogue size')
+    parser.add_argument('--scoring-mode', default='vectorized', choices=('scalar', 'vectorized'))
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before that')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help=f'endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--timeout', type=float, default=60, help='startup and request timeout')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        results = run_load(args, args.url.rstrip('/'))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            data_path = os.path.join(directory, 'catalogue.json')
+            write_catalogue(data_path, args.size, seed=args.seed)
+            process = start_server(args, data_path)
+            try:
+                base_url = f'http://127.0.0.1:{args.port}'
+                wait_until_ready(base_url, process, args.timeout)
+                results = run_load(args, base_url)
+                peaks = [peak_rss_kb(pid) for pid in [process.pid] + child_pids(process.pid)]
+                results['server_processes'] = len(peaks)
+                results['server_peak_rss_kb'] = {'max': max(peaks), 'total': sum(peaks)}
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    write_report('load_http', vars(args), results, args.output)
+    return 1 if results['errors'] or any(status.startswith('5') for status in results['statuses']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Machine-readable benchmark reports.
+
+Every report is one JSON object with the environment it was measured in
+(commit, Python, CPU count), the benchmark's parameters and its results, so
+reports of two commits can be compared with benchmarks.compare. Latencies are
+summarized as percentiles (the unit, ms or us, is part of each key) and
+memory as peak RSS in kB.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks import PROJECT_ROOT
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Value below which `fraction` of the (sorted) samples fall, by linear interpolation"""
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * fraction
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def latency_summary(samples: List[float], unit: str = 'ms', digits: int = 3) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99/max of latency samples, with the unit in the key names"""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        f'mean_{unit}': round(sum(ordered) / len(ordered), digits) if ordered else 0.0,
+        f'p50_{unit}': round(percentile(ordered, 0.50), digits),
+        f'p95_{unit}': round(percentile(ordered, 0.95), digits),
+        f'p99_{unit}': round(percentile(ordered, 0.99), digits),
+        f'max_{unit}': round(ordered[-1], digits) if ordered else 0.0
+    }
+
+
+def peak_rss_kb(pid: Optional[int] = None) -> int:
+    """Peak resident set size of this process, or of another one (Linux: from /proc)"""
+    if pid is None:
+        # kB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+    with open(f'/proc/{pid}/status') as file:
+        for line in file:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the working tree, with '-dirty' if it has uncommitted changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if dirty else commit
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+
+def write_report(benchmark: str, parameters: Dict[str, Any], results: Dict[str, Any],
+                 output: Optional[str] = None) -> Dict[str, Any]:
+    """Print the report as JSON, and also write it to `output` if given"""
+    report = {
+        'benchmark': benchmark,
+        'environment': environment(),
+        'parameters': parameters,
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    return report
@@ -0,0 +1,198 @@
+"""
+Synthetic internship catalogues and candidate profiles for benchmarks.
+
+Postings and profiles are drawn deterministically (per seed) from the enums
+of data/internship_schema.json and data/candidate_schema.json, so they
+validate against the schemas. Catalogues can be written at any scale:
+
+    python -m benchmarks.synthetic --scale 1m --output /tmp/internships.ndjson \
+        --profiles 1000 --profiles-output /tmp/profiles.json --validate
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from typing import List, Dict, Any
+
+from benchmarks import PROJECT_ROOT
+from catalogue_delta import validate_internship, validate_object
+from catalogue_store import is_ndjson_path
+
+# Enumerations from data/internship_schema.json and data/candidate_schema.json
+SECTORS = ["technology", "healthcare", "education", "finance", "manufacturing",
+           "agriculture", "retail", "government", "nonprofit"]
+EDUCATION_LEVELS = ["10th", "12th", "diploma", "undergraduate", "postgraduate"]
+CANDIDATE_SKILLS = ["computer", "communication", "sales", "design", "accounting",
+                    "teaching", "mechanical", "electrical", "agriculture", "healthcare"]
+CANDIDATE_LOCATIONS = ["mumbai", "delhi", "bangalore", "chennai", "kolkata",
+                       "pune", "hyderabad", "remote", "any"]
+COMPANY_SIZES = ["startup", "small", "medium", "large", "government"]
+
+# Free-form requirement tags seen in real postings, to exercise substring matching
+EXTRA_REQUIREMENTS = ["basic computer", "ms excel", "english communication",
+                      "graphic design", "tally accounting", "data entry", "field work"]
+CITIES = ["Mumbai", "Delhi", "Bangalore", "Chennai", "Kolkata", "Pune", "Hyderabad",
+          "Remote", "Jaipur", "Lucknow", "Patna", "Bhopal", "Guwahati", "Ranchi",
+          "New Delhi", "Navi Mumbai"]
+BENEFITS = ["Certificate", "Mentorship", "Project Experience", "Flexible Hours",
+            "Travel Allowance", "Letter of Recommendation"]
+SKILLS_OFFERED = ["Excel", "Customer Service", "Social Media", "Python", "Bookkeeping",
+                  "Lesson Planning", "Patient Care", "Crop Management", "Canva"]
+
+
+def generate_internship(rng: random.Random, position: int) -> Dict[str, Any]:
+    """Generate one internship record that validates against internship_schema.json"""
+    sector = rng.choice(SECTORS)
+    location = rng.choice(CITIES)
+    requirements = rng.sample(CANDIDATE_SKILLS + EXTRA_REQUIREMENTS, rng.randint(1, 3))
+    first_level = rng.randrange(len(EDUCATION_LEVELS))
+    preferred_education = EDUCATION_LEVELS[first_level:first_level + rng.randint(0, 3)]
+
+    return {
+        "id": f"SYN{position:07d}",
+        "title": f"{sector.title()} Intern {position}",
+        "company": f"Company {rng.randint(1, 5000)}",
+        "sector": sector,
+        "location": location,
+        "is_remote": location == "Remote" or rng.random() < 0.25,
+        "duration": f"{rng.choice([2, 3, 4, 6])} months",
+        "stipend": f"₹{rng.randrange(5000, 25001, 1000):,}/month",
+        "description": " ".join(rng.choice(SKILLS_OFFERED) for _ in range(30)),
+        "requirements": requirements,
+        "preferred_education": preferred_education,
+        "application_deadline": "2025-12-31",
+        "start_date": "2026-01-15",
+        "contact_email": f"careers{position}@example.in",
+        "company_size": rng.choice(COMPANY_SIZES),
+        "benefits": rng.sample(BENEFITS, rng.randint(1, 3)),
+        "skills_offered": rng.sample(SKILLS_OFFERED, rng.randint(2, 4)),
+        "certification": rng.random() < 0.8,
+        "full_time_potential": rng.random() < 0.4,
+        "language_requirements": ["English"] if rng.random() < 0.5 else ["Hindi", "English"],
+        "accessibility": {
+            "rural_friendly": rng.random() < 0.5,
+            "low_bandwidth_work": rng.random() < 0.5,
+            "flexible_hours": rng.random() < 0.5
+        }
+    }
+
+
+def generate_catalogue(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate a deterministic synthetic catalogue of `size` internships"""
+    rng = random.Random(seed)
+    return [generate_internship(rng, position) for position in range(size)]
+
+
+def write_catalogue(path: str, size: int, seed: int = 0):
+    """
+    Write a synthetic catalogue of `size` internships, one posting at a time:
+    NDJSON, or a JSON array if the path does not end in .ndjson / .jsonl
+    """
+    rng = random.Random(seed)
+    ndjson = is_ndjson_path(path)
+    with open(path, 'w', encoding='utf-8') as file:
+        if not ndjson:
+            file.write('[')
+        for position in range(size):
+            if not ndjson and position:
+                file.write(',\n')
+            file.write(json.dumps(generate_internship(rng, position), ensure_ascii=False))
+            if ndjson:
+                file.write('\n')
+        if not ndjson:
+            file.write(']\n')
+
+
+def generate_profile(rng: random.Random, position: int, edge_cases: bool = False) -> Dict[str, Any]:
+    """
+    Generate one candidate profile that validates against candidate_schema.json.
+
+    With edge_cases=True, fields are occasionally empty or unusually cased so
+    that parity checks also cover the neutral-score branches of the engine.
+    """
+    profile = {
+        "id": f"CAND{position:07d}",
+        "education": rng.choice(EDUCATION_LEVELS),
+        "skills": rng.sample(CANDIDATE_SKILLS, rng.randint(1, 4)),
+        "interests": rng.sample(SECTORS, rng.randint(1, 3)),
+        "location": rng.choice(CANDIDATE_LOCATIONS)
+    }
+    if edge_cases:
+        roll = rng.random()
+        if roll < 0.05:
+            profile["skills"] = []
+        elif roll < 0.10:
+            profile["interests"] = []
+        elif roll < 0.15:
+            profile["location"] = ""
+        elif roll < 0.20:
+            profile["education"] = ""
+        elif roll < 0.25:
+            profile["location"] = profile["location"].upper()
+            profile["skills"] = [skill.title() for skill in profile["skills"]]
+    return profile
+
+
+def generate_profiles(count: int, seed: int = 1, edge_cases: bool = False) -> List[Dict[str, Any]]:
+    """Generate a deterministic list of candidate profiles"""
+    rng = random.Random(seed)
+    return [generate_profile(rng, position, edge_cases) for position in range(count)]
+
+
+# Catalogue sizes selectable with --scale
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+CANDIDATE_SCHEMA_PATH = os.path.join(PROJECT_ROOT, 'data', 'candidate_schema.json')
+
+_candidate_schema = None
+
+
+def validate_profile(profile: Dict[str, Any]) -> List[str]:
+    """Problems of a candidate profile against candidate_schema.json (empty if valid)"""
+    global _candidate_schema
+    if _candidate_schema is None:
+        with open(CANDIDATE_SCHEMA_PATH, 'r', encoding='utf-8') as file:
+            _candidate_schema = json.load(file)
+    return validate_object(profile, _candidate_schema)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument('--scale', choices=SCALES, help='catalogue size: 1k, 100k or 1m postings')
+    size.add_argument('--size', type=int, help='catalogue size in postings')
+    parser.add_argument('--output', required=True, help='catalogue file (.ndjson/.jsonl, or a JSON array)')
+    parser.add_argument('--profiles', type=int, default=0, help='candidate profiles to generate')
+    parser.add_argument('--profiles-output', help='JSON file for the candidate profiles')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--validate', action='store_true', help='check every record against the schemas')
+    args = parser.parse_args(argv)
+
+    size = SCALES[args.scale] if args.scale else args.size
+    write_catalogue(args.output, size, seed=args.seed)
+    problems = 0
+    if args.validate:
+        rng = random.Random(args.seed)
+        for position in range(size):
+            for problem in validate_internship(generate_internship(rng, position)):
+                print(f'internship {position}: {problem}', file=sys.stderr)
+                problems += 1
+
+    if args.profiles:
+        profiles = generate_profiles(args.profiles, seed=args.seed + 1)
+        if args.validate:
+            for position, profile in enumerate(profiles):
+                for problem in validate_profile(profile):
+                    print(f'profile {position}: {problem}', file=sys.stderr)
+                    problems += 1
+        if args.profiles_output:
+            with open(args.profiles_output, 'w', encoding='utf-8') as file:
+                json.dump(profiles, file, ensure_ascii=False)
+
+    print(json.dumps({'internships': size, 'profiles': args.profiles, 'problems': problems}))
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
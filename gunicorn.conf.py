@@ -0,0 +1,84 @@
+"""
+Gunicorn configuration for the PM Internship Recommender.
+
+    gunicorn --config gunicorn.conf.py
+
+The app (and with it the internship catalogue) is loaded once in the master
+process and shared copy-on-write with the forked workers. Set PRELOAD_APP=false
+to load a separate copy in every worker instead.
+
+With ASGI=true the workers serve backend/asgi_app.py on an event loop (uvicorn
+worker): keep-alive connections and slow clients do not hold a thread, views
+run on a thread pool, and each worker accepts at most WORKER_CONNECTIONS
+concurrent connections (503 beyond that).
+
+Admin deltas and reloads reach every worker through a catalogue log file
+(backend/catalogue_log.py), created empty for each run of the server unless
+CATALOGUE_LOG_PATH names one. Profiler sessions are shared by the workers the
+same way, through a directory (PROFILER_DIR) created for each run of the server.
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+asgi = os.environ.get('ASGI', 'false').lower() == 'true'
+
+wsgi_app = 'asgi_app:app' if asgi else 'app:app'
+if asgi:
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+keepalive = int(os.environ.get('KEEP_ALIVE', 5))
+chdir = os.path.join(PROJECT_ROOT, 'backend')
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() == 'true'
+
+# Set before the app is loaded, and kept when the configuration is read again
+# on a HUP: the workers then restarted replay the log from its start
+if not os.environ.get('CATALOGUE_LOG_PATH'):
+    descriptor, catalogue_log_path = tempfile.mkstemp(prefix='catalogue-log-', suffix='.ndjson')
+    os.close(descriptor)
+    os.environ['CATALOGUE_LOG_PATH'] = catalogue_log_path
+    os.environ['CATALOGUE_LOG_TEMPORARY'] = 'true'
+if not os.environ.get('PROFILER_DIR'):
+    os.environ['PROFILER_DIR'] = tempfile.mkdtemp(prefix='profiler-')
+    os.environ['PROFILER_DIR_TEMPORARY'] = 'true'
+
+
+def when_ready(server):
+    """Prepare the loaded catalogue for sharing before the first worker is forked"""
+    if preload_app:
+        # Move every object created so far into the permanent generation, so the
+        # workers' garbage collector never writes to (and copies) their pages
+        gc.collect()
+        gc.freeze()
+        server.log.info("Froze %d preloaded objects for copy-on-write sharing", gc.get_freeze_count())
+
+
+def post_worker_init(worker):
+    """
+    Fork the worker's scoring pool (SCORING_WORKERS) before it starts any threads,
+    then catch up with the catalogue log before the worker serves a request
+    """
+    from app import catalogue_reloader, start_scoring_workers
+    start_scoring_workers()
+    catalogue_reloader.start()
+    catalogue_reloader.wait_for_log()
+
+
+def worker_exit(server, worker):
+    """Stop the worker's scoring pool"""
+    from app import stop_scoring_workers
+    stop_scoring_workers()
+
+
+def on_exit(server):
+    """Remove the catalogue log and profiler directory created for this run of the server"""
+    if os.environ.get('CATALOGUE_LOG_TEMPORARY') == 'true':
+        from catalogue_log import CatalogueLog
+        CatalogueLog(os.environ['CATALOGUE_LOG_PATH']).remove()
+    if os.environ.get('PROFILER_DIR_TEMPORARY') == 'true':
+        shutil.rmtree(os.environ['PROFILER_DIR'], ignore_errors=True)
@@ -5,10 +5,11 @@ import sys
 # Add backend directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-# Import and run the Flask app
-from app import app
+# Import and run the Flask app (development server; deployments run gunicorn.conf.py)
+from app import app, start_scoring_workers
 
 if __name__ == '__main__':
+    start_scoring_workers()
     port = int(os.environ.get('PORT', 5000))
     print(f"Starting Flask app on port {port}")
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,10 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The backend modules import each other as top-level modules, and the
+# synthetic data generators live in the benchmarks package
+for path in (os.path.join(PROJECT_ROOT, 'backend'), PROJECT_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
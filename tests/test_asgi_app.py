@@ -0,0 +1,131 @@
+"""
+The ASGI adapter serves the Flask app's responses from an event loop.
+"""
+import asyncio
+import threading
+import time
+
+from asgi_app import AsgiApp
+
+
+def http_scope(method='POST', path='/'):
+    return {'type': 'http', 'method': method, 'path': path, 'root_path': '', 'query_string': b'',
+            'http_version': '1.1', 'scheme': 'http', 'headers': [(b'content-type', b'application/json')]}
+
+
+def serve(app, scope, messages):
+    """The messages the app sends for a request whose receive() yields `messages`"""
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def echo(environ, start_response):
+    body = environ['wsgi.input'].read()
+    start_response('200 OK', [('Content-Type', 'application/octet-stream')])
+    return [body]
+
+
+def test_oversized_body_is_rejected_with_413():
+    app = AsgiApp(echo, threads=1, max_request_bytes=8)
+    sent = serve(app, http_scope(), [{'type': 'http.request', 'body': b'12345', 'more_body': True},
+                                     {'type': 'http.request', 'body': b'67890'}])
+    assert sent[0]['status'] == 413
+    assert sent[1]['body'] == b'{"error":"Request body too large"}\n'
+
+
+def test_client_that_disconnects_gets_no_response():
+    app = AsgiApp(echo, threads=1)
+    sent = serve(app, http_scope(), [{'type': 'http.request', 'body': b'123', 'more_body': True},
+                                     {'type': 'http.disconnect'}])
+    assert sent == []
+
+
+def test_body_in_several_messages_reaches_the_view_whole():
+    app = AsgiApp(echo, threads=1)
+    sent = serve(app, http_scope(), [{'type': 'http.request', 'body': b'123', 'more_body': True},
+                                     {'type': 'http.request', 'body': b'456'}])
+    assert sent[0]['status'] == 200
+    assert b''.join(message.get('body', b'') for message in sent[1:]) == b'123456'
+    assert not sent[-1].get('more_body', False)
+
+
+def test_streamed_response_is_sent_chunk_by_chunk_and_closed():
+    closed = []
+
+    def stream(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/x-ndjson')])
+
+        def chunks():
+            try:
+                for number in range(3):
+                    yield f'{number}\n'.encode()
+            finally:
+                closed.append(True)
+        return chunks()
+
+    sent = serve(AsgiApp(stream, threads=2), http_scope('GET'), [{'type': 'http.request', 'body': b''}])
+    assert sent[0]['status'] == 200
+    assert (b'content-type', b'application/x-ndjson') in sent[0]['headers']
+    assert [message['body'] for message in sent[1:]] == [b'0\n', b'1\n', b'2\n', b'']
+    assert [message.get('more_body', False) for message in sent[1:]] == [True, True, True, False]
+    assert closed == [True]
+
+
+def test_requests_past_max_pending_wait_on_the_event_loop():
+    running, most = [0], [0]
+    lock = threading.Lock()
+
+    def slow(environ, start_response):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    app = AsgiApp(slow, threads=4, max_pending=2)
+
+    async def one():
+        sent = []
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await app(http_scope('GET'), receive, send)
+        return sent
+
+    async def many():
+        return await asyncio.gather(*(one() for _ in range(8)))
+
+    for sent in asyncio.run(many()):
+        assert sent[0]['status'] == 200 and sent[1]['body'] == b'ok'
+    assert most[0] == 2
+
+
+def test_flask_batch_stream_matches_the_wsgi_response():
+    from app import app as flask_app
+
+    body = b'[{"id": "a", "education": "12th", "skills": ["computer"], "interests": ["technology"],' \
+           b' "location": "Delhi"}, 7]'
+    scope = dict(http_scope('POST', '/api/recommend/batch'), query_string=b'k=3')
+    sent = serve(AsgiApp(flask_app, threads=2), scope, [{'type': 'http.request', 'body': body}])
+    expected = flask_app.test_client().post('/api/recommend/batch?k=3', data=body,
+                                            content_type='application/json')
+    assert sent[0]['status'] == 200
+    assert b''.join(message.get('body', b'') for message in sent[1:]) == expected.get_data()
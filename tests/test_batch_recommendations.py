@@ -0,0 +1,53 @@
+"""
+/api/recommend/batch streams one NDJSON line per profile, in input order.
+"""
+import json
+
+from app import app
+
+PROFILES = [
+    {'id': 'CAND001', 'education': '12th', 'skills': ['computer', 'communication'], 'interests': ['technology'],
+     'location': 'Delhi'},
+    {'id': 'CAND002', 'education': 'undergraduate', 'interests': ['healthcare'], 'location': 'Mumbai'},
+    'not a profile',
+    {'id': 'CAND004', 'education': 'diploma', 'skills': ['tally'], 'interests': ['finance'], 'location': 'remote'},
+    {'id': 'CAND005', 'education': '12th', 'skills': ['computer', 'communication'], 'interests': ['technology'],
+     'location': 'Delhi'}
+]
+
+
+def lines_of(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def single_recommendations(client, profile, k):
+    response = client.post('/api/recommend', json=dict(profile, k=k))
+    assert response.status_code == 200
+    return response.get_json()['recommendations']
+
+
+def test_invalid_profiles_get_an_error_line_and_do_not_fail_the_batch():
+    client = app.test_client()
+    lines = lines_of(client.post('/api/recommend/batch?k=3', json=PROFILES))
+    assert [line['index'] for line in lines] == [0, 1, 2, 3, 4]
+    assert lines[1] == {'index': 1, 'error': 'Missing required field: skills'}
+    assert lines[2] == {'index': 2, 'error': 'Profile must be an object'}
+    for position in (0, 3, 4):
+        assert lines[position]['id'] == PROFILES[position]['id']
+        assert lines[position]['recommendations'] == single_recommendations(client, PROFILES[position], 3)
+        assert lines[position]['total'] == len(lines[position]['recommendations'])
+
+
+def test_ndjson_bodies_are_accepted_and_malformed_lines_rejected():
+    client = app.test_client()
+    body = '\n'.join(json.dumps(profile) for profile in PROFILES) + '\n\n'
+    assert lines_of(client.post('/api/recommend/batch', data=body)) == \
+        lines_of(client.post('/api/recommend/batch', json=PROFILES))
+
+    response = client.post('/api/recommend/batch', data=json.dumps(PROFILES[0]) + '\n{"skills": [\n')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid JSON on line 2')
+    assert client.post('/api/recommend/batch', data='').status_code == 400
+    assert client.post('/api/recommend/batch?k=0', json=PROFILES).status_code == 400
@@ -0,0 +1,134 @@
+"""
+Admin deltas and reloads reach every process sharing a catalogue log.
+
+Each reloader below stands for one gunicorn worker: its own engine loaded
+from the same data file, and the same log file.
+"""
+import json
+import os
+import random
+import threading
+
+import pytest
+
+from benchmarks.synthetic import generate_catalogue, generate_internship, generate_profiles
+from catalogue_log import CatalogueLog
+from catalogue_reloader import CatalogueReloader
+from recommendation_engine import RecommendationEngine
+
+PROFILES = generate_profiles(10, seed=5)
+
+
+@pytest.fixture
+def make_worker():
+    workers = []
+
+    def make(data_path, log_path, **options):
+        reloader = CatalogueReloader(RecommendationEngine(scoring_mode='vectorized', data_path=data_path),
+                                     log=CatalogueLog(log_path), log_interval=0.05, **options)
+        reloader.start()
+        workers.append(reloader)
+        return reloader
+
+    yield make
+    for reloader in workers:
+        reloader.close()
+
+
+def catalogue_of(reloader):
+    records = reloader.engine.state.index.search()
+    return [record.id for record in records], [
+        [(item['id'], item['match_score'])
+         for item in reloader.engine.recommend_internships(profile, 10)]
+        for profile in PROFILES]
+
+
+def test_deltas_and_reloads_reach_every_process(tmp_path, make_worker):
+    data_path = tmp_path / 'internships.json'
+    catalogue = generate_catalogue(200, seed=3)
+    data_path.write_text(json.dumps(catalogue), encoding='utf-8')
+    log_path = str(tmp_path / 'catalogue-log.ndjson')
+
+    first = make_worker(str(data_path), log_path)
+    second = make_worker(str(data_path), log_path)
+    rng = random.Random(8)
+    added = [generate_internship(rng, 1000 + position) for position in range(5)]
+    result = first.apply_delta([{'op': 'add', 'internship': internship} for internship in added] +
+                               [{'op': 'delete', 'id': catalogue[0]['id']}, {'op': 'delete', 'id': 'missing'}])
+    assert result['added'] == 5 and result['deleted'] == 1 and len(result['errors']) == 1
+    second.apply_delta([{'op': 'delete', 'id': catalogue[1]['id']}])
+
+    # The second worker applied the first's delta before its own; the first catches up on its next poll
+    first.wait_for_log()
+    assert catalogue_of(first) == catalogue_of(second)
+    assert len(first.engine.index.search()) == len(second.engine.index.search()) == 203
+
+    # A worker started now replays the log after loading the data file
+    third = make_worker(str(data_path), log_path)
+    third.wait_for_log()
+    assert catalogue_of(third) == catalogue_of(first)
+
+    data_path.write_text(json.dumps(catalogue[:50]), encoding='utf-8')
+    second.log_interval = 3600
+    second.wait_for_log()
+    assert first.request_reload()
+    first.wait()
+    # Every worker loads the copy the reload took, whatever the data file holds by then
+    data_path.write_text(json.dumps(catalogue[:10]), encoding='utf-8')
+    second.wait_for_log()
+    for reloader in (first, second):
+        assert len(reloader.engine.index.search()) == 50
+        assert reloader.last_error is None
+
+    # The reload replaced the log
+    with open(log_path, 'rb') as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 1 and CatalogueLog(log_path).catalogue_paths() == [json.loads(lines[0])['reload']]
+    third.wait_for_log()
+    fourth = make_worker(str(data_path), log_path)
+    fourth.wait_for_log()
+    assert catalogue_of(fourth) == catalogue_of(third) == catalogue_of(first)
+
+
+def test_changes_are_applied_on_the_follower_thread_only(tmp_path, make_worker, monkeypatch):
+    data_path = tmp_path / 'internships.json'
+    catalogue = generate_catalogue(100, seed=4)
+    data_path.write_text(json.dumps(catalogue), encoding='utf-8')
+    log_path = str(tmp_path / 'catalogue-log.ndjson')
+    worker = make_worker(str(data_path), log_path)
+    threads = []
+    for name in ('apply_delta', 'reload'):
+        method = getattr(worker.engine, name)
+        monkeypatch.setattr(worker.engine, name, lambda *args, method=method, **kwargs:
+                            threads.append(threading.current_thread().name) or method(*args, **kwargs))
+
+    worker.apply_delta([{'op': 'delete', 'id': catalogue[0]['id']}])
+    worker.request_reload()
+    worker.wait()
+    assert threads == ['catalogue-log', 'catalogue-log']
+    assert len(worker.engine.index.search()) == 100
+
+
+def test_an_oversized_log_is_compacted(tmp_path, make_worker):
+    data_path = tmp_path / 'internships.json'
+    catalogue = generate_catalogue(100, seed=6)
+    data_path.write_text(json.dumps(catalogue), encoding='utf-8')
+    log_path = str(tmp_path / 'catalogue-log.ndjson')
+    first = make_worker(str(data_path), log_path, log_max_bytes=20000)
+    second = make_worker(str(data_path), log_path)
+
+    rng = random.Random(9)
+    for position in range(20):
+        first.apply_delta([{'op': 'add', 'internship': generate_internship(rng, 2000 + position)},
+                           {'op': 'delete', 'id': catalogue[position]['id']}])
+    first.wait_for_log()
+    second.wait_for_log()
+    assert os.path.getsize(log_path) < 20000
+    with open(log_path, 'rb') as file:
+        assert 'reload' in json.loads(file.readline())
+    assert catalogue_of(first) == catalogue_of(second)
+    assert len(first.engine.index.search()) == 100
+
+    later = make_worker(str(data_path), log_path)
+    later.wait_for_log()
+    assert catalogue_of(later) == catalogue_of(first)
@@ -0,0 +1,101 @@
+"""
+Catalogue snapshots restore the same catalogue, and refuse foreign pickles.
+"""
+import json
+import pickle
+import struct
+
+import pytest
+
+import catalogue_snapshot
+from benchmarks.synthetic import generate_catalogue, generate_profiles
+from catalogue_snapshot import file_hash, read_snapshot
+from recommendation_engine import RecommendationEngine
+
+PROFILES = generate_profiles(10, seed=7)
+
+
+def recommendations(engine):
+    return [[(item['id'], item['match_score']) for item in engine.recommend_internships(profile, 10)]
+            for profile in PROFILES]
+
+
+@pytest.fixture
+def catalogue_path(tmp_path):
+    path = tmp_path / 'internships.json'
+    path.write_text(json.dumps(generate_catalogue(300, seed=9)), encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('scoring_mode', ['scalar', 'vectorized'])
+def test_snapshot_restores_the_catalogue(catalogue_path, tmp_path, scoring_mode):
+    snapshot_path = str(tmp_path / 'catalogue.snapshot')
+    built = RecommendationEngine(scoring_mode=scoring_mode, data_path=catalogue_path,
+                                 snapshot_path=snapshot_path)
+    assert read_snapshot(snapshot_path, built, file_hash(catalogue_path)) is not None
+
+    restored = RecommendationEngine(scoring_mode=scoring_mode, data_path=catalogue_path,
+                                    snapshot_path=snapshot_path)
+    assert recommendations(restored) == recommendations(built)
+    assert restored.get_all_internships() == built.get_all_internships()
+
+
+def test_snapshot_header_names_the_code_and_skill_aliases(catalogue_path, tmp_path, monkeypatch):
+    snapshot_path = str(tmp_path / 'catalogue.snapshot')
+    engine = RecommendationEngine(data_path=catalogue_path, snapshot_path=snapshot_path)
+    with open(snapshot_path, 'rb') as file:
+        file.readline()
+        header = json.loads(file.readline())
+    assert header['code'] == catalogue_snapshot.SNAPSHOT_CODE
+    assert header['skills'] == catalogue_snapshot.SKILLS.digest
+
+    monkeypatch.setattr(catalogue_snapshot, 'SNAPSHOT_CODE', 'other-code')
+    assert read_snapshot(snapshot_path, engine, file_hash(catalogue_path)) is None
+
+
+def test_rejected_snapshot_is_unmapped(catalogue_path, tmp_path, monkeypatch):
+    snapshot_path = str(tmp_path / 'catalogue.snapshot')
+    engine = RecommendationEngine(data_path=catalogue_path, snapshot_path=snapshot_path)
+    opened = []
+
+    class TrackedCatalogue(catalogue_snapshot.NdjsonCatalogue):
+        def __init__(self, path):
+            super().__init__(path)
+            opened.append(self)
+
+    monkeypatch.setattr(catalogue_snapshot, 'NdjsonCatalogue', TrackedCatalogue)
+    assert read_snapshot(snapshot_path, engine, file_hash(catalogue_path)) is not None
+    assert not opened[0].data.closed
+
+    assert read_snapshot(snapshot_path, engine, 'other-source') is None
+    assert opened[1].data == b''
+
+
+class RunString:
+    def __init__(self, code):
+        self.code = code
+
+    def __reduce__(self):
+        from numpy.testing._private.utils import runstring
+        return runstring, (self.code, {})
+
+
+def test_snapshot_with_foreign_globals_is_not_loaded(catalogue_path, tmp_path):
+    pytest.importorskip('numpy.testing._private.utils')
+    snapshot_path = str(tmp_path / 'catalogue.snapshot')
+    marker = tmp_path / 'executed'
+    engine = RecommendationEngine(scoring_mode='vectorized', data_path=catalogue_path, snapshot_path=snapshot_path)
+
+    # A valid header and postings, with a pickle that runs code when loaded
+    with open(snapshot_path, 'rb') as file:
+        data = file.read()
+    state_offset, _ = struct.unpack('<QQ', data[-16:])
+    payload = pickle.dumps(RunString(f'open({str(marker)!r}, "w").close()'), protocol=pickle.HIGHEST_PROTOCOL)
+    with open(snapshot_path, 'wb') as file:
+        file.write(data[:state_offset] + payload)
+        file.write(struct.pack('<QQ', state_offset, state_offset + len(payload)))
+
+    assert read_snapshot(snapshot_path, engine, file_hash(catalogue_path)) is None
+    rebuilt = RecommendationEngine(scoring_mode='vectorized', data_path=catalogue_path, snapshot_path=snapshot_path)
+    assert not marker.exists()
+    assert recommendations(rebuilt) == recommendations(engine)
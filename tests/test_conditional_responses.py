@@ -0,0 +1,83 @@
+"""
+Catalogue responses carry the catalogue tag as their ETag, answer 304 to
+clients holding it, and are served compressed from the response cache.
+"""
+import gzip
+import random
+
+import pytest
+
+import app as app_module
+from benchmarks.synthetic import generate_catalogue, generate_internship
+from recommendation_engine import RecommendationEngine
+from response_cache import ResponseCache, brotli
+
+CATALOGUE = generate_catalogue(60, seed=11)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'rec_engine', RecommendationEngine(internships=CATALOGUE))
+    monkeypatch.setattr(app_module, 'response_cache', ResponseCache())
+    return app_module.app.test_client()
+
+
+def test_clients_holding_the_current_catalogue_get_304(client):
+    response = client.get('/api/internships')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag == f'W/"{app_module.rec_engine.catalogue_tag}"'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    revalidated = client.get('/api/internships', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b'' and revalidated.headers['ETag'] == etag
+    # The tag covers every catalogue response
+    assert client.get('/api/sectors', headers={'If-None-Match': etag}).status_code == 304
+
+    # A delta changes the tag, so the next revalidation gets the new catalogue
+    app_module.rec_engine.apply_delta([{'op': 'add', 'internship': generate_internship(random.Random(1), 900)}])
+    changed = client.get('/api/internships', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert changed.get_json()['total'] == len(CATALOGUE) + 1
+
+
+@pytest.mark.parametrize('accept, encoding, decode', [
+    pytest.param('br, gzip', 'br', brotli and brotli.decompress,
+                 marks=pytest.mark.skipif(brotli is None, reason='brotli is not installed')),
+    ('gzip', 'gzip', gzip.decompress),
+    ('identity', None, bytes)
+])
+def test_cached_bodies_are_compressed_for_clients_that_accept_it(client, accept, encoding, decode):
+    plain = client.get('/api/internships', headers={'Accept-Encoding': 'identity'}).get_data()
+    assert len(plain) > 1024
+    response = client.get('/api/internships', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == encoding
+    assert decode(response.get_data()) == plain
+    assert app_module.response_cache.stats()['hits'] >= 1
+
+    # Small bodies are sent as they are
+    assert 'Content-Encoding' not in client.get('/api/internships?limit=1&fields=id',
+                                                headers={'Accept-Encoding': accept}).headers
+
+
+def test_bodies_too_large_to_cache_are_streamed_uncompressed(client, monkeypatch):
+    cached = client.get('/api/internships').get_data()
+    monkeypatch.setattr(app_module, 'response_cache', ResponseCache(max_body_bytes=2048))
+    for _ in range(2):
+        response = client.get('/api/internships', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200 and response.is_streamed
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data() == cached
+        assert response.headers['ETag'] == f'W/"{app_module.rec_engine.catalogue_tag}"'
+    assert app_module.response_cache.stats()['size'] == 1  # Remembered as too large
+
+
+def test_static_assets_are_revalidated_by_content_hash(client):
+    response = client.get('/styles.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == f'public, max-age={app_module.STATIC_MAX_AGE}'
+    assert gzip.decompress(response.get_data()) == app_module.STATIC_ASSETS['styles.css'].content.body
+    revalidated = client.get('/styles.css', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.get_data() == b''
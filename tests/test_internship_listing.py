@@ -0,0 +1,91 @@
+"""
+Internship listings page through the catalogue with cursors and project the
+fields a client asks for.
+"""
+import random
+
+import pytest
+
+import app as app_module
+from benchmarks.synthetic import generate_catalogue, generate_internship
+from recommendation_engine import RecommendationEngine
+
+CATALOGUE = generate_catalogue(120, seed=7)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'rec_engine', RecommendationEngine(internships=CATALOGUE))
+    return app_module.app.test_client()
+
+
+def all_pages(client, url, cursor=None):
+    """The ids of every page of a listing from `cursor` on, and the pages"""
+    ids, pages = [], []
+    for _ in range(len(CATALOGUE) + 1):
+        response = client.get(f'{url}&cursor={cursor}' if cursor else url)
+        assert response.status_code == 200
+        page = response.get_json()
+        pages.append(page)
+        ids.extend(internship['id'] for internship in page['internships'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+    raise AssertionError('The cursors do not reach the last page')
+
+
+def test_cursors_visit_every_internship_once_in_catalogue_order(client):
+    ids, pages = all_pages(client, '/api/internships?limit=25')
+    assert ids == [internship['id'] for internship in CATALOGUE]
+    assert [page['total'] for page in pages] == [25, 25, 25, 25, 20]
+    assert all(page['matches'] == len(CATALOGUE) for page in pages)
+
+    sector = CATALOGUE[0]['sector']
+    ids, _ = all_pages(client, f'/api/internships/search?sector={sector}&limit=7')
+    # The search route filters on remote=false unless remote=true is given
+    assert ids == [internship['id'] for internship in CATALOGUE
+                   if internship['sector'] == sector and not internship['is_remote']]
+
+    # Without a limit the listing is unpaged, and a cursor alone pages by the default size
+    whole = client.get('/api/internships').get_json()
+    assert whole['total'] == len(CATALOGUE) and 'next_cursor' not in whole
+    cursor = client.get('/api/internships?limit=1').get_json()['next_cursor']
+    assert client.get(f'/api/internships?cursor={cursor}').get_json()['total'] == app_module.DEFAULT_PAGE_SIZE
+
+
+def test_fields_are_projected_and_always_include_the_id(client):
+    page = client.get('/api/internships?fields=title,%20sector&limit=3').get_json()
+    assert page['internships'] == [{'id': internship['id'], 'title': internship['title'],
+                                    'sector': internship['sector']} for internship in CATALOGUE[:3]]
+
+
+@pytest.mark.parametrize('query', ['fields=title,salary', 'limit=0', 'limit=501', 'limit=ten', 'cursor=garbage'])
+def test_invalid_listing_arguments_are_rejected(client, query):
+    response = client.get(f'/api/internships?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_a_cursor_survives_catalogue_deltas(client):
+    page = client.get('/api/internships?limit=10').get_json()
+    added = generate_internship(random.Random(3), 500)
+    app_module.rec_engine.apply_delta([{'op': 'delete', 'id': CATALOGUE[5]['id']},
+                                       {'op': 'delete', 'id': CATALOGUE[12]['id']},
+                                       {'op': 'add', 'internship': added}])
+
+    ids, _ = all_pages(client, '/api/internships?limit=10', page['next_cursor'])
+    expected = [internship['id'] for internship in CATALOGUE[10:] if internship['id'] != CATALOGUE[12]['id']]
+    assert ids == expected + [added['id']]
+
+    # Deleted postings keep their place, so a cursor after one still continues
+    app_module.rec_engine.apply_delta([{'op': 'delete', 'id': CATALOGUE[9]['id']}])
+    ids, _ = all_pages(client, '/api/internships?limit=10', page['next_cursor'])
+    assert ids == expected + [added['id']]
+
+    # A rebuilt catalogue continues after the same posting, if it still has it
+    app_module.rec_engine.load_catalogue(CATALOGUE[:3] + CATALOGUE[9:])
+    ids, _ = all_pages(client, '/api/internships?limit=10', page['next_cursor'])
+    assert ids == [internship['id'] for internship in CATALOGUE[10:]]
+    app_module.rec_engine.load_catalogue(CATALOGUE[10:])
+    response = client.get(f"/api/internships?limit=10&cursor={page['next_cursor']}")
+    assert response.status_code == 400
@@ -0,0 +1,34 @@
+"""
+Both JSON backends write the bytes jsonify wrote: compact, sorted and ASCII only.
+"""
+import json
+
+import pytest
+
+from app import app, rec_engine
+from internship_record import InternshipRecord
+from json_serializer import JsonSerializer, orjson
+
+BACKENDS = ['stdlib'] + (['orjson'] if orjson is not None else [])
+
+VALUE = {'stipend': '₹15,000/month', 'title': 'Café – Pune 😀', 'zeta': [1, 2.5, None, True], 'alpha': {'b': 1, 'a': ''}}
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_non_ascii_characters_are_escaped(name):
+    serializer = JsonSerializer(name)
+    encoded = serializer.dumps(VALUE)
+    assert encoded == json.dumps(VALUE, sort_keys=True, separators=(',', ':')).encode('ascii')
+    assert b'"stipend":"\\u20b915,000/month"' in encoded
+    assert b'\\ud83d\\ude00' in encoded
+    assert serializer.internship(InternshipRecord(0, dict(VALUE, id='X1'))) == \
+        json.dumps(dict(VALUE, id='X1'), sort_keys=True, separators=(',', ':')).encode('ascii')
+
+
+def test_internship_response_bytes_are_those_of_jsonify():
+    internship = rec_engine.get_internship_by_id('INT001')
+    assert '₹' in internship['stipend']
+    response = app.test_client().get('/api/internships/INT001')
+    assert response.status_code == 200
+    assert response.data == json.dumps({'success': True, 'internship': internship}, sort_keys=True,
+                                       separators=(',', ':')).encode('ascii') + b'\n'
@@ -0,0 +1,74 @@
+"""
+/metrics exports request, scoring and cache figures when METRICS_ENABLED is set.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as app_module
+from metrics import CONTENT_TYPE
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metrics are installed when app.py is imported, so the enabled server runs in
+# its own interpreter; it prints the /metrics response after a few requests
+SCRAPE = """
+import sys
+sys.path.insert(0, 'backend')
+from app import app
+
+client = app.test_client()
+client.get('/api/internships')
+client.get('/api/internships')
+client.post('/api/recommend', json={'education': '12th', 'skills': ['computer'], 'interests': ['technology'],
+                                    'location': 'Delhi'})
+client.post('/api/recommend', json={'skills': []})
+client.get('/api/internships/missing')
+response = client.get('/metrics')
+print(response.status_code, response.content_type)
+print(response.get_data(as_text=True))
+"""
+
+
+@pytest.fixture(scope='module')
+def scrape():
+    environment = dict(os.environ, METRICS_ENABLED='true', METRICS_PHASE_SAMPLE_RATE='1')
+    result = subprocess.run([sys.executable, '-c', SCRAPE], cwd=PROJECT_ROOT, env=environment,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    status, text = result.stdout.split('\n', 1)
+    return status, {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+                    for line in text.splitlines() if line and not line.startswith('#')}, text
+
+
+def test_metrics_are_disabled_by_default():
+    if app_module.metrics_registry is not None:
+        pytest.skip('METRICS_ENABLED is set for this test run')
+    response = app_module.app.test_client().get('/metrics')
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Metrics are disabled'}
+
+
+def test_requests_are_counted_by_route_and_status(scrape):
+    status, samples, _ = scrape
+    assert status == f'200 {CONTENT_TYPE}'
+    assert samples['http_requests_total{method="GET",route="/api/internships",status="200"}'] == 2
+    assert samples['http_requests_total{method="POST",route="/api/recommend",status="200"}'] == 1
+    assert samples['http_requests_total{method="POST",route="/api/recommend",status="400"}'] == 1
+    assert samples['http_requests_total{method="GET",route="/api/internships/<internship_id>",status="404"}'] == 1
+    assert samples['http_request_duration_seconds_count{method="GET",route="/api/internships"}'] == 2
+    # The scrape itself is still being served
+    assert samples['http_requests_in_flight'] == 1
+
+
+def test_scoring_and_cache_figures_are_exported(scrape):
+    _, samples, text = scrape
+    scoring = [value for name, value in samples.items() if name.startswith('recommendation_scoring_seconds_count')]
+    assert sum(scoring) == 1
+    assert any(name.startswith('recommendation_scoring_phase_seconds_count') for name in samples)
+    assert samples['cache_lookups_total{cache="responses",result="hit"}'] == 1
+    assert samples['cache_lookups_total{cache="responses",result="miss"}'] == 1
+    assert samples['catalogue_postings'] == len(app_module.rec_engine.state.index.search())
+    assert '# TYPE http_requests_total counter' in text
@@ -0,0 +1,74 @@
+"""
+The parallel scoring pool is forked once and follows catalogue changes.
+"""
+import random
+import time
+
+import pytest
+
+import parallel_scoring
+from benchmarks.synthetic import generate_catalogue, generate_internship, generate_profiles
+from recommendation_engine import RecommendationEngine
+
+PROFILES = generate_profiles(20, seed=4)
+
+
+def recommendations(engine):
+    return [[(item['id'], item['match_score']) for item in engine.recommend_internships(profile, 10)]
+            for profile in PROFILES]
+
+
+@pytest.mark.parametrize('scoring_mode', ['scalar', 'vectorized'])
+def test_workers_follow_reloads_and_deltas(scoring_mode, monkeypatch):
+    catalogue = generate_catalogue(300, seed=6)
+    engine = RecommendationEngine(scoring_mode=scoring_mode, internships=catalogue[:100],
+                                  workers=2, parallel_min_postings=1)
+    reference = RecommendationEngine(scoring_mode='scalar', internships=catalogue[:100])
+    scorer = engine.parallel_scorer
+    scorer.start()
+    processes = list(scorer._pool._pool)
+
+    def scored_in_parent(*args):
+        raise AssertionError('a shard was scored in the parent process')
+
+    try:
+        assert recommendations(engine) == recommendations(reference)
+        # Every shard below is scored by a worker that caught up with the change
+        monkeypatch.setattr(parallel_scoring, 'score_shard', scored_in_parent)
+
+        for target in (engine, reference):
+            target.load_catalogue(catalogue[50:])
+        assert recommendations(engine) == recommendations(reference)
+
+        rng = random.Random(2)
+        operations = [{'op': 'delete', 'id': internship['id']} for internship in catalogue[60:90]]
+        operations += [{'op': 'add', 'internship': generate_internship(rng, 500 + position)} for position in range(10)]
+        for target in (engine, reference):
+            target.apply_delta(operations)
+        assert recommendations(engine) == recommendations(reference)
+
+        # The same pool served every catalogue
+        assert list(scorer._pool._pool) == processes
+    finally:
+        scorer.close()
+    assert not any(process.is_alive() for process in processes)
+    assert not engine._runs_in_parallel(engine.state)
+
+
+def test_shards_the_pool_does_not_return_in_time_are_scored_in_process():
+    catalogue = generate_catalogue(200, seed=8)
+    engine = RecommendationEngine(internships=catalogue, workers=2, parallel_min_postings=1)
+    reference = RecommendationEngine(internships=catalogue)
+    scorer = engine.parallel_scorer
+    scorer.timeout = 0.5
+    scorer.start()
+    try:
+        # Every worker is stuck, as if it had been killed while scoring
+        stuck = [scorer._pool.apply_async(time.sleep, (60,)) for _ in range(scorer.workers)]
+        started = time.perf_counter()
+        assert [engine.recommend_internships(profile, 10) for profile in PROFILES[:2]] == \
+               [reference.recommend_internships(profile, 10) for profile in PROFILES[:2]]
+        assert time.perf_counter() - started < 10
+        assert not any(pending.ready() for pending in stuck)
+    finally:
+        scorer.close()
@@ -0,0 +1,56 @@
+"""
+A profiler session started through the admin routes is followed by every
+process sharing the profiler directory.
+
+The second profiler below stands for another gunicorn worker: its own
+engine, and the same directory.
+"""
+import time
+
+import app as app_module
+import sampling_profiler
+from benchmarks.synthetic import generate_catalogue, generate_profiles
+from recommendation_engine import RecommendationEngine
+from sampling_profiler import SamplingProfiler
+
+HEADERS = {'X-Admin-Token': 'secret'}
+
+
+def recommend_until(engine, done, seconds=10.0):
+    """Score recommendations on `engine` until done() or the time runs out"""
+    profile = generate_profiles(1, seed=2)[0]
+    deadline = time.monotonic() + seconds
+    while not done() and time.monotonic() < deadline:
+        engine.recommend_internships(profile, 5)
+    return done()
+
+
+def test_session_and_stacks_are_shared_by_every_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(sampling_profiler, 'SHARED_SYNC_INTERVAL', 0.05)
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(app_module, 'profiler', SamplingProfiler(str(tmp_path)))
+    other = SamplingProfiler(str(tmp_path))
+    engine = RecommendationEngine(internships=generate_catalogue(300, seed=4), profiler=other)
+    client = app_module.app.test_client()
+    try:
+        response = client.post('/api/admin/profiler?duration=60&interval_ms=1', headers=HEADERS)
+        assert response.status_code == 200
+        assert response.get_json()['profiler']['active']
+
+        # The other process joins at its next recommendation
+        assert recommend_until(engine, lambda: other.active and other.samples > 0)
+        assert recommend_until(engine, lambda: client.get('/api/admin/profiler', headers=HEADERS)
+                               .get_json()['profiler']['samples'] > 0)
+        status = client.get('/api/admin/profiler', headers=HEADERS).get_json()['profiler']
+        assert status['processes'] == 2 and status['profiled_calls'] > 0
+        stacks = client.get('/api/admin/profiler/stacks', headers=HEADERS)
+        assert 'recommend_internships' in stacks.get_data(as_text=True)
+
+        # And stops with the session
+        response = client.delete('/api/admin/profiler', headers=HEADERS)
+        assert not response.get_json()['profiler']['active']
+        assert recommend_until(engine, lambda: not other.active)
+        assert other.stopped_reason == 'stopped'
+    finally:
+        other.stop()
+        app_module.profiler.stop()
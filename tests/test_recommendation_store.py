@@ -0,0 +1,83 @@
+"""
+The recommendation store follows deltas without rehashing the catalogue.
+"""
+import random
+import sqlite3
+
+import recommendation_store
+from benchmarks.synthetic import generate_catalogue, generate_internship, generate_profiles
+from recommendation_cache import canonical_profile
+from recommendation_engine import RecommendationEngine
+from recommendation_store import RecommendationStore, catalogue_fingerprint
+
+PROFILES = generate_profiles(20, seed=14)
+
+
+def recommendations(engine):
+    return [[(item['id'], item['match_score']) for item in engine.recommend_internships(profile, 5)]
+            for profile in PROFILES]
+
+
+def test_deltas_update_the_fingerprint_incrementally(tmp_path, monkeypatch):
+    catalogue = generate_catalogue(200, seed=10)
+    store = RecommendationStore(str(tmp_path / 'recommendations.sqlite'))
+    engine = RecommendationEngine(scoring_mode='vectorized', internships=catalogue, recommendation_store=store)
+    reference = RecommendationEngine(scoring_mode='scalar', internships=catalogue)
+    store.refresh(engine, [canonical_profile(profile) for profile in PROFILES])
+    assert recommendations(engine) == recommendations(reference)
+    assert store.hits == len(PROFILES)
+
+    hashed = []
+    posting_digest = recommendation_store.posting_digest
+    monkeypatch.setattr(recommendation_store, 'posting_digest', lambda record: hashed.append(record) or
+                        posting_digest(record))
+    rng = random.Random(6)
+    operations = [{'op': 'delete', 'id': internship['id']} for internship in catalogue[10:15]]
+    operations += [{'op': 'update', 'id': catalogue[20]['id'], 'internship': dict(catalogue[20], location='Pune')}]
+    operations += [{'op': 'add', 'internship': generate_internship(rng, 900 + position)} for position in range(3)]
+    for target in (engine, reference):
+        target.apply_delta(operations)
+    # Only the postings the delta added were hashed
+    assert len(hashed) == 4
+    assert store._catalogue == (engine.state.version, catalogue_fingerprint(store.catalogue_postings(engine.state)))
+
+    # The store is behind the catalogue until it is refreshed
+    hits = store.hits
+    assert recommendations(engine) == recommendations(reference)
+    assert store.hits == hits
+    result = store.refresh(engine)
+    assert not result['full'] and not result['aborted']
+    assert recommendations(engine) == recommendations(reference)
+    assert store.hits == hits + len(PROFILES)
+
+
+def test_refresh_scores_outside_the_write_transaction(tmp_path, monkeypatch):
+    path = str(tmp_path / 'recommendations.sqlite')
+    store = RecommendationStore(path)
+    engine = RecommendationEngine(internships=generate_catalogue(100, seed=11), recommendation_store=store)
+    profiles = [canonical_profile(profile) for profile in PROFILES]
+    score_many_at = engine.score_many_at
+
+    def score_while_writing(*args):
+        # Another writer gets the store while entries are scored
+        writer = sqlite3.connect(path, timeout=0, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute('ROLLBACK')
+        writer.close()
+        return score_many_at(*args)
+
+    monkeypatch.setattr(engine, 'score_many_at', score_while_writing)
+    assert not store.refresh(engine, profiles)['aborted']
+    recommendations(engine)
+    assert store.hits == len(PROFILES)
+
+    def score_while_changing(state, version, *args):
+        engine.apply_delta([{'op': 'delete', 'id': engine.state.records[0].id}])
+        return score_many_at(state, version, *args)
+
+    monkeypatch.setattr(engine, 'score_many_at', score_while_changing)
+    result = store.refresh(engine, [canonical_profile({'skills': ['design'], 'interests': [], 'location': 'pune',
+                                                       'education': '12th'})])
+    assert result['aborted']
+    with sqlite3.connect(path) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] == len(set(profiles))
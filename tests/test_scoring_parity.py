@@ -0,0 +1,364 @@
+"""
+Parity of every scoring path with the original dict-based scorer.
+
+The reference below is a copy of the scorer the engine started from: every
+posting scored with calculate_match_score, then a stable sort by score. It
+only differs from the original where later changes redefined a score on
+purpose, each marked with a comment. The scalar, vectorized and parallel
+modes must return the same top-k (ids, scores and reasons) for random and
+edge-case profiles, on the initial catalogue, after rounds of deltas and
+after compaction.
+"""
+import copy
+import json
+import math
+import os
+import random
+
+import pytest
+
+import recommendation_engine
+from benchmarks.synthetic import generate_catalogue, generate_internship, generate_profiles
+from internship_record import InternshipRecord
+from recommendation_engine import RecommendationEngine
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+EDUCATION_LEVELS = ['10th', '12th', 'diploma', 'undergraduate', 'postgraduate']
+
+
+def load_skill_aliases():
+    with open(os.path.join(DATA_DIR, 'skill_aliases.json'), encoding='utf-8') as file:
+        aliases = json.load(file)
+    canonical, broader = {}, {}
+    for skill, names in aliases['synonyms'].items():
+        for name in [skill, *names]:
+            canonical[name.lower()] = skill.lower()
+    for skill, names in aliases['broader'].items():
+        for name in names:
+            broader.setdefault(name.lower(), set()).add(skill.lower())
+    return canonical, broader
+
+
+def load_places():
+    with open(os.path.join(DATA_DIR, 'india_gazetteer.json'), encoding='utf-8') as file:
+        places = json.load(file)['places']
+    by_name = {}
+    for place in places:
+        for name in [place['name'], *place.get('aliases', [])]:
+            by_name.setdefault(' '.join(name.lower().split()), place)
+    return by_name
+
+
+CANONICAL_SKILLS, BROADER_SKILLS = load_skill_aliases()
+PLACES = load_places()
+
+
+def skill_forms(skill):
+    canonical = CANONICAL_SKILLS.get(skill)
+    return {skill} if canonical is None else {skill, canonical}
+
+
+def find_place(location):
+    name = ' '.join(location.lower().split())
+    place = PLACES.get(name)
+    if place is None and ',' in name:
+        place = PLACES.get(name.split(',', 1)[0].strip())
+    return place
+
+
+def reference_proximity(loc1, loc2):
+    place1, place2 = find_place(loc1) if loc1 else None, find_place(loc2) if loc2 else None
+    if place1 is None or place2 is None:
+        return 20
+    lat1, lon1, lat2, lon2 = map(math.radians, (place1['lat'], place1['lon'], place2['lat'], place2['lon']))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    distance = 2 * 6371.0 * math.asin(math.sqrt(a))
+    for limit, score in ((50, 80), (200, 60), (500, 40)):
+        if distance <= limit:
+            return score
+    return 40 if place1['state'] == place2['state'] else 20
+
+
+def reference_skills_match(candidate_skills, required_skills):
+    if not required_skills:
+        return 50
+    if not candidate_skills:
+        return 0
+    # Since user-021, skills also match through the canonical skill of synonyms, and
+    # broader requirements accept the skills listed under them
+    candidate_forms = set().union(*(skill_forms(skill.lower()) for skill in candidate_skills))
+    matches = 0
+    for req_skill in required_skills:
+        required_forms = skill_forms(req_skill.lower())
+        if any(skill in term or term in skill or term in BROADER_SKILLS.get(skill, ())
+               for skill in candidate_forms for term in required_forms):
+            matches += 1
+    return (matches / len(required_skills)) * 100
+
+
+def reference_sector_match(candidate_interests, internship_sector):
+    if not candidate_interests or not internship_sector:
+        return 0
+    internship_sector_lower = internship_sector.lower()
+    # Since user-004, the best interest counts, so their order does not matter
+    best_score = 0
+    for interest in candidate_interests:
+        interest_lower = interest.lower()
+        if interest_lower == internship_sector_lower:
+            return 100
+        elif interest_lower in internship_sector_lower or internship_sector_lower in interest_lower:
+            best_score = 75
+    return best_score
+
+
+def reference_location_match(candidate_location, internship):
+    if not candidate_location:
+        return 50
+    candidate_location_lower = candidate_location.lower()
+    internship_location_lower = internship.get('location', '').lower()
+    if candidate_location_lower == 'any':
+        return 100
+    if internship.get('is_remote', False) and candidate_location_lower in ['remote', 'any']:
+        return 100
+    if candidate_location_lower in internship_location_lower or internship_location_lower in candidate_location_lower:
+        return 100
+    if internship.get('is_remote', False):
+        return 80
+    # Since user-020, distance bands of the gazetteer replace the same-region table
+    return reference_proximity(candidate_location_lower, internship_location_lower)
+
+
+def reference_education_match(candidate_education, preferred_education):
+    if not preferred_education:
+        return 100
+    if not candidate_education:
+        return 0
+    candidate_education_lower = candidate_education.lower()
+    for pref_edu in preferred_education:
+        if candidate_education_lower == pref_edu.lower():
+            return 100
+    try:
+        candidate_level = EDUCATION_LEVELS.index(candidate_education.lower())
+        min_required_level = min([EDUCATION_LEVELS.index(pref.lower()) for pref in preferred_education
+                                  if pref.lower() in EDUCATION_LEVELS])
+        if candidate_level >= min_required_level:
+            return 80
+        else:
+            return 30
+    except (ValueError, IndexError):
+        return 50
+
+
+def reference_match_score(candidate, internship):
+    score = 0
+    match_reasons = []
+
+    skills_score = reference_skills_match(candidate.get('skills', []), internship.get('requirements', []))
+    score += skills_score * 0.4
+    if skills_score > 70:
+        match_reasons.append(f"Strong skills match ({skills_score}%)")
+    elif skills_score > 40:
+        match_reasons.append(f"Good skills alignment ({skills_score}%)")
+
+    sector_score = reference_sector_match(candidate.get('interests', []), internship.get('sector', ''))
+    score += sector_score * 0.3
+    if sector_score > 0:
+        match_reasons.append(f"Matches your interest in {internship.get('sector', '')}")
+
+    location_score = reference_location_match(candidate.get('location', ''), internship)
+    score += location_score * 0.2
+    if location_score > 80:
+        match_reasons.append("Perfect location match")
+    elif location_score > 40:
+        match_reasons.append("Good location fit")
+
+    education_score = reference_education_match(candidate.get('education', ''),
+                                                internship.get('preferred_education', []))
+    score += education_score * 0.1
+    if education_score > 80:
+        match_reasons.append("Education level perfectly matches requirements")
+
+    if not match_reasons:
+        reason = "Basic compatibility with your profile"
+    else:
+        reason = ". ".join(match_reasons[:2])
+    return min(100, max(0, int(score))), reason
+
+
+def reference_recommendations(internships, candidate_profile, k):
+    """(id, match score, match reason) of the top k, as the original scorer ranked them"""
+    scored = []
+    for internship in internships:
+        score, reason = reference_match_score(candidate_profile, internship)
+        if score > 0:
+            scored.append((internship['id'], score, reason))
+    scored.sort(key=lambda entry: entry[1], reverse=True)
+    return scored[:k]
+
+
+def edge_case_internships():
+    """Postings exercising the neutral, unknown and duplicate branches of the scorer"""
+    rng = random.Random(7)
+    internships = []
+    changes = [
+        {'requirements': []},
+        {'requirements': ['Computer', 'computer', 'MS Excel']},
+        {'requirements': ['Tally ERP', 'python']},
+        {'sector': 'Technology', 'location': 'PUNE'},
+        {'sector': ''},
+        {'location': 'Pune, Maharashtra', 'is_remote': False},
+        {'location': 'Atlantis', 'is_remote': False},
+        {'location': 'Thane', 'is_remote': False},
+        {'location': '', 'is_remote': True},
+        {'preferred_education': []},
+        {'preferred_education': ['PhD']},
+        {'preferred_education': ['Undergraduate', 'postgraduate']},
+    ]
+    for number, change in enumerate(changes):
+        internship = generate_internship(rng, 900000 + number)
+        internship['id'] = f'EDGE{number:03d}'
+        internship.update(change)
+        internships.append(internship)
+    return internships
+
+
+def edge_case_profiles():
+    profiles = [
+        {'education': '', 'skills': [], 'interests': [], 'location': ''},
+        {'education': 'postgraduate', 'skills': ['tally', 'python'], 'interests': ['tech'], 'location': 'thane'},
+        {'education': 'phd', 'skills': ['Computers'], 'interests': ['finance'], 'location': 'Pune, Maharashtra'},
+        {'education': '12th', 'skills': ['design'], 'interests': ['retail', 'Retail'], 'location': 'ANY'},
+        {'education': 'diploma', 'skills': ['sales'], 'interests': [], 'location': 'remote'},
+        {'education': '10th', 'skills': ['electrical'], 'interests': ['manufacturing'], 'location': 'Atlantis'},
+        {'education': 'undergraduate', 'skills': ['a'], 'interests': ['e'], 'location': 'navi mumbai'},
+    ]
+    return [dict(profile, id=f'EDGE{number}') for number, profile in enumerate(profiles)]
+
+
+def delta_round(rng, internships, round_number, deletes, updates, adds):
+    """Random delete / update / add operations on the current catalogue, plus invalid ones"""
+    ids = [internship['id'] for internship in internships]
+    operations = []
+    for internship_id in rng.sample(ids, deletes):
+        operations.append({'op': 'delete', 'id': internship_id})
+    deleted = {operation['id'] for operation in operations}
+    for internship_id in rng.sample([internship_id for internship_id in ids if internship_id not in deleted], updates):
+        internship = generate_internship(rng, rng.randrange(1000000))
+        internship['id'] = internship_id
+        operations.append({'op': 'update', 'internship': internship})
+    for number in range(adds):
+        internship = generate_internship(rng, rng.randrange(1000000))
+        internship['id'] = f'ADD{round_number}-{number:04d}'
+        operations.append({'op': 'add', 'internship': internship})
+    rng.shuffle(operations)
+    # Rejected by the engine, and ignored by the reference
+    operations.append({'op': 'delete', 'id': 'MISSING'})
+    operations.append({'op': 'add', 'internship': {'id': ids[0]}})
+    return operations
+
+
+def apply_reference_delta(internships, operations):
+    """The catalogue after a delta: removed postings drop out, updated and added ones go last"""
+    internships = list(internships)
+    for operation in operations:
+        internship_id = operation.get('id') or operation['internship']['id']
+        position = next((position for position, internship in enumerate(internships)
+                         if internship['id'] == internship_id), None)
+        if operation['op'] == 'add':
+            if position is None and 'title' in operation['internship']:
+                internships.append(operation['internship'])
+        elif position is not None:
+            del internships[position]
+            if operation['op'] == 'update':
+                internships.append(operation['internship'])
+    return internships
+
+
+PROFILES = generate_profiles(40, seed=11, edge_cases=True) + edge_case_profiles()
+K_VALUES = (5, 20)
+
+
+@pytest.fixture(scope='module')
+def scenario():
+    """
+    The initial catalogue, then the operations of every stage with the
+    reference results after it, for every profile and k
+    """
+    with open(os.path.join(DATA_DIR, 'sample_internships.json'), encoding='utf-8') as file:
+        initial = json.load(file) + generate_catalogue(600, seed=3) + edge_case_internships()
+
+    rng = random.Random(5)
+    stages = []
+    internships = initial
+    rounds = [('initial', None)]
+    for round_number in range(3):
+        rounds.append((f'delta {round_number}', delta_round(rng, internships, round_number, 25, 25, 30)))
+        internships = apply_reference_delta(internships, rounds[-1][1])
+    # More than half of the postings removed at once: the catalogue is compacted
+    rounds.append(('compaction', delta_round(rng, internships, 3, len(internships) * 3 // 5, 10, 10)))
+
+    internships = initial
+    for name, operations in rounds:
+        if operations is not None:
+            internships = apply_reference_delta(internships, operations)
+        expected = [reference_recommendations(internships, profile, max(K_VALUES)) for profile in PROFILES]
+        stages.append((name, operations, len(internships), expected))
+    return initial, stages
+
+
+def summarize(recommendations):
+    return [(recommendation['id'], recommendation['match_score'], recommendation['match_reason'])
+            for recommendation in recommendations]
+
+
+def make_engine(mode, internships):
+    if mode.startswith('parallel'):
+        engine = RecommendationEngine(scoring_mode=mode.split('-')[1], internships=copy.deepcopy(internships),
+                                      workers=2, parallel_min_postings=1)
+        # Started once: the deltas below reach the workers through the changes file
+        engine.parallel_scorer.start()
+        return engine
+    return RecommendationEngine(scoring_mode=mode, internships=copy.deepcopy(internships))
+
+
+@pytest.mark.parametrize('mode', ['scalar', 'vectorized', 'parallel-scalar', 'parallel-vectorized'])
+def test_matches_reference_through_deltas_and_compaction(mode, scenario, monkeypatch):
+    monkeypatch.setattr(recommendation_engine, 'COMPACTION_MIN_REMOVED', 32)
+    initial, stages = scenario
+    engine = make_engine(mode, initial)
+    try:
+        for name, operations, size, expected in stages:
+            if operations is not None:
+                state = engine.state
+                result = engine.apply_delta(operations)
+                assert len(result['errors']) == 2, name
+                assert result['internships'] == size, name
+                # Compaction installs a new state holding the live postings only
+                assert (engine.state is not state) == (name == 'compaction'), name
+            if name == 'compaction':
+                assert len(engine.records) == size and engine.state.index.removed == 0
+
+            for k in K_VALUES:
+                for profile, profile_expected in zip(PROFILES, expected):
+                    actual = summarize(engine.recommend_internships(profile, k))
+                    assert actual == profile_expected[:k], f'{name}, k={k}, profile {profile}'
+                batch = dict(engine.recommend_batch(PROFILES, k))
+                assert [summarize(batch[number]) for number in range(len(PROFILES))] == \
+                       [profile_expected[:k] for profile_expected in expected], f'{name}, k={k}, batch'
+    finally:
+        if engine.parallel_scorer is not None:
+            engine.parallel_scorer.close()
+
+
+def test_records_being_added_are_not_scanned_before_they_are_indexed():
+    """apply_delta appends a record before indexing it; a concurrent full scan must skip it"""
+    engine = RecommendationEngine(scoring_mode='scalar', internships=generate_catalogue(50, seed=2))
+    # No skills, interests or location: no candidate subsets, every posting is scanned
+    profile = {'education': 'undergraduate', 'skills': [], 'interests': [], 'location': ''}
+    expected = summarize(engine.recommend_internships(profile, 5))
+
+    state = engine.state
+    state.records.append(InternshipRecord(len(state.records), generate_internship(random.Random(1), 99)))
+    assert summarize(engine._score_recommendations(state, profile, 5)) == expected
+    assert len(state.index.search()) == 50
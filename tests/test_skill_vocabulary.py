@@ -0,0 +1,91 @@
+"""
+Skill vocabularies are per catalogue state, so they do not outgrow the catalogue.
+"""
+import copy
+import random
+
+import pytest
+
+import recommendation_engine
+from benchmarks.synthetic import generate_catalogue, generate_internship, generate_profiles
+from recommendation_engine import RecommendationEngine
+from internship_record import CandidateProfile
+from skill_vocabulary import SKILLS, SkillVocabulary
+
+PROFILES = generate_profiles(20, seed=12)
+
+
+def recommendations(engine):
+    return [[(item['id'], item['match_score']) for item in engine.recommend_internships(profile, 10)]
+            for profile in PROFILES]
+
+
+def live_terms(engine):
+    return {term for record in engine.index.search() for term in record.requirements}
+
+
+def test_terms_of_removed_postings_are_dropped(monkeypatch):
+    monkeypatch.setattr(recommendation_engine, 'COMPACTION_MIN_REMOVED', 8)
+    catalogue = generate_catalogue(20, seed=1)
+    rng = random.Random(3)
+    churned = []
+    for position in range(30):
+        internship = generate_internship(rng, 100 + position)
+        internship['requirements'] = internship['requirements'] + [f'Churned Skill {position}']
+        churned.append(internship)
+
+    for scoring_mode in ('scalar', 'vectorized'):
+        engine = RecommendationEngine(scoring_mode=scoring_mode, internships=copy.deepcopy(catalogue))
+        assert set(engine.state.skills.terms) == live_terms(engine)
+
+        engine.apply_delta([{'op': 'add', 'internship': internship} for internship in churned])
+        assert set(engine.state.skills.terms) == live_terms(engine)
+        # Removing postings keeps their terms until the catalogue is compacted
+        state = engine.state
+        engine.apply_delta([{'op': 'delete', 'id': internship['id']} for internship in churned])
+        assert engine.state is not state
+        assert set(engine.state.skills.terms) == live_terms(engine)
+
+        assert recommendations(engine) == recommendations(
+            RecommendationEngine(scoring_mode='scalar', internships=copy.deepcopy(catalogue)))
+
+        replacement = generate_catalogue(20, seed=2)
+        engine.load_catalogue(replacement)
+        assert set(engine.state.skills.terms) == live_terms(engine)
+
+    # The shared vocabulary only holds the aliases
+    assert not SKILLS.terms
+
+
+@pytest.mark.parametrize('skills,requirements,score', [
+    (['python'], ['Java', 'JavaScript'], 0),
+    (['welding'], ['AutoCAD'], 0),
+    (['nursing'], ['First Aid'], 0),
+    (['typing'], ['Record Keeping'], 0),
+    # Broader requirements accept the skills under them, one way only
+    (['python'], ['Programming'], 100),
+    (['programming'], ['Python'], 0),
+    (['tally erp'], ['Accounting', 'Bookkeeping'], 50),
+    # Synonyms match both ways
+    (['ms excel'], ['Excel'], 100),
+    (['excel'], ['Microsoft Excel'], 100),
+    (['call center'], ['Call Centre'], 100),
+])
+def test_sibling_skills_do_not_match_each_other(skills, requirements, score):
+    scalar = RecommendationEngine(scoring_mode='scalar', internships=[])
+    assert scalar.calculate_skills_match(skills, requirements) == score
+
+    internship = {'id': 'X1', 'title': 'Intern', 'sector': 'technology', 'location': 'Pune',
+                  'requirements': requirements}
+    scores = []
+    for scoring_mode in ('scalar', 'vectorized'):
+        engine = RecommendationEngine(scoring_mode=scoring_mode, internships=[internship])
+        candidate = CandidateProfile({'skills': skills}, engine.state.skills)
+        assert engine.record_skills_match(candidate, engine.state.records[0]) == score
+        scores.append([item['match_score'] for item in engine.recommend_internships({'skills': skills}, 1)])
+    assert scores[0] == scores[1]
+
+
+def test_a_synonym_of_two_skills_is_rejected():
+    with pytest.raises(ValueError):
+        SkillVocabulary({'excel': ['sheets'], 'google sheets': ['sheets']})